@@ -0,0 +1,236 @@
+# MVP scoring of a season of matches: the previous row-by-row implementation,
+# called once per match, versus one call of the vectorised engine in mvp.py.
+# The previous implementation is the oracle: rankings and scores must match.
+#
+# Usage: python benchmarks/bench_mvp.py [matches]
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mvp import FIELD_PLAYER_WEIGHTS, KEEPER_WEIGHTS, calculate_mvp_score, score_matches
+
+TOLERANCE = 1e-9
+
+FIELD_STATS = list(FIELD_PLAYER_WEIGHTS) + ['performance_pk', 'performance_pkatt', 'expected_xg']
+KEEPER_STATS = list(KEEPER_WEIGHTS) + ['shot_stopping_sota', 'shot_stopping_psxg']
+
+# Previous implementation (team_dashboard_page.py), kept here as the oracle
+def calculate_mvp_score_legacy(field_players_stats_df, keepers_stats_df, selected_team, match_result):
+    # Define weights for field player stats
+    field_player_weights = {
+        'performance_gls': 1.5,
+        'performance_ast': 0.5,
+        'performance_sh': 0.1,
+        'performance_sot': 0.2,
+        'performance_touches': 0.01,
+        'performance_tkl': 0.2,
+        'performance_int': 0.2,
+        'performance_blocks': 0.2,
+        'expected_xag': 0.5,
+        'sca_sca': 0.2,
+        'sca_gca': 0.5,
+        'passes_cmp': 0.01,
+        'passes_cmp_percent': 0.01,
+        'passes_prgp': 0.05,
+        'carries_carries': 0.01,
+        'carries_prgc': 0.05,
+        'take_ons_att': 0.02,
+        'take_ons_succ': 0.05,
+        'performance_crdy': -1,
+        'performance_crdr': -2
+    }
+
+    keeper_weights = {
+        'shot_stopping_ga': -0.5,
+        'shot_stopping_saves': 0.15,
+        'shot_stopping_save_percent': 0.01
+    }
+
+    mvp_scores = {}
+
+    # Determine multipliers based on the match result
+    winning_team_multiplier = 1.1  # Small boost for winning team
+    loosing_team_multiplier = 0.9  # Small penalty for losing team
+
+    # Ensure 'performance_touches' column has valid data
+    if field_players_stats_df['performance_touches'].notna().sum() == 0:
+        return "Insufficient data to calculate MVP for this match."
+    else: 
+        # Ensure required columns exist in DataFrame for field players
+        for col in field_player_weights.keys():
+            if col not in field_players_stats_df.columns:
+                field_players_stats_df[col] = 0.0
+
+        # Ensure required columns exist in DataFrame for keepers
+        for col in keeper_weights.keys():
+            if col not in keepers_stats_df.columns:
+                keepers_stats_df[col] = 0.0
+
+        # Process field players' stats
+        for _, row in field_players_stats_df.iterrows():
+            player = row['player_name']
+            score = 0
+
+            # Determine team-specific multiplier
+            player_team = row['team']
+            if match_result == 'W':
+                if player_team == selected_team:
+                    team_multiplier = winning_team_multiplier
+                else:
+                    team_multiplier = loosing_team_multiplier
+            elif match_result == 'L':
+                if player_team == selected_team:
+                    team_multiplier = loosing_team_multiplier
+                else:
+                    team_multiplier = winning_team_multiplier
+            else:
+                team_multiplier = 1  # No changes for draw
+
+            # Calculate base score from standard stats
+            for stat, weight in field_player_weights.items():
+                stat_value = row.get(stat, 0)
+                if not pd.isnull(stat_value):
+                    score += stat_value * weight
+
+            # Calculate penalty for missed penalties
+            if 'performance_pkatt' in row and 'performance_pk' in row:
+                if not pd.isnull(row['performance_pkatt']) and not pd.isnull(row['performance_pk']):
+                    missed_penalties = row['performance_pkatt'] - row['performance_pk']
+                    if missed_penalties > 0:
+                        score -= missed_penalties * 2  # Penalize each missed penalty by a factor of 2
+
+            # Calculate the difference between actual goals and xG
+            if 'performance_gls' in row and 'expected_xg' in row:
+                if not pd.isnull(row['performance_gls']) and not pd.isnull(row['expected_xg']):
+                    goal_diff = row['performance_gls'] - row['expected_xg']
+                    score += goal_diff * 1
+
+            # Calculate success rate of take-ons (dribbles)
+            if 'take_ons_att' in row and 'take_ons_succ' in row:
+                if not pd.isnull(row['take_ons_att']) and row['take_ons_att'] >= 5:
+                    take_on_success_rate = row['take_ons_succ'] / row['take_ons_att']
+                    if take_on_success_rate > 0.4:
+                        score += take_on_success_rate * 2
+                    else:
+                        score -= take_on_success_rate * 2
+
+            # Apply team result multiplier
+            score *= team_multiplier
+
+            mvp_scores[player] = score
+
+        # Process goalkeepers similarly
+        for _, row in keepers_stats_df.iterrows():
+            player = row['player_name']
+            score = mvp_scores.get(player, 0)
+
+            # Determine team-specific multiplier
+            player_team = row['team']
+            if player_team == selected_team and match_result == 'W':
+                team_multiplier = winning_team_multiplier
+            elif player_team == selected_team and match_result == 'L':
+                team_multiplier = loosing_team_multiplier
+            else:
+                team_multiplier = 1  # No changes for draw
+
+            # Calculate score for goalkeepers
+            for stat, weight in keeper_weights.items():
+                stat_value = row.get(stat, 0)
+                if not pd.isnull(stat_value):
+                    score += stat_value * weight
+
+            # Add points for the difference between Post-Shot xG and Goals Against (GA)
+            if 'shot_stopping_psxg' in row and 'shot_stopping_ga' in row:
+                if not pd.isnull(row['shot_stopping_psxg']) and not pd.isnull(row['shot_stopping_ga']):
+                    psxg_diff = row['shot_stopping_psxg'] - row['shot_stopping_ga']
+                    if psxg_diff > 0:
+                        score += psxg_diff * 1.5  # Positive effect for preventing goals
+                    else:
+                        score += psxg_diff * 1  # Smaller penalty for underperformance
+
+            # Add points for the difference between Shots on Target Against (SoTA) and Goals Against (GA)
+            if 'shot_stopping_sota' in row and 'shot_stopping_ga' in row:
+                if not pd.isnull(row['shot_stopping_sota']) and not pd.isnull(row['shot_stopping_ga']):
+                    sota_diff = row['shot_stopping_sota'] - row['shot_stopping_ga']
+                    score += sota_diff * 0.5  # Award for stopping shots on target
+
+            # Apply team result multiplier
+            score *= team_multiplier
+
+            mvp_scores[player] = score
+
+        # Sort MVP scores in descending order
+        sorted_mvp_scores = sorted(mvp_scores.items(), key=lambda x: x[1], reverse=True)
+
+        return sorted_mvp_scores
+
+# Stats of one match as match_player_stats rows: 14 field players and a keeper
+# per team, some unused substitutes without stats and some missing values
+def synthetic_match(rng, match_id):
+    field, keepers = [], []
+    for team in ("Home FC", "Away FC"):
+        players = [f"{team} player {i}" for i in range(14)]
+        df = pd.DataFrame({col: rng.integers(0, 8, len(players)).astype(float) for col in FIELD_STATS})
+        df['expected_xg'] = rng.random(len(players)).round(2)
+        df['passes_cmp_percent'] = rng.uniform(50, 100, len(players)).round(1)
+        df['take_ons_att'] = rng.integers(0, 10, len(players)).astype(float)
+        df['take_ons_succ'] = np.minimum(df['take_ons_att'], rng.integers(0, 8, len(players)))
+        df.loc[df.sample(frac=0.1, random_state=int(rng.integers(1 << 31))).index, 'performance_touches'] = np.nan
+        df.loc[11:, FIELD_STATS] = np.nan
+        df.insert(0, 'player_name', players)
+        df.insert(0, 'team', team)
+        df.insert(0, 'match_id', match_id)
+        field.append(df)
+
+        keeper = pd.DataFrame({col: rng.integers(0, 6, 1).astype(float) for col in KEEPER_STATS})
+        keeper['shot_stopping_psxg'] = rng.random(1).round(2) * 3
+        keeper.insert(0, 'player_name', f"{team} keeper")
+        keeper.insert(0, 'team', team)
+        keeper.insert(0, 'match_id', match_id)
+        keepers.append(keeper)
+    return pd.concat(field, ignore_index=True), pd.concat(keepers, ignore_index=True)
+
+def check_equivalent(expected, actual, match_id):
+    if isinstance(expected, str):
+        assert actual == expected, f"match {match_id}: {actual!r} != {expected!r}"
+        return
+    assert len(expected) == len(actual), f"match {match_id}: {len(actual)} players scored, expected {len(expected)}"
+    for (expected_player, expected_score), (player, score) in zip(expected, actual):
+        assert abs(score - expected_score) <= TOLERANCE, f"match {match_id}: {player} {score} != {expected_player} {expected_score}"
+        # Players may only swap places when their scores tie
+        assert player == expected_player or abs(dict(expected)[player] - expected_score) <= TOLERANCE, \
+            f"match {match_id}: {player} ranked where {expected_player} was"
+
+def main(matches):
+    rng = np.random.default_rng(0)
+    season = [synthetic_match(rng, match_id) for match_id in range(matches)]
+    results = {match_id: ("Home FC", rng.choice(["W", "D", "L"])) for match_id in range(matches)}
+
+    start = time.perf_counter()
+    expected = [calculate_mvp_score_legacy(field.copy(), keepers.copy(), *results[match_id])
+                for match_id, (field, keepers) in enumerate(season)]
+    legacy_time = time.perf_counter() - start
+
+    for match_id, (field, keepers) in enumerate(season):
+        check_equivalent(expected[match_id], calculate_mvp_score(field, keepers, *results[match_id]), match_id)
+
+    field = pd.concat([field for field, _ in season], ignore_index=True)
+    keepers = pd.concat([keepers for _, keepers in season], ignore_index=True)
+    start = time.perf_counter()
+    scores = score_matches(field, keepers, results)
+    engine_time = time.perf_counter() - start
+    for match_id, match_scores in scores.groupby('match_id'):
+        check_equivalent(expected[match_id], list(zip(match_scores['player_name'], match_scores['mvp_score'])), match_id)
+
+    print(f"{matches} matches, {len(scores)} player scores, identical rankings")
+    print(f"row-by-row (per match): {legacy_time * 1000:8.1f} ms")
+    print(f"vectorised (one call):  {engine_time * 1000:8.1f} ms")
+    print(f"speedup:                {legacy_time / engine_time:8.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 380)
@@ -0,0 +1,72 @@
+# Per-page parse time of fbref pages: BeautifulSoup + pd.read_html (previous
+# implementation) versus the single lxml pass in scrapers.py.
+#
+# Usage: python benchmarks/bench_parsing.py [page.html | page.html.gz ... | --cache]
+# Without arguments the sample pages in benchmarks/pages are used (a team
+# matchlogs page and a match report); --cache uses every page in the local
+# HTML cache instead.
+import glob
+import gzip
+import os
+import re
+import sys
+import time
+from io import StringIO
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_cache import HTML_CACHE_DIR
+from scrapers import FIELD_PLAYERS_TABLE_RE, KEEPERS_TABLE_RE, MATCHLOGS_TABLE_RE, find_tables, table_to_dataframe
+
+REPEAT = 5
+SAMPLE_PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+def load_page(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+def parse_legacy(html):
+    soup = BeautifulSoup(html, "html.parser")
+    tables = soup.find_all('table', id=re.compile(r'^(matchlogs_for|stats_.*_summary|keeper_stats_.*)$'))
+    return [pd.read_html(StringIO(str(table)))[0] for table in tables]
+
+def parse_fast(html):
+    groups = find_tables(html, MATCHLOGS_TABLE_RE, FIELD_PLAYERS_TABLE_RE, KEEPERS_TABLE_RE)
+    return [table_to_dataframe(table) for tables in groups for table in tables]
+
+def best_time(func, html):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(html)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(paths):
+    if paths == ["--cache"]:
+        paths = glob.glob(os.path.join(HTML_CACHE_DIR, "*", "*.html.gz"))
+    elif not paths:
+        paths = sorted(glob.glob(os.path.join(SAMPLE_PAGES_DIR, "*.html.gz")))
+    if not paths:
+        print("No pages found. Pass saved fbref pages or fill the HTML cache first.")
+        return
+
+    total_legacy = total_fast = 0.0
+    print(f"{'page':<40} {'tables':>6} {'legacy ms':>10} {'lxml ms':>10} {'speedup':>8}")
+    for path in paths:
+        html = load_page(path)
+        tables = len(parse_fast(html))
+        legacy = best_time(parse_legacy, html)
+        fast = best_time(parse_fast, html)
+        total_legacy += legacy
+        total_fast += fast
+        print(f"{os.path.basename(path)[:40]:<40} {tables:>6} {legacy * 1000:>10.1f} {fast * 1000:>10.1f} {legacy / fast:>7.1f}x")
+
+    print(f"{'mean per page':<40} {'':>6} {total_legacy / len(paths) * 1000:>10.1f} {total_fast / len(paths) * 1000:>10.1f} {total_legacy / total_fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+# Time of turning a season of parsed match reports into match_player_stats
+# records: previous row-by-row implementation versus the column-wise one.
+#
+# Usage: python benchmarks/bench_records.py [matches]
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import PLAYER_STATS_COLUMNS, clean_data_for_db, prepare_match_player_stats_records
+
+FIELD_COLUMNS = ['Player', 'Shirt #', 'Nat', 'Pos', 'Age', 'Min'] + [
+    col for col in PLAYER_STATS_COLUMNS if '_' in col and not col.startswith(('Shot Stopping', 'Launched', 'Goal Kicks', 'Crosses', 'Sweeper')) and col not in ('Passes_Att (GK)', 'Passes_Thr', 'Passes_Launch%', 'Passes_AvgLen')
+]
+KEEPER_COLUMNS = ['Player', 'Nat', 'Age', 'Min', 'Shot Stopping_SoTA', 'Shot Stopping_GA', 'Shot Stopping_Saves',
+                  'Shot Stopping_Save%', 'Shot Stopping_PSxG', 'Launched_Cmp', 'Launched_Att', 'Launched_Cmp%',
+                  'Passes_Att (GK)', 'Passes_Thr', 'Passes_Launch%', 'Passes_AvgLen', 'Goal Kicks_Att',
+                  'Goal Kicks_Launch%', 'Goal Kicks_AvgLen', 'Crosses_Opp', 'Crosses_Stp', 'Crosses_Stp%',
+                  'Sweeper_#OPA', 'Sweeper_AvgDist']
+
+def synthetic_report(rng):
+    field, keepers = [], []
+    for team in ("Home FC", "Away FC"):
+        players = [f"{team} player {i}" for i in range(16)]
+        df = pd.DataFrame({col: rng.integers(0, 50, len(players)).astype(float) for col in FIELD_COLUMNS[6:]})
+        df.insert(0, 'Player', players)
+        df.insert(1, 'Shirt #', range(1, 17))
+        df.insert(2, 'Nat', 'eng ENG')
+        df.insert(3, 'Pos', ['GK'] + ['CB', 'LB', 'RB', 'CM', 'FW'] * 3)
+        df.insert(4, 'Age', '25-100')
+        df.insert(5, 'Min', 90)
+        df.loc[df.sample(frac=0.1, random_state=int(rng.integers(1 << 31))).index, 'Performance_Touches'] = np.nan
+        df['Team'] = team
+        field.append(df)
+
+        keeper = pd.DataFrame({col: rng.integers(0, 10, 1).astype(float) for col in KEEPER_COLUMNS[4:]})
+        keeper.insert(0, 'Player', players[0])
+        keeper.insert(1, 'Nat', 'eng ENG')
+        keeper.insert(2, 'Age', '25-100')
+        keeper.insert(3, 'Min', 90)
+        keeper['Team'] = team
+        keepers.append(keeper)
+    return pd.concat(field), pd.concat(keepers)
+
+# Previous implementation, kept here as the baseline
+def prepare_records_legacy(player_df, goalkeeper_df, match_id):
+    gk_from_players = player_df[player_df['Pos'] == 'GK']
+    gk_combined = pd.merge(gk_from_players, goalkeeper_df, on='Player', how='outer', suffixes=('_player', '_gk'))
+    for col in ('Nat', 'Age', 'Min', 'Team'):
+        gk_combined[col] = gk_combined[f'{col}_player'].combine_first(gk_combined[f'{col}_gk'])
+    gk_combined = gk_combined.drop(columns=[f'{col}_{side}' for col in ('Nat', 'Age', 'Min', 'Team') for side in ('player', 'gk')])
+    combined_df = pd.concat([player_df[player_df['Pos'] != 'GK'], gk_combined], ignore_index=True)
+
+    records = []
+    for _, row in combined_df.iterrows():
+        record = {'match_id': match_id}
+        for fbref_col, db_col in PLAYER_STATS_COLUMNS.items():
+            record[db_col] = row.get(fbref_col, None)
+        for key, value in record.items():
+            if pd.isna(value):
+                record[key] = None
+        records.append(record)
+
+    # upsert_players_stats used to round-trip through a DataFrame to deduplicate
+    df = pd.DataFrame(records).drop_duplicates(subset=["match_id", "team", "player_name", "shirt_number"])
+    return clean_data_for_db(df.to_dict(orient="records"))
+
+def run(func, reports):
+    start = time.perf_counter()
+    total = 0
+    for match_id, (field, keepers) in enumerate(reports):
+        total += len(func(field, keepers, match_id))
+    return time.perf_counter() - start, total
+
+def main(matches):
+    rng = np.random.default_rng(0)
+    random.seed(0)
+    reports = [synthetic_report(rng) for _ in range(matches)]
+
+    legacy_time, legacy_rows = run(prepare_records_legacy, reports)
+    new_time, new_rows = run(prepare_match_player_stats_records, reports)
+    assert legacy_rows == new_rows
+
+    print(f"{matches} match reports, {new_rows} player records")
+    print(f"row-by-row:  {legacy_time * 1000:8.1f} ms ({legacy_time / matches * 1000:.2f} ms per report)")
+    print(f"column-wise: {new_time * 1000:8.1f} ms ({new_time / matches * 1000:.2f} ms per report)")
+    print(f"speedup:     {legacy_time / new_time:8.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 380)
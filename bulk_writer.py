@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import time
+
+# Rows and serialized bytes per write request. PostgREST handles a few large
+# upserts much better than thousands of small ones, but request bodies are capped.
+BULK_MAX_ROWS = int(os.environ.get("STATFIELD_BULK_MAX_ROWS", 1000))
+BULK_MAX_BYTES = int(os.environ.get("STATFIELD_BULK_MAX_BYTES", 2 * 1024 * 1024))
+BULK_MAX_RETRIES = 4
+BULK_RETRY_DELAY = 2
+
+# One add() call: its callbacks run once all of its records are written (or failed)
+class _Batch:
+    def __init__(self, remaining, on_flushed, on_failed):
+        self.remaining = remaining
+        self.rows = []
+        self.on_flushed = on_flushed
+        self.on_failed = on_failed
+        self.failed = False
+
+# Buffers records from many scrape units and writes them in chunks bounded by
+# BULK_MAX_ROWS and BULK_MAX_BYTES. write(chunk) performs the upsert and returns
+# the response; key(record) is the upsert conflict key, so a record added again
+# before a flush replaces the buffered one (an upsert cannot touch a row twice).
+# Failed chunks are retried with exponential backoff. Throughput is reported
+# after every chunk as report("bulk_flushed", ...).
+class BulkWriter:
+    def __init__(self, write, key, table, report=None, max_rows=None, max_bytes=None,
+                 max_retries=BULK_MAX_RETRIES, retry_delay=BULK_RETRY_DELAY):
+        self.write = write
+        self.key = key
+        self.table = table
+        self.report = report
+        self.max_rows = max_rows or BULK_MAX_ROWS
+        self.max_bytes = max_bytes or BULK_MAX_BYTES
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._buffer = {}
+        self._buffer_bytes = 0
+        self.rows_written = 0
+        self.chunks_written = 0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    # Buffer the records of one unit of work. on_flushed(rows) receives the rows
+    # returned by the database for them; on_failed(error) is called instead if a
+    # chunk holding them keeps failing (without it the error is raised).
+    def add(self, records, on_flushed=None, on_failed=None):
+        batch = _Batch(len(records), on_flushed, on_failed)
+        if not records:
+            if on_flushed:
+                on_flushed([])
+            return
+
+        for record in records:
+            size = len(json.dumps(record, default=str))
+            record_key = self.key(record)
+            if record_key in self._buffer:
+                # The replaced record counts as written for its own batch
+                _, old_batch, old_size = self._buffer.pop(record_key)
+                self._buffer_bytes -= old_size
+                self._settle(old_batch, [])
+            if self._buffer and (len(self._buffer) >= self.max_rows or self._buffer_bytes + size > self.max_bytes):
+                self.flush()
+            self._buffer[record_key] = (record, batch, size)
+            self._buffer_bytes += size
+
+    def flush(self):
+        if not self._buffer:
+            return
+        entries = list(self._buffer.values())
+        self._buffer = {}
+        self._buffer_bytes = 0
+
+        chunk = [record for record, _, _ in entries]
+        start = time.perf_counter()
+        try:
+            response = self._write_with_retries(chunk)
+        except Exception as e:
+            self._fail({id(batch): batch for _, batch, _ in entries}.values(), e)
+            return
+        self.seconds += time.perf_counter() - start
+        self.rows_written += len(chunk)
+        self.chunks_written += 1
+
+        returned = {self.key(row): row for row in (getattr(response, "data", None) or [])}
+        for record, batch, _ in entries:
+            self._settle(batch, [returned.get(self.key(record), record)])
+
+        if self.report:
+            self.report("bulk_flushed", table=self.table, rows=len(chunk), rows_per_sec=self.rows_per_sec())
+
+    def rows_per_sec(self):
+        return self.rows_written / self.seconds if self.seconds else 0.0
+
+    def _write_with_retries(self, chunk):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.write(chunk)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_delay * 2 ** attempt
+                logging.warning(f"Writing {len(chunk)} row(s) to {self.table} failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+
+    def _settle(self, batch, rows):
+        batch.rows.extend(rows)
+        batch.remaining -= 1
+        if batch.remaining == 0 and not batch.failed and batch.on_flushed:
+            batch.on_flushed(batch.rows)
+
+    def _fail(self, batches, error):
+        batches = list(batches)
+        if not all(batch.on_failed for batch in batches):
+            raise error
+        for batch in batches:
+            if not batch.failed:
+                batch.failed = True
+                batch.on_failed(error)
@@ -0,0 +1,112 @@
+import os
+import time
+
+from local_db import LOCAL_DB_DIR, connect
+
+# Checkpoints of long backfills. Every unit of work (a team season of matchlogs,
+# a match report) is recorded under the key of its run; running again with the
+# same key skips completed units and retries failed ones once their retry time
+# has passed, so a crashed or interrupted refresh resumes where it stopped.
+CHECKPOINT_DB_PATH = os.environ.get("STATFIELD_CHECKPOINT_DB", os.path.join(LOCAL_DB_DIR, "checkpoints.sqlite3"))
+
+# Failed units are retried after RETRY_BASE_DELAY * 2^(attempts - 1) seconds, at most RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 5 * 60
+RETRY_MAX_DELAY = 6 * 60 * 60
+
+SCHEMA = """
+create table if not exists checkpoints (
+    run_key text not null,
+    unit text not null,
+    status text not null,
+    attempts integer not null default 0,
+    error text,
+    next_retry_at real,
+    updated_at real not null,
+    primary key (run_key, unit)
+)
+"""
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+class CheckpointStore:
+    def __init__(self, run_key, path=None):
+        self.run_key = run_key
+        self.path = path or CHECKPOINT_DB_PATH
+
+    def _connect(self):
+        return connect(self.path, SCHEMA)
+
+    # Units that still have to run: never seen, or failed and due for a retry
+    def pending(self, units):
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "select unit, status, next_retry_at from checkpoints where run_key = ?", (self.run_key,)
+            ).fetchall()
+        skip = {
+            row["unit"] for row in rows
+            if row["status"] == "done" or (row["next_retry_at"] is not None and row["next_retry_at"] > now)
+        }
+        return [unit for unit in units if unit not in skip]
+
+    def mark_done(self, unit):
+        with self._connect() as conn:
+            conn.execute(
+                "insert into checkpoints (run_key, unit, status, attempts, updated_at) values (?, ?, 'done', 1, ?) "
+                "on conflict (run_key, unit) do update set status = 'done', attempts = attempts + 1, "
+                "error = null, next_retry_at = null, updated_at = excluded.updated_at",
+                (self.run_key, unit, time.time())
+            )
+
+    def mark_failed(self, unit, error):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "select attempts from checkpoints where run_key = ? and unit = ?", (self.run_key, unit)
+            ).fetchone()
+            attempts = (row["attempts"] if row else 0) + 1
+            conn.execute(
+                "insert into checkpoints (run_key, unit, status, attempts, error, next_retry_at, updated_at) "
+                "values (?, ?, 'failed', ?, ?, ?, ?) "
+                "on conflict (run_key, unit) do update set status = 'failed', attempts = excluded.attempts, "
+                "error = excluded.error, next_retry_at = excluded.next_retry_at, updated_at = excluded.updated_at",
+                (self.run_key, unit, attempts, str(error), now + retry_delay(attempts), now)
+            )
+
+    # Number of units per status, e.g. {"done": 120, "failed": 3}
+    def summary(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "select status, count(*) as units from checkpoints where run_key = ? group by status", (self.run_key,)
+            ).fetchall()
+        return {row["status"]: row["units"] for row in rows}
+
+    # Failed units with their error and next retry time
+    def failures(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "select unit, attempts, error, next_retry_at from checkpoints "
+                "where run_key = ? and status = 'failed' order by unit", (self.run_key,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+# Used when a run has no key: every unit runs and nothing is recorded
+class NoCheckpoints:
+    def pending(self, units):
+        return list(units)
+
+    def mark_done(self, unit):
+        pass
+
+    def mark_failed(self, unit, error):
+        pass
+
+    def summary(self):
+        return {}
+
+    def failures(self):
+        return []
+
+def get_checkpoint_store(run_key=None):
+    return CheckpointStore(run_key) if run_key else NoCheckpoints()
@@ -1,13 +1,27 @@
-import streamlit as st
 import pandas as pd
+import os
 import unicodedata
-import datetime
-from st_supabase_connection import SupabaseConnection
-from scrapers import scrap_team_matchlogs, scrap_match_stats
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from db_client import supabase
+from query_cache import QueryCache
+from checkpoints import get_checkpoint_store
+from bulk_writer import BulkWriter
+import local_mirror
+from snapshots import load_snapshot, write_snapshot
+from mvp import MVP_VERSION, score_matches
+from scrapers import CURRENT_SEASON_TTL, SCORE_COLUMNS, add_score_columns, scrap_team_matchlogs, scrap_match_report, assign_match_teams
 
 seasons = ['2024-2025', '2023-2024', '2022-2023', '2021-2022', '2020-2021', 
            '2019-2020', '2018-2019', '2017-2018', '2016-2017', '2015-2016', '2014-2015']
 
+# Number of pages scraped concurrently; the request rate itself is capped by
+# the fbref rate limiter in scrapers.py
+SCRAPE_WORKERS = 4
+
 # App leagues and teams with their links
 EPL_dict = {
   "Arsenal":"https://fbref.com/en/squads/18bb7c10/",
@@ -128,8 +142,50 @@ leagues_teams = {
     'Ligue 1': Ligue1_dict
 }
 
-# Initialize connection with database
-supabase = st.connection("supabase", type=SupabaseConnection)
+# Rows returned per request (PostgREST default max-rows) and ids per in_() filter,
+# which keeps the request URL short
+PAGE_SIZE = 1000
+IN_FILTER_CHUNK_SIZE = 200
+
+# Shared read-through cache of query results (per process, so shared by all sessions).
+# Writes below invalidate what they touch in this process; the TTLs catch writes
+# made by other processes (python -m ingest, background jobs of another app instance).
+query_cache = QueryCache()
+TABLE_TTLS = {
+    "teams": 60 * 60,
+    "matches": 10 * 60,
+    "match_player_stats": 10 * 60,
+    "match_mvp_scores": 10 * 60,
+}
+# Finished seasons only change through backfills, so their results are kept longer
+FINISHED_SEASON_TTL = int(os.environ.get("STATFIELD_FINISHED_SEASON_TTL", 6 * 60 * 60))
+
+# TTL of a query result of the given season, as a callable of the result: empty
+# results of finished seasons (e.g. not backfilled yet) keep the table TTL
+def season_ttl(table, season):
+    def ttl(value):
+        if season == seasons[0] or _is_empty(value):
+            return TABLE_TTLS[table]
+        return FINISHED_SEASON_TTL
+    return ttl
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, pd.DataFrame):
+        return value.empty
+    return hasattr(value, "__len__") and len(value) == 0
+
+def get_query_cache_stats():
+    return query_cache.stats()
+
+# Version stamp of a team's season data, changed by every write to its matches
+# (and, given the team name, to its player stats)
+def get_data_version(team_id, season, team_name=None):
+    tags = [("matches", int(team_id), season)]
+    if team_name is not None:
+        tags.append(("player_season_stats", team_name))
+    return query_cache.version(*tags)
 
 # Database functions
 
@@ -210,6 +266,13 @@ def update_favourites(username, team, action):
 # -------------------------
 
 def get_all_teams():
+    return query_cache.get_or_load(
+        ("get_all_teams",), _fetch_all_teams, ttl=TABLE_TTLS["teams"], tags=[("teams", "all")]
+    )
+
+def _fetch_all_teams():
+    if use_local_mirror():
+        return local_mirror.read_frame("teams", columns=["id", "name", "league", "team_url"]).to_dict(orient="records")
     response = supabase.table("teams").select("id, name, league, team_url").execute()
     if response.data:
         return response.data
@@ -219,6 +282,11 @@ def update_team_data(team_id, updated_data):
     response = supabase.table("teams").update(updated_data).eq("id", team_id).execute()
     if not response.data:
         response.raise_when_api_error()
+    local_mirror.upsert_rows("teams", response.data)
+    tags = [("teams", "all"), ("teams", int(team_id))]
+    if "name" in updated_data:
+        tags.append(("teams", "name", updated_data["name"]))
+    query_cache.invalidate(*tags)
 
 def check_team_exists(name):
     response = supabase.table("teams").select("id").eq("name", name).execute()
@@ -232,19 +300,45 @@ def add_team(name, league, team_url):
     response = supabase.table("teams").insert({"name": name, "league": league, "team_url": team_url}).execute()
     if not response.data:
         response.raise_when_api_error()
+    local_mirror.upsert_rows("teams", response.data)
+    query_cache.invalidate(("teams", "all"), ("teams", "name", name))
 
 def delete_team(team_id):
     response = supabase.table("teams").delete().eq("id", team_id).execute()
     if not response.data:
         response.raise_when_api_error()
+    local_mirror.delete_rows("teams", [team_id])
+    query_cache.invalidate(("teams", "all"), ("teams", int(team_id)))
 
 def get_team_by_name(name):
+    return query_cache.get_or_load(
+        ("get_team_by_name", name),
+        lambda: _fetch_team_by_name(name),
+        ttl=TABLE_TTLS["teams"],
+        tags=lambda team: [("teams", "name", name)] + ([("teams", team["id"])] if team else [])
+    )
+
+def _fetch_team_by_name(name):
+    if use_local_mirror():
+        rows = local_mirror.read_frame("teams", filters={"name": name}).to_dict(orient="records")
+        return rows[0] if rows else None
     response = supabase.table("teams").select("*").eq("name", name).execute()
     if response.data:
         return response.data[0]
     return None
 
 def get_team_name_by_id(team_id):
+    return query_cache.get_or_load(
+        ("get_team_name_by_id", int(team_id)),
+        lambda: _fetch_team_name_by_id(team_id),
+        ttl=TABLE_TTLS["teams"],
+        tags=[("teams", int(team_id))]
+    )
+
+def _fetch_team_name_by_id(team_id):
+    if use_local_mirror():
+        rows = local_mirror.read_frame("teams", filters={"id": int(team_id)}, columns=["name"])
+        return rows["name"].iloc[0] if not rows.empty else None
     response = supabase.table("teams").select("name").eq("id", team_id).execute()
     if response.data:
         return response.data[0]["name"]
@@ -254,12 +348,24 @@ def get_team_name_by_id(team_id):
 # MATCHES
 # -------------------------
 
-def update_matchlogs(season=None, league=None, team_name=None, all_seasons=True):
+# The update functions report progress as report(event, **fields) instead of
+# writing to a page; the default logs each event with its fields
+WARNING_EVENTS = {"no_teams", "snapshot_missing", "matchlogs_missing", "matchlogs_failed", "no_matches", "no_report_link", "stats_missing", "stats_failed"}
+
+def log_progress(event, **fields):
+    level = logging.WARNING if event in WARNING_EVENTS else logging.INFO
+    logging.getLogger("ingest").log(level, event, extra={"event": event, "fields": fields})
+
+# With incremental=True scraped rows are compared with the stored ones by row_hash:
+# only new or changed fixtures are written, and the matches that just gained a
+# result are returned as (match, team name, season) entries for update_stats_for_matches.
+# max_age is the accepted age of a cached current-season page (0 fetches a fresh one).
+def update_matchlogs(season=None, league=None, team_name=None, all_seasons=True, workers=SCRAPE_WORKERS, report=log_progress, run_key=None, incremental=False, max_age=CURRENT_SEASON_TTL):
     teams = get_all_teams()
     if isinstance(teams, list):
         teams = pd.DataFrame(teams)
     if teams.empty:
-        st.warning("❌ No teams found in the database!")
+        report("no_teams")
         return
 
     if league:
@@ -271,90 +377,255 @@ def update_matchlogs(season=None, league=None, team_name=None, all_seasons=True)
         seasons_to_update = seasons
     else:
         seasons_to_update = [season] if season else [seasons[0]]
-    
-    st.info(f"🔄 Updating matchlogs for {len(teams)} team(s) across {len(seasons_to_update)} season(s)...")
-    for season_val in seasons_to_update:
-        for idx, team in teams.iterrows():
-            team_name_local = team["name"]
-            team_url = team["team_url"]
-            team_id = team["id"]
 
+    # Every team season is a unit of work; with a run_key completed units are skipped
+    checkpoints = get_checkpoint_store(run_key)
+    units = {
+        f"matchlogs:{team['id']}:{season_val}": (team, season_val)
+        for season_val in seasons_to_update
+        for idx, team in teams.iterrows()
+    }
+    pending = checkpoints.pending(units)
+    if len(pending) < len(units):
+        report("checkpoint_skipped", units=len(units) - len(pending))
+
+    report("matchlogs_started", teams=len(teams), seasons=len(seasons_to_update), units=len(pending))
+    # Pages are downloaded and parsed by the worker threads (paced by the shared
+    # fbref rate limiter), while upserts and progress messages stay in this thread
+    # Rows of many team seasons are written together by the bulk writer; a unit
+    # is checkpointed and reported once all of its rows are stored
+    failed = []
+    newly_played = []
+
+    def unit_callbacks(unit, team_name_local, season_val, stored, unchanged):
+        def on_flushed(rows):
+            checkpoints.mark_done(unit)
+            report("matchlogs_updated", team=team_name_local, season=season_val, rows=len(rows), unchanged=unchanged)
+            if incremental:
+                newly_played.extend(
+                    (match, team_name_local, season_val) for match in rows
+                    if match.get("result") and not stored.get(match_key(match), {}).get("result")
+                )
+
+        def on_failed(error):
+            report("matchlogs_failed", team=team_name_local, season=season_val, error=str(error))
+            checkpoints.mark_failed(unit, error)
+            failed.append(unit)
+        return on_flushed, on_failed
+
+    writer = BulkWriter(upsert_match, key=match_key, table="matches", report=report)
+    with writer, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for unit in pending:
+            team, season_val = units[unit]
+            team_url = team["team_url"]
             if season_val != seasons[0]: 
                 team_url = f"{team_url}{season_val}"
+                # Finished seasons are final, so their cached pages never expire
+                future = executor.submit(scrap_team_matchlogs, team_url, None)
+            else:
+                future = executor.submit(scrap_team_matchlogs, team_url, max_age)
+            futures[future] = (unit, team["id"], team["name"], season_val)
 
-            match_data = scrap_team_matchlogs(team_url)
-            if match_data:
+        for future in as_completed(futures):
+            unit, team_id, team_name_local, season_val = futures[future]
+            try:
+                match_data = future.result()
+                if not match_data:
+                    report("matchlogs_missing", team=team_name_local, season=season_val)
+                    checkpoints.mark_failed(unit, "No matchlogs found")
+                    failed.append(unit)
+                    continue
                 for match in match_data:
                     match["team_id"] = team_id
                     match["season"] = season_val
                 match_data = clean_data_for_db(match_data)
-                upsert_match(match_data)
-                st.success(f"✅ Updated matchlogs for {team_name_local} ({season_val})")
-            else:
-                st.warning(f"⚠️ No data found for {team_name_local} ({season_val})")
-    st.success("🎉 All team matchlogs have been updated!")
+                for match in match_data:
+                    match["row_hash"] = match_row_hash(match)
+                stored = {}
+                unchanged = 0
+                if incremental:
+                    stored = get_stored_match_hashes(team_id, season_val)
+                    changed = [match for match in match_data if stored.get(match_key(match), {}).get("row_hash") != match["row_hash"]]
+                    unchanged = len(match_data) - len(changed)
+                    match_data = changed
+            except Exception as e:
+                report("matchlogs_failed", team=team_name_local, season=season_val, error=str(e))
+                checkpoints.mark_failed(unit, e)
+                failed.append(unit)
+                continue
+            writer.add(match_data, *unit_callbacks(unit, team_name_local, season_val, stored, unchanged))
+    report("matchlogs_finished", failed=len(failed))
+    return newly_played
                                        
+# Match ids never change, so known links are served from the cache
 def get_match_id_by_report_link(match_report_link):
+    return query_cache.get_or_load(
+        ("get_match_id_by_report_link", match_report_link),
+        lambda: _fetch_match_id_by_report_link(match_report_link),
+        ttl=TABLE_TTLS["matches"],
+        should_cache=lambda match_id: match_id is not None
+    )
+
+def _fetch_match_id_by_report_link(match_report_link):
     response = supabase.table("matches").select("id").eq("match_report_link", match_report_link).execute()
     if response.data:
         return response.data[0]["id"]
     return None
 
+# Natural key of a matches row (the upsert conflict target)
+MATCH_CONFLICT_KEY = ["team_id", "opponent", "venue", "competition", "round", "season", "notes"]
+
+def match_key(match):
+    return tuple(match.get(col) for col in MATCH_CONFLICT_KEY)
+
+# Content hash of a scraped matches row, stored as row_hash to detect changes
+def match_row_hash(match):
+    content = {k: v for k, v in match.items() if k not in ("id", "row_hash")}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+# Stored row_hash and result of a team's matches in a season, by natural key.
+# Read straight from the database, as it decides what gets written.
+def get_stored_match_hashes(team_id, season):
+    rows = fetch_all_rows(
+        lambda: supabase.table("matches").select(", ".join(MATCH_CONFLICT_KEY + ["id", "result", "row_hash"]))
+        .eq("team_id", team_id).eq("season", season).order("id")
+    )
+    return {match_key(row): row for row in rows}
+
 def upsert_match(data):
     response = supabase.table("matches").upsert(
         data, 
-        on_conflict="team_id, opponent, venue, competition, round, season, notes"
+        on_conflict=", ".join(MATCH_CONFLICT_KEY)
     ).execute()
+    local_mirror.upsert_rows("matches", response.data)
+    query_cache.invalidate(*{("matches", int(record["team_id"]), record["season"]) for record in data})
     return response
 
 def get_team_matches_by_season(team_id, season):
     try:
-        response = supabase.table("matches").select("*").match({"team_id": team_id, "season": season}).execute()
-        if response.data:
-            return pd.DataFrame(response.data)
-        else:
-            return pd.DataFrame()
+        return query_cache.get_or_load(
+            ("get_team_matches_by_season", int(team_id), season),
+            lambda: _fetch_team_matches_by_season(team_id, season),
+            ttl=season_ttl("matches", season),
+            tags=[("matches", int(team_id), season)]
+        )
     except Exception as e:
-        st.error(f"Error fetching matches: {e}")
+        logging.error(f"Error fetching matches: {e}")
         return pd.DataFrame() 
-    
-def check_and_update_data(team_id, team_name, season, league, update_stats=False):
-    if "update_attempted" not in st.session_state:
-        st.session_state.update_attempted = False
 
-    df = get_team_matches_by_season(team_id, season)
-    if df.empty:
-        st.info("Updating matchlogs...")
-        if not st.session_state.update_attempted:
-            try:
-                update_matchlogs(season=season, league=league, team_name=team_name, all_seasons=False)
-            except Exception as e:
-                st.error("Update matchlogs failed: " + str(e))
-            st.session_state.update_attempted = True
-            st.rerun()
-        else:
-            st.error("Matchlogs update did not succeed. Continuing without updated data.")
-
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    past_missing = df[(df['date'].dt.date < datetime.date.today()) & (df['result'].isna())]
-    if not past_missing.empty:
-        if not st.session_state.update_attempted:
-            try:
-                update_matchlogs(season=season, league=league, team_name=team_name, all_seasons=False)
-                if update_stats:
-                    st.info(f"Also updating match stats for {team_name} in {season}")
-                    update_match_stats(season=season, league=league, team_name=team_name, all_seasons=False)
-            except Exception as e:
-                st.error("Error updating past matches: " + str(e))
-            st.session_state.update_attempted = True
-            st.rerun()
-        else:
-            st.info("Some past matches still have missing results. Please try again later – updates usually occur the day after the round of a competition is completed.")
+def _fetch_team_matches_by_season(team_id, season):
+    if use_local_mirror():
+        df = local_mirror.read_frame("matches", filters={"team_id": int(team_id), "season": season})
+        return with_score_columns(df) if not df.empty else df
+    response = supabase.table("matches").select("*").match({"team_id": team_id, "season": season}).execute()
+    if response.data:
+        return with_score_columns(pd.DataFrame(response.data))
+    return pd.DataFrame()
 
+# Numeric score columns are written at ingestion; they are only derived here
+# when the table predates them. Match dates are parsed here once for all pages.
+def with_score_columns(df):
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    if not set(SCORE_COLUMNS).issubset(df.columns):
+        return add_score_columns(df)
+    df[SCORE_COLUMNS] = df[SCORE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    return df
+    
 # -------------------------
 # PLAYERS MATCH STATS
 # -------------------------
 
+# FBref column -> match_player_stats column, in database column order
+PLAYER_STATS_COLUMNS = {
+    'Player': 'player_name',
+    'Shirt #': 'shirt_number',
+    'Nat': 'nationality',
+    'Pos': 'position',
+    'Age': 'age',
+    'Min': 'minutes_played',
+    'Performance_Gls': 'performance_gls',
+    'Performance_Ast': 'performance_ast',
+    'Performance_PK': 'performance_pk',
+    'Performance_PKatt': 'performance_pkatt',
+    'Performance_Sh': 'performance_sh',
+    'Performance_SoT': 'performance_sot',
+    'Performance_CrdY': 'performance_crdy',
+    'Performance_CrdR': 'performance_crdr',
+    'Performance_Fls': 'performance_fls',
+    'Performance_Fld': 'performance_fld',
+    'Performance_Off': 'performance_off',
+    'Performance_Crs': 'performance_crs',
+    'Performance_TklW': 'performance_tklw',
+    'Performance_Int': 'performance_int',
+    'Performance_OG': 'performance_og',
+    'Performance_PKwon': 'performance_pkwon',
+    'Performance_PKcon': 'performance_pkcon',
+    'Performance_Touches': 'performance_touches',
+    'Performance_Tkl': 'performance_tkl',
+    'Performance_Blocks': 'performance_blocks',
+    'Expected_xG': 'expected_xg',
+    'Expected_npxG': 'expected_npxg',
+    'Expected_xAG': 'expected_xag',
+    'SCA_SCA': 'sca_sca',
+    'SCA_GCA': 'sca_gca',
+    'Passes_Cmp': 'passes_cmp',
+    'Passes_Att': 'passes_att',
+    'Passes_Cmp%': 'passes_cmp_percent',
+    'Passes_PrgP': 'passes_prgp',
+    'Carries_Carries': 'carries_carries',
+    'Carries_PrgC': 'carries_prgc',
+    'Take-Ons_Att': 'take_ons_att',
+    'Take-Ons_Succ': 'take_ons_succ',
+    'Shot Stopping_SoTA': 'shot_stopping_sota',
+    'Shot Stopping_GA': 'shot_stopping_ga',
+    'Shot Stopping_Saves': 'shot_stopping_saves',
+    'Shot Stopping_Save%': 'shot_stopping_save_percent',
+    'Shot Stopping_PSxG': 'shot_stopping_psxg',
+    'Launched_Cmp': 'launched_cmp',
+    'Launched_Att': 'launched_att',
+    'Launched_Cmp%': 'launched_cmp_percent',
+    'Passes_Att (GK)': 'passes_att_gk',
+    'Passes_Thr': 'passes_thr',
+    'Passes_Launch%': 'passes_launch_percent',
+    'Passes_AvgLen': 'passes_avglen',
+    'Goal Kicks_Att': 'goal_kicks_att',
+    'Goal Kicks_Launch%': 'goal_kicks_launch_percent',
+    'Goal Kicks_AvgLen': 'goal_kicks_avglen',
+    'Crosses_Opp': 'crosses_opp',
+    'Crosses_Stp': 'crosses_stp',
+    'Crosses_Stp%': 'crosses_stp_percent',
+    'Sweeper_#OPA': 'sweeper_opa',
+    'Sweeper_AvgDist': 'sweeper_avgdist',
+    'Team': 'team',
+}
+PLAYER_STATS_CONFLICT_KEY = ["match_id", "team", "player_name", "shirt_number"]
+
+# Column types of match_player_stats. Metrics are float32, as fbref leaves cells
+# of players who did not take part in an action empty.
+PLAYER_STATS_DTYPES = {
+    "id": "int64",
+    "match_id": "int64",
+    "team": "category",
+    "player_name": "category",
+    "shirt_number": "float32",
+    "nationality": "category",
+    "position": "category",
+    "age": "string",
+    **{column: "float32" for column in PLAYER_STATS_COLUMNS.values()
+       if column not in ("team", "player_name", "shirt_number", "nationality", "position", "age")},
+}
+
+# Running sums kept per team, season and player in player_season_stats (updated
+# by a trigger on match_player_stats, see supabase/migrations; the local mirror
+# keeps its own copy). Percentages are kept as minute-weighted numerators.
+SEASON_STATS_METRICS = {
+    column: "weighted" if "percent" in column else "sum"
+    for column, dtype in PLAYER_STATS_DTYPES.items()
+    if dtype == "float32" and column not in ("shirt_number", "minutes_played")
+}
+
 # Prepare match stats records to upsert database
 def prepare_match_player_stats_records(player_df, goalkeeper_df, match_id):
     gk_from_players = player_df[player_df['Pos'] == 'GK']
@@ -378,110 +649,278 @@ def prepare_match_player_stats_records(player_df, goalkeeper_df, match_id):
 
     combined_df = pd.concat([player_df, gk_combined], ignore_index=True)
 
-    records = []
-
-    for _, row in combined_df.iterrows():
-        record = {
-            'match_id': match_id,
-            'player_name': row.get('Player', None),
-            'shirt_number': row.get('Shirt #', None),
-            'nationality': row.get('Nat', None),
-            'position': row.get('Pos', None),
-            'age': row.get('Age', None),
-            'minutes_played': row.get('Min', None),
-            'performance_gls': row.get('Performance_Gls', None),
-            'performance_ast': row.get('Performance_Ast', None),
-            'performance_pk': row.get('Performance_PK', None),
-            'performance_pkatt': row.get('Performance_PKatt', None),
-            'performance_sh': row.get('Performance_Sh', None),
-            'performance_sot': row.get('Performance_SoT', None),
-            'performance_crdy': row.get('Performance_CrdY', None),
-            'performance_crdr': row.get('Performance_CrdR', None),
-            'performance_fls': row.get('Performance_Fls', None),
-            'performance_fld': row.get('Performance_Fld', None),
-            'performance_off': row.get('Performance_Off', None),
-            'performance_crs': row.get('Performance_Crs', None),
-            'performance_tklw': row.get('Performance_TklW', None),
-            'performance_int': row.get('Performance_Int', None),
-            'performance_og': row.get('Performance_OG', None),
-            'performance_pkwon': row.get('Performance_PKwon', None),
-            'performance_pkcon': row.get('Performance_PKcon', None),
-            'performance_touches': row.get('Performance_Touches', None),
-            'performance_tkl': row.get('Performance_Tkl', None),
-            'performance_blocks': row.get('Performance_Blocks', None),
-            'expected_xg': row.get('Expected_xG', None),
-            'expected_npxg': row.get('Expected_npxG', None),
-            'expected_xag': row.get('Expected_xAG', None),
-            'sca_sca': row.get('SCA_SCA', None),
-            'sca_gca': row.get('SCA_GCA', None),
-            'passes_cmp': row.get('Passes_Cmp', None),
-            'passes_att': row.get('Passes_Att', None),
-            'passes_cmp_percent': row.get('Passes_Cmp%', None),
-            'passes_prgp': row.get('Passes_PrgP', None),
-            'carries_carries': row.get('Carries_Carries', None),
-            'carries_prgc': row.get('Carries_PrgC', None),
-            'take_ons_att': row.get('Take-Ons_Att', None),
-            'take_ons_succ': row.get('Take-Ons_Succ', None),
-            'shot_stopping_sota': row.get('Shot Stopping_SoTA', None),
-            'shot_stopping_ga': row.get('Shot Stopping_GA', None),
-            'shot_stopping_saves': row.get('Shot Stopping_Saves', None),
-            'shot_stopping_save_percent': row.get('Shot Stopping_Save%', None),
-            'shot_stopping_psxg': row.get('Shot Stopping_PSxG', None),
-            'launched_cmp': row.get('Launched_Cmp', None),
-            'launched_att': row.get('Launched_Att', None),
-            'launched_cmp_percent': row.get('Launched_Cmp%', None),
-            'passes_att_gk': row.get('Passes_Att (GK)', None),
-            'passes_thr': row.get('Passes_Thr', None),
-            'passes_launch_percent': row.get('Passes_Launch%', None),
-            'passes_avglen': row.get('Passes_AvgLen', None),
-            'goal_kicks_att': row.get('Goal Kicks_Att', None),
-            'goal_kicks_launch_percent': row.get('Goal Kicks_Launch%', None),
-            'goal_kicks_avglen': row.get('Goal Kicks_AvgLen', None),
-            'crosses_opp': row.get('Crosses_Opp', None),
-            'crosses_stp': row.get('Crosses_Stp', None),
-            'crosses_stp_percent': row.get('Crosses_Stp%', None),
-            'sweeper_opa': row.get('Sweeper_#OPA', None),
-            'sweeper_avgdist': row.get('Sweeper_AvgDist', None),
-            'team': row.get('Team', None),
-        }
+    # Select and rename the mapped columns (missing ones become empty), then
+    # deduplicate on the upsert key and turn NaN into None for the whole matrix
+    records_df = combined_df.reindex(columns=list(PLAYER_STATS_COLUMNS)).rename(columns=PLAYER_STATS_COLUMNS)
+    records_df.insert(0, 'match_id', match_id)
+    records_df = records_df.drop_duplicates(subset=PLAYER_STATS_CONFLICT_KEY)
 
-        for key, value in record.items():
-            if pd.isna(value):
-                record[key] = None
+    values = records_df.to_numpy(dtype=object)
+    values[pd.isna(values)] = None
+    columns = records_df.columns.tolist()
 
-        records.append(record)
+    return [dict(zip(columns, row)) for row in values.tolist()]
 
-    return records
+# Natural key of a match_player_stats row (the upsert conflict target)
+def player_stats_key(record):
+    return tuple(record.get(key) for key in PLAYER_STATS_CONFLICT_KEY)
 
-# Insert or update player stats
+# Insert or update player stats. Records are expected to come from
+# prepare_match_player_stats_records, so only duplicates across calls are dropped here.
 def upsert_players_stats(data):
-    df = pd.DataFrame(data)
-    df = df.drop_duplicates(subset=["match_id", "team", "player_name", "shirt_number"])
-    data = df.to_dict(orient="records")
-    cleaned_data = clean_data_for_db(data)
+    unique_records = {}
+    for record in data:
+        unique_records.setdefault(player_stats_key(record), record)
+    cleaned_data = list(unique_records.values())
     response = supabase.table("match_player_stats").upsert(
         cleaned_data,
-        on_conflict="match_id, team, player_name, shirt_number"
+        on_conflict=", ".join(PLAYER_STATS_CONFLICT_KEY)
     ).execute()
+    local_mirror.upsert_rows("match_player_stats", response.data, season_stats=SEASON_STATS_METRICS)
+    query_cache.invalidate(*{("match_player_stats", int(record["match_id"])) for record in cleaned_data})
+    query_cache.invalidate(*{("player_season_stats", record["team"]) for record in cleaned_data})
     return response
 
+# Convert a player stats frame to the types of PLAYER_STATS_DTYPES: categorical
+# dimensions (players, teams and positions repeat on every match row) and
+# float32 metrics instead of object/float64 columns. Logs the memory saved.
+def compact_player_stats(df):
+    if df.empty:
+        return df
+    before = df.memory_usage(deep=True).sum()
+    for column, dtype in PLAYER_STATS_DTYPES.items():
+        if column not in df.columns or dtype == "string":
+            continue
+        if dtype == "category":
+            df[column] = df[column].astype("category").cat.remove_unused_categories()
+        else:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+    after = df.memory_usage(deep=True).sum()
+    logging.info(f"Compacted player stats frame of {len(df)} rows: {before / 1024:.0f} KiB -> {after / 1024:.0f} KiB")
+    return df
+
+# Finished seasons with a Parquet snapshot are read from the snapshot (memory-mapped,
+# only the needed columns) instead of the database; returns None otherwise
+def _load_stats_snapshot(season, league, match_ids, team=None, columns=None):
+    if season is None or league is None or season == seasons[0]:
+        return None
+    snapshot = load_snapshot(league, season, columns=columns, team=team, match_ids=match_ids)
+    return compact_player_stats(snapshot) if snapshot is not None else None
+
+# Snapshot rows of the given matches and the ids the snapshot does not cover (e.g.
+# matches ingested after it was exported), which are left to the database.
+# Without a snapshot all ids are left to the database.
+def _load_stats_snapshot_covering(season, league, match_ids, team=None, columns=None):
+    read_columns = list(dict.fromkeys(["match_id"] + list(columns))) if columns else None
+    snapshot = _load_stats_snapshot(season, league, match_ids, team, read_columns)
+    if snapshot is None:
+        return None, match_ids
+    covered = set(snapshot["match_id"].astype(int)) if not snapshot.empty else set()
+    if columns and "match_id" not in columns:
+        snapshot = snapshot.drop(columns="match_id")
+    return snapshot, [mid for mid in match_ids if mid not in covered]
+
+# Snapshot rows followed by the rows read from the database
+def _combine_stats(snapshot, stats):
+    frames = [df for df in (snapshot, stats) if df is not None and not df.empty]
+    if not frames:
+        return snapshot if snapshot is not None else stats
+    if len(frames) == 1:
+        return frames[0]
+    return compact_player_stats(pd.concat(frames, ignore_index=True))
+
 # Fetch players stats for a given match
-def get_players_stats(match_id):
+def get_players_stats(match_id, season=None, league=None):
+    snapshot = _load_stats_snapshot(season, league, [match_id])
+    if snapshot is not None and not snapshot.empty:
+        return snapshot
+    return query_cache.get_or_load(
+        ("get_players_stats", int(match_id)),
+        lambda: _fetch_players_stats(match_id),
+        ttl=TABLE_TTLS["match_player_stats"],
+        tags=[("match_player_stats", int(match_id))],
+        # Stats missing now are usually scraped right away, so do not remember the miss
+        should_cache=lambda df: not df.empty
+    )
+
+def _fetch_players_stats(match_id):
+    if use_local_mirror():
+        return compact_player_stats(local_mirror.read_frame("match_player_stats", filters={"match_id": int(match_id)}))
     response = supabase.table("match_player_stats").select("*").eq("match_id", match_id).execute()
     if response.data:
-        return pd.DataFrame(response.data)
+        return compact_player_stats(pd.DataFrame(response.data))
+    return pd.DataFrame()
+
+# Fetch players stats for many matches at once, optionally for one team and a
+# subset of columns (both filters are applied by the database). Passing the
+# season and league lets finished seasons be served from their snapshot.
+def get_players_stats_bulk(match_ids, team=None, columns=None, season=None, league=None):
+    match_ids = list(dict.fromkeys(int(mid) for mid in match_ids))
+    snapshot, match_ids = _load_stats_snapshot_covering(season, league, match_ids, team, columns)
+    if snapshot is not None and not match_ids:
+        return snapshot
+    stats = query_cache.get_or_load(
+        ("get_players_stats_bulk", tuple(sorted(match_ids)), team, tuple(columns) if columns else None),
+        lambda: _fetch_players_stats_bulk(match_ids, team, columns),
+        ttl=TABLE_TTLS["match_player_stats"],
+        tags=[("match_player_stats", mid) for mid in match_ids]
+    )
+    return _combine_stats(snapshot, stats)
+
+def _fetch_players_stats_bulk(match_ids, team, columns):
+    if use_local_mirror():
+        filters = {"team": team} if team is not None else None
+        return compact_player_stats(
+            local_mirror.read_frame("match_player_stats", filters=filters, in_filter=("match_id", match_ids), columns=columns)
+        )
+    select = ", ".join(columns) if columns else "*"
+
+    def build_query(chunk):
+        query = supabase.table("match_player_stats").select(select).in_("match_id", chunk)
+        if team is not None:
+            query = query.eq("team", team)
+        return query.order("id")
+
+    rows = []
+    for chunk in chunked(match_ids, IN_FILTER_CHUNK_SIZE):
+        rows.extend(fetch_all_rows(lambda: build_query(chunk)))
+    if rows:
+        return compact_player_stats(pd.DataFrame(rows))
     return pd.DataFrame()
 
+# Per-player season aggregates of one team's matches: appearances, the positions
+# of every appearance (comma separated, so shares of positions can be counted),
+# sums, per-match averages and per-90 rates of sums. Computed by the database
+# (player_season_totals() in supabase/migrations, or the same query on the local
+# mirror), so pages download one row per player instead of one per appearance.
+SEASON_SUM_COLUMNS = [
+    "minutes_played", "performance_gls", "performance_ast", "performance_sh", "performance_sot",
+    "expected_xg", "expected_xag", "sca_sca", "sca_gca", "passes_cmp", "passes_att", "passes_prgp",
+    "carries_carries", "carries_prgc", "take_ons_att", "take_ons_succ", "performance_tkl",
+    "performance_int", "performance_blocks",
+]
+SEASON_AVG_COLUMNS = ["expected_xg", "expected_xag", "passes_cmp_percent", "passes_prgp", "carries_prgc"]
+SEASON_PER90_COLUMNS = [column for column in SEASON_SUM_COLUMNS if column != "minutes_played"]
+SEASON_TOTALS_COLUMNS = (
+    ["player_name", "positions", "matches"] + SEASON_SUM_COLUMNS
+    + [f"{column}_avg" for column in SEASON_AVG_COLUMNS]
+    + [f"{column}_per90" for column in SEASON_PER90_COLUMNS]
+)
+
+def get_player_season_totals(match_ids, team, season=None, league=None):
+    match_ids = list(dict.fromkeys(int(mid) for mid in match_ids))
+    if not match_ids:
+        return pd.DataFrame(columns=SEASON_TOTALS_COLUMNS)
+    # Snapshot rows are local already, so they are aggregated in memory together
+    # with the rows of matches the snapshot does not cover
+    snapshot, missing = _load_stats_snapshot_covering(season, league, match_ids, team)
+    if snapshot is not None:
+        if missing:
+            snapshot = _combine_stats(snapshot, get_players_stats_bulk(missing, team))
+        return aggregate_player_season(snapshot)
+    return query_cache.get_or_load(
+        ("get_player_season_totals", tuple(sorted(match_ids)), team),
+        lambda: _fetch_player_season_totals(match_ids, team),
+        ttl=TABLE_TTLS["match_player_stats"],
+        tags=[("match_player_stats", mid) for mid in match_ids]
+    )
+
+def _fetch_player_season_totals(match_ids, team):
+    if use_local_mirror():
+        placeholders = ", ".join("?" for _ in match_ids)
+        totals = local_mirror.read_query(
+            _season_totals_sql(f"match_id in ({placeholders}) and team = ?", "group_concat"),
+            [*match_ids, team], tables=["match_player_stats"]
+        )
+    else:
+        try:
+            response = supabase.rpc("player_season_totals", {"p_match_ids": match_ids, "p_team": team}).execute()
+            totals = pd.DataFrame(response.data or [])
+        except Exception as e:
+            # Databases without the migration aggregate the raw rows here
+            logging.warning(f"player_season_totals() failed, aggregating player stats locally: {e}")
+            return aggregate_player_season(_fetch_players_stats_bulk(match_ids, team, None))
+    if totals is None or totals.empty:
+        return pd.DataFrame(columns=SEASON_TOTALS_COLUMNS)
+    numeric = SEASON_TOTALS_COLUMNS[2:]
+    totals[numeric] = totals[numeric].apply(pd.to_numeric, errors="coerce")
+    return totals[SEASON_TOTALS_COLUMNS]
+
+# Aggregate query over match_player_stats rows matching where; concat names the
+# string aggregate of the dialect (string_agg in Postgres, group_concat in SQLite)
+def _season_totals_sql(where, concat):
+    minutes = "sum(minutes_played)"
+    selects = ["player_name", f"{concat}(position, ',') as positions", "count(*) as matches"]
+    selects += [f"coalesce(sum({column}), 0) as {column}" for column in SEASON_SUM_COLUMNS]
+    selects += [f"avg({column}) as {column}_avg" for column in SEASON_AVG_COLUMNS]
+    selects += [f"coalesce(sum({column}), 0) * 90.0 / nullif({minutes}, 0) as {column}_per90" for column in SEASON_PER90_COLUMNS]
+    return f"select {', '.join(selects)} from match_player_stats where {where} group by player_name order by player_name"
+
+# The same aggregates from raw player stats rows (snapshots, or databases without
+# the player_season_totals() function)
+def aggregate_player_season(stats):
+    if stats.empty:
+        return pd.DataFrame(columns=SEASON_TOTALS_COLUMNS)
+    stats = stats.reindex(columns=list(dict.fromkeys(["player_name", "position"] + SEASON_SUM_COLUMNS + SEASON_AVG_COLUMNS)))
+    grouped = stats.groupby("player_name", observed=True, sort=True)
+    totals = grouped[SEASON_SUM_COLUMNS].sum().astype("float64")
+    totals.insert(0, "matches", grouped.size())
+    totals.insert(0, "positions", grouped["position"].agg(lambda x: ",".join(x.dropna().astype(str))))
+    averages = grouped[SEASON_AVG_COLUMNS].mean().astype("float64").add_suffix("_avg")
+    minutes = totals["minutes_played"].where(totals["minutes_played"] != 0)
+    per90 = totals[SEASON_PER90_COLUMNS].mul(90.0).div(minutes, axis=0).add_suffix("_per90")
+    totals = pd.concat([totals, averages, per90], axis=1).reset_index()
+    # Categories keep the snapshot's order, so sort by name as the database does
+    totals["player_name"] = totals["player_name"].astype(object)
+    totals = totals.sort_values("player_name", ignore_index=True)
+    return totals[SEASON_TOTALS_COLUMNS]
+
+# Season sums of every player of a team (one row per player, see SEASON_STATS_METRICS)
+def get_player_season_stats(team, season):
+    return query_cache.get_or_load(
+        ("get_player_season_stats", team, season),
+        lambda: _fetch_player_season_stats(team, season),
+        ttl=season_ttl("match_player_stats", season),
+        tags=[("player_season_stats", team)]
+    )
+
+def _fetch_player_season_stats(team, season):
+    if use_local_mirror():
+        local_mirror.ensure_season_stats(SEASON_STATS_METRICS)
+        return local_mirror.read_frame("player_season_stats", filters={"team": team, "season": season})
+    rows = fetch_all_rows(
+        lambda: supabase.table("player_season_stats").select("*").eq("team", team).eq("season", season).order("id")
+    )
+    return pd.DataFrame(rows)
+
+# Per-90 rates from season sums, indexed by player: sums x 90 / minutes, and
+# percentages weighted by minutes. Keeps minutes_played, appearances and position.
+def season_per90(season_stats):
+    if season_stats.empty:
+        return pd.DataFrame()
+    season_stats = season_stats.set_index("player_name")
+    minutes = pd.to_numeric(season_stats["minutes_played"], errors="coerce")
+    rates = {}
+    for metric, kind in SEASON_STATS_METRICS.items():
+        column = local_mirror.season_stats_column(metric, kind)
+        if column not in season_stats.columns:
+            continue
+        values = pd.to_numeric(season_stats[column], errors="coerce")
+        rates[metric] = values / minutes if kind == "weighted" else values * 90 / minutes
+    per90 = pd.DataFrame(rates, index=season_stats.index)
+    per90.insert(0, "minutes_played", minutes)
+    per90["appearances"] = season_stats["appearances"]
+    per90["position"] = season_stats["position"]
+    return per90
+
 # Fetch players stats by match id and teams
-def get_match_player_stats_by_team(match_id, team_1, team_2):
+def get_match_player_stats_by_team(match_id, team_1, team_2, season=None, league=None):
     try:
-        response = supabase.table("match_player_stats").select("*").eq("match_id", match_id).execute()
+        stats_df = get_players_stats(match_id, season=season, league=league)
 
-        if not response.data:
+        if stats_df.empty:
             return (pd.DataFrame(), pd.DataFrame()), (pd.DataFrame(), pd.DataFrame())
 
-        stats_df = pd.DataFrame(response.data)
-
         stats_df["team_norm"] = stats_df["team"].apply(normalize_str)
         team_1_norm = normalize_str(team_1)
         team_2_norm = normalize_str(team_2)
@@ -498,21 +937,232 @@ def get_match_player_stats_by_team(match_id, team_1, team_2):
         return (team_1_field_players, team_1_keepers), (team_2_field_players, team_2_keepers)
 
     except Exception as e:
+        logging.error(f"Error fetching match player stats: {e}")
         return (pd.DataFrame(), pd.DataFrame()), (pd.DataFrame(), pd.DataFrame())
 
 # Checks if the statistics are already in database    
 def stats_exist(match_id):
-    response = supabase.table("match_player_stats").select("id").eq("match_id", match_id).execute()
-    if response.data and len(response.data) > 0:
-        return True
-    return False
+    return match_id in get_match_ids_with_stats([match_id])
+
+# Returns the subset of match ids that already have player statistics in database
+def get_match_ids_with_stats(match_ids):
+    match_ids = list(dict.fromkeys(int(mid) for mid in match_ids))
+    return query_cache.get_or_load(
+        ("get_match_ids_with_stats", tuple(sorted(match_ids))),
+        lambda: _fetch_match_ids_with_stats(match_ids),
+        ttl=TABLE_TTLS["match_player_stats"],
+        tags=[("match_player_stats", mid) for mid in match_ids]
+    )
+
+# One row per match: distinct ids from match_ids_with_stats() (supabase/migrations),
+# or from the same query on the local mirror
+def _fetch_match_ids_with_stats(match_ids):
+    found = set()
+    if use_local_mirror():
+        for chunk in chunked(match_ids, local_mirror.IN_FILTER_CHUNK_SIZE):
+            rows = local_mirror.read_query(
+                f"select distinct match_id from match_player_stats where match_id in ({', '.join('?' for _ in chunk)})",
+                chunk, tables=["match_player_stats"]
+            )
+            if rows is not None:
+                found.update(rows["match_id"].astype(int))
+        return found
+    try:
+        response = supabase.rpc("match_ids_with_stats", {"p_match_ids": match_ids}).execute()
+        return {int(row["match_id"]) for row in response.data or []}
+    except Exception as e:
+        # Databases without the migration page through the stats rows instead
+        logging.warning(f"match_ids_with_stats() failed, reading player stats rows: {e}")
+    for chunk in chunked(match_ids, IN_FILTER_CHUNK_SIZE):
+        rows = fetch_all_rows(
+            lambda: supabase.table("match_player_stats").select("match_id").in_("match_id", chunk).order("id")
+        )
+        found.update(row["match_id"] for row in rows)
+    return found
 
-def update_match_stats(season=None, league=None, team_name=None, all_seasons=True):
+# -------------------------
+# MVP SCORES
+# -------------------------
+
+MVP_CONFLICT_KEY = ["match_id", "team", "player_name", "mvp_version"]
+# Stored player stats rows collected by an ingestion run before they are MVP scored
+MVP_SCORE_BATCH_ROWS = int(os.environ.get("STATFIELD_MVP_SCORE_BATCH_ROWS", 20000))
+
+# Score the matches of the given player stats (complete matches, e.g. the rows
+# stored by an ingestion run) with the current weight set (mvp.MVP_VERSION) and
+# store the scores in match_mvp_scores. Kept off upsert_players_stats, so bulk
+# writes stay single requests; ingestion scores what it stored once it is done.
+def store_mvp_scores(stats):
+    rows = compute_mvp_scores(stats)
+    for chunk in chunked(rows, PAGE_SIZE):
+        response = supabase.table("match_mvp_scores").upsert(chunk, on_conflict=", ".join(MVP_CONFLICT_KEY)).execute()
+        local_mirror.upsert_rows("match_mvp_scores", response.data)
+    query_cache.invalidate(*{("match_mvp_scores", row["match_id"]) for row in rows})
+    query_cache.invalidate(*{("match_mvp_scores", row["team_id"], row["season"]) for row in rows})
+    return rows
+
+# match_mvp_scores rows of the matches in a player stats frame. A match is scored
+# from the point of view of the team of its matches row, whose result sets the
+# multipliers; matches without touches data get no scores. Match rows are read
+# in one batch and team names come from the cached teams list.
+def compute_mvp_scores(stats):
+    if stats.empty:
+        return []
+    match_ids = list(dict.fromkeys(int(mid) for mid in stats["match_id"]))
+    matches = _fetch_matches_by_id(match_ids)
+    if matches.empty:
+        return []
+    team_names = {team["id"]: normalize_str(team["name"]) for team in get_all_teams()}
+
+    stats = stats.assign(team=stats["team"].astype(object), player_name=stats["player_name"].astype(object))
+    teams_by_match = stats.groupby("match_id")["team"].unique()
+    results = {}
+    for match in matches.itertuples():
+        team_norm = team_names.get(match.team_id)
+        own = [team for team in teams_by_match.get(match.id, []) if normalize_str(team) == team_norm]
+        if own:
+            results[int(match.id)] = (own[0], match.result)
+
+    # Players of the reporting team first, as the dashboard lists them, so ties rank alike
+    stats = stats[stats["match_id"].isin(list(results))]
+    reported = stats["match_id"].map({match_id: team for match_id, (team, _) in results.items()})
+    stats = stats.assign(opponent=stats["team"] != reported).sort_values(["match_id", "opponent"], kind="stable")
+    keepers = stats["position"] == "GK"
+    scores = score_matches(stats[~keepers], stats[keepers], results)
+    if scores.empty:
+        return []
+
+    matches = matches.set_index("id")
+    scores["team_id"] = scores["match_id"].map(matches["team_id"])
+    scores["season"] = scores["match_id"].map(matches["season"])
+    scores["mvp_version"] = MVP_VERSION
+    return scores[["match_id", "team_id", "season", "team", "player_name", "mvp_score", "mvp_rank", "mvp_version"]].to_dict("records")
+
+# Store the MVP scores of stats rows written by an ingestion run. Scores are
+# derived data: a failure is logged and the stats are kept.
+def store_ingested_mvp_scores(rows, report=log_progress):
+    if not rows:
+        return
+    try:
+        # Compacted like the frames pages read, so stored and live scores agree
+        scored = store_mvp_scores(compact_player_stats(pd.DataFrame(rows)))
+    except Exception as e:
+        logging.warning(f"Storing MVP scores failed: {e}")
+        return
+    report("mvp_scored", matches=len({row["match_id"] for row in scored}))
+
+def _fetch_matches_by_id(match_ids, columns=("id", "team_id", "season", "result")):
+    if use_local_mirror():
+        return local_mirror.read_frame("matches", in_filter=("id", match_ids), columns=list(columns))
+    rows = []
+    for chunk in chunked(match_ids, IN_FILTER_CHUNK_SIZE):
+        rows.extend(fetch_all_rows(
+            lambda: supabase.table("matches").select(", ".join(columns)).in_("id", chunk).order("id")
+        ))
+    return pd.DataFrame(rows)
+
+# Stored MVP ranking of a match as [(player, score), ...], best first; None when
+# the match has no scores of the current weight set
+def get_match_mvp_scores(match_id):
+    return query_cache.get_or_load(
+        ("get_match_mvp_scores", int(match_id)),
+        lambda: _fetch_match_mvp_scores(match_id),
+        ttl=TABLE_TTLS["match_mvp_scores"],
+        tags=[("match_mvp_scores", int(match_id))],
+        should_cache=lambda scores: scores is not None
+    )
+
+def _fetch_match_mvp_scores(match_id):
+    if use_local_mirror():
+        rows = local_mirror.read_frame(
+            "match_mvp_scores", filters={"match_id": int(match_id), "mvp_version": MVP_VERSION},
+            columns=["player_name", "mvp_score", "mvp_rank"]
+        )
+        rows = rows.sort_values("mvp_rank").to_dict(orient="records") if not rows.empty else []
+    else:
+        rows = supabase.table("match_mvp_scores").select("player_name, mvp_score").match(
+            {"match_id": int(match_id), "mvp_version": MVP_VERSION}
+        ).order("mvp_rank").execute().data
+    if rows:
+        return [(row["player_name"], float(row["mvp_score"])) for row in rows]
+    return None
+
+# Season MVP leaderboard of a team's own players from the stored scores
+def get_season_mvp_leaderboard(team_id, team_name, season):
+    return query_cache.get_or_load(
+        ("get_season_mvp_leaderboard", int(team_id), season),
+        lambda: _fetch_season_mvp_leaderboard(team_id, team_name, season),
+        ttl=season_ttl("match_mvp_scores", season),
+        tags=[("match_mvp_scores", int(team_id), season)]
+    )
+
+def _fetch_season_mvp_leaderboard(team_id, team_name, season):
+    filters = {"team_id": int(team_id), "season": season, "mvp_version": MVP_VERSION}
+    if use_local_mirror():
+        return mvp_leaderboard(local_mirror.read_frame(
+            "match_mvp_scores", filters=filters, columns=["match_id", "team", "player_name", "mvp_score", "mvp_rank"]
+        ), team_name)
+    rows = fetch_all_rows(
+        lambda: supabase.table("match_mvp_scores").select("match_id, team, player_name, mvp_score, mvp_rank").match(filters).order("id")
+    )
+    return mvp_leaderboard(pd.DataFrame(rows), team_name)
+
+# One row per player of the team: MVP awards (rank 1), top-3 finishes, matches
+# scored and average MVP score, most awards first
+def mvp_leaderboard(scores, team_name):
+    columns = ["player_name", "mvp_awards", "top_3", "matches", "avg_mvp_score"]
+    if scores.empty:
+        return pd.DataFrame(columns=columns)
+    own = scores[scores["team"].map(normalize_str) == normalize_str(team_name)]
+    own = own.assign(
+        mvp_score=pd.to_numeric(own["mvp_score"]),
+        mvp_award=own["mvp_rank"] == 1,
+        top_3=own["mvp_rank"] <= 3
+    )
+    board = own.groupby("player_name").agg(
+        mvp_awards=("mvp_award", "sum"),
+        top_3=("top_3", "sum"),
+        matches=("match_id", "nunique"),
+        avg_mvp_score=("mvp_score", "mean")
+    )
+    board = board.sort_values(["mvp_awards", "top_3", "avg_mvp_score"], ascending=False)
+    return board.reset_index()[columns]
+
+# Score every played match with stats again, e.g. after MVP_VERSION changed.
+# Each team season is scored in one pass.
+def update_mvp_scores(season=None, league=None, team_name=None, all_seasons=True, report=log_progress):
+    teams = pd.DataFrame(get_all_teams())
+    if teams.empty:
+        report("no_teams")
+        return
+
+    if league:
+        teams = teams[teams['league'] == league]
+    if team_name:
+        teams = teams[teams['name'] == team_name]
+
+    if all_seasons:
+        seasons_to_update = seasons
+    else:
+        seasons_to_update = [season] if season else [seasons[0]]
+
+    for season_val in seasons_to_update:
+        for idx, team in teams.iterrows():
+            matches = get_team_matches_by_season(team["id"], season_val)
+            if matches.empty:
+                report("no_matches", team=team["name"], season=season_val)
+                continue
+            played = matches.loc[matches["result"].notna(), "id"].tolist()
+            stats = get_players_stats_bulk(played, season=season_val, league=team["league"]) if played else pd.DataFrame()
+            rows = store_mvp_scores(stats)
+            report("mvp_scored", team=team["name"], season=season_val, matches=len({row["match_id"] for row in rows}))
+
+def update_match_stats(season=None, league=None, team_name=None, all_seasons=True, workers=SCRAPE_WORKERS, report=log_progress, run_key=None):
     teams = get_all_teams()
     if isinstance(teams, list):
         teams = pd.DataFrame(teams)
     if teams.empty:
-        st.warning("❌ No teams found in the database!")
+        report("no_teams")
         return
 
     if league:
@@ -525,44 +1175,248 @@ def update_match_stats(season=None, league=None, team_name=None, all_seasons=Tru
     else:
         seasons_to_update = [season] if season else [seasons[0]]
     
-    st.info(f"🔄 Updating match stats for {len(teams)} team(s) across {len(seasons_to_update)} season(s)...")
+    report("stats_started", teams=len(teams), seasons=len(seasons_to_update))
+    # Both teams of a fixture store their own match row with the same report link,
+    # so the work is keyed on the link: each report is downloaded and parsed once
+    # and its stats are attached to every match row that references it
+    played = []
     for season_val in seasons_to_update:
         for idx, team in teams.iterrows():
             team_id = team["id"]
             team_name_local = team["name"]
             matches = get_team_matches_by_season(team_id, season_val)
             if matches.empty:
-                st.warning(f"⚠️ No matches found for {team_name_local} in {season_val}")
+                report("no_matches", team=team_name_local, season=season_val)
                 continue
 
             played_matches = matches[matches["result"].notna()]
             for idx2, match in played_matches.iterrows():
-                match_id = match["id"]
-                match_report_link = match["match_report_link"]
-                opponent = match["opponent"]
-                venue = match["venue"]
+                played.append((match, team_name_local, season_val))
+
+    update_stats_for_matches(played, workers=workers, report=report, run_key=run_key)
+
+# Scrape and store the player stats of the given (match, team name, season) entries
+# that have none yet; match is a matches row with id, match_report_link, opponent and venue
+def update_stats_for_matches(played, workers=SCRAPE_WORKERS, report=log_progress, run_key=None):
+    with_stats = get_match_ids_with_stats([match["id"] for match, _, _ in played])
+
+    reports = {}
+    for match, team_name_local, season_val in played:
+        match_id = match["id"]
+        match_report_link = match["match_report_link"]
+        opponent = match["opponent"]
+        venue = match["venue"]
+
+        if match_id in with_stats:
+            continue
+        if not match_report_link:
+            report("no_report_link", team=team_name_local, opponent=opponent, season=season_val)
+            continue
+
+        reports.setdefault(match_report_link, []).append((match_id, team_name_local, opponent, venue, season_val))
+
+    # Every match report is a unit of work; with a run_key completed units are skipped
+    checkpoints = get_checkpoint_store(run_key)
+    units = {f"report:{link}": link for link in reports}
+    pending = [units[unit] for unit in checkpoints.pending(units)]
+    if len(pending) < len(reports):
+        report("checkpoint_skipped", units=len(reports) - len(pending))
+
+    report("stats_reports", reports=len(pending), matches=sum(len(reports[link]) for link in pending))
+    # Stats of many reports are written together by the bulk writer; a report is
+    # checkpointed and its matches reported once all of its rows are stored.
+    # Every match ends with one stats_updated, stats_missing or stats_failed event.
+    # Stored rows of completed reports are MVP scored in batches of MVP_SCORE_BATCH_ROWS
+    # and after the last flush, off the write path.
+    failed = []
+    unscored = []
+
+    def report_failed(link, matches, error):
+        for team_name_local, opponent, season_val in matches:
+            report("stats_failed", team=team_name_local, opponent=opponent, season=season_val, link=link, error=str(error))
+
+    def report_callbacks(link, updated, missing):
+        unit = f"report:{link}"
+
+        def on_flushed(rows):
+            unscored.extend(rows)
+            for team_name_local, opponent, season_val, rows_count in updated:
+                report("stats_updated", team=team_name_local, opponent=opponent, season=season_val, rows=rows_count)
+            # Reports without player tables may be completed later, so they are retried
+            if missing:
+                checkpoints.mark_failed(unit, f"No player stats for {missing} match(es)")
+                failed.append(unit)
+            else:
+                checkpoints.mark_done(unit)
+
+        def on_failed(error):
+            report_failed(link, [(team_name_local, opponent, season_val) for team_name_local, opponent, season_val, _ in updated], error)
+            checkpoints.mark_failed(unit, error)
+            failed.append(unit)
+        return on_flushed, on_failed
+
+    writer = BulkWriter(upsert_players_stats, key=player_stats_key, table="match_player_stats", report=report)
+    with writer, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(scrap_match_report, link): link for link in pending}
+
+        for future in as_completed(futures):
+            link = futures[future]
+            link_records = []
+            updated = []
+            missing = []
+            try:
+                match_report = future.result()
+                for match_id, team_name_local, opponent, venue, season_val in reports[link]:
+                    if match_report is None:
+                        report("stats_missing", team=team_name_local, opponent=opponent, season=season_val)
+                        missing.append(match_id)
+                        continue
+                    field_players_stats_df, keepers_stats_df = assign_match_teams(match_report, team_name_local, opponent, venue)
+                    if field_players_stats_df.empty or keepers_stats_df.empty:
+                        report("stats_missing", team=team_name_local, opponent=opponent, season=season_val)
+                        missing.append(match_id)
+                        continue
+                    records = prepare_match_player_stats_records(field_players_stats_df, keepers_stats_df, match_id)
+                    if not records:
+                        report("stats_missing", team=team_name_local, opponent=opponent, season=season_val)
+                        missing.append(match_id)
+                        continue
+                    link_records.extend(records)
+                    updated.append((team_name_local, opponent, season_val, len(records)))
+            except Exception as e:
+                report_failed(link, [
+                    (team_name_local, opponent, season_val)
+                    for match_id, team_name_local, opponent, venue, season_val in reports[link]
+                    if match_id not in missing
+                ], e)
+                checkpoints.mark_failed(f"report:{link}", e)
+                failed.append(f"report:{link}")
+                continue
+            writer.add(link_records, *report_callbacks(link, updated, len(missing)))
+            if len(unscored) >= MVP_SCORE_BATCH_ROWS:
+                store_ingested_mvp_scores(unscored, report)
+                unscored.clear()
+    store_ingested_mvp_scores(unscored, report)
+    report("stats_finished", failed=len(failed))
+
+# Write the Parquet snapshot of a finished league season: the player stats of
+# every match of the league's teams in that season
+def export_season_snapshot(league, season, report=log_progress):
+    if season == seasons[0]:
+        raise ValueError(f"{season} is still being played, only finished seasons are snapshotted.")
+
+    teams = pd.DataFrame(get_all_teams())
+    match_ids = []
+    for team_id in teams.loc[teams["league"] == league, "id"]:
+        matches = get_team_matches_by_season(team_id, season)
+        if not matches.empty:
+            match_ids.extend(int(mid) for mid in matches["id"])
+
+    stats = _fetch_players_stats_bulk(list(dict.fromkeys(match_ids)), None, None)
+    if stats.empty:
+        report("snapshot_missing", league=league, season=season)
+        return None
+    path = write_snapshot(stats, league, season, PLAYER_STATS_DTYPES)
+    report("snapshot_written", league=league, season=season, rows=len(stats), path=path)
+    return path
 
-                if stats_exist(match_id):
-                    continue
-                if not match_report_link:
-                    st.warning(f"⚠️ No match report link for {team_name_local} vs {opponent} ({season_val})")
-                    continue
+# -------------------------
+# LOCAL MIRROR
+# -------------------------
 
-                st.write(f"📊 Updating stats for {team_name_local} vs {opponent} ({season_val})...")
-                field_players_stats_df, keepers_stats_df = scrap_match_stats(match_report_link, team_name_local, opponent, venue)
-                if field_players_stats_df.empty or keepers_stats_df.empty:
-                    st.warning(f"⚠️ No player stats available for {team_name_local} vs {opponent} ({season_val})")
-                    continue
-                records = prepare_match_player_stats_records(field_players_stats_df, keepers_stats_df, match_id)
-                if records:
-                    upsert_players_stats(records)
-                    st.success(f"✅ Stats updated for {team_name_local} vs {opponent} ({season_val})")
-    st.success("🎉 All match stats have been updated!")
+_mirror_sync_lock = threading.Lock()
+
+# Copy new rows into the local mirror: teams are copied whole (small, and catches
+# renames and deletes), the other tables page through the rows above the mirrored
+# id watermark. Matches, player stats and MVP scores of the current season are
+# read again too, as re-scrapes and rescoring upsert them in place (same id).
+def sync_local_mirror(tables=local_mirror.MIRROR_TABLES, report=log_progress):
+    with _mirror_sync_lock:
+        _sync_local_mirror(tables, report)
+
+def _sync_local_mirror(tables, report):
+    for table in tables:
+        if table == "teams":
+            rows = fetch_all_rows(lambda: supabase.table("teams").select("*").order("id"))
+            local_mirror.upsert_rows("teams", rows, replace_all=True)
+            report("mirror_synced", table=table, rows=len(rows))
+            continue
+
+        synced = 0
+        watermark = local_mirror.watermark(table)
+        while True:
+            rows = supabase.table(table).select("*").gt("id", watermark).order("id").limit(PAGE_SIZE).execute().data or []
+            local_mirror.upsert_rows(table, rows, season_stats=SEASON_STATS_METRICS if table == "match_player_stats" else None)
+            synced += len(rows)
+            if len(rows) < PAGE_SIZE:
+                break
+            watermark = rows[-1]["id"]
+        if table == "matches":
+            rows = fetch_all_rows(lambda: supabase.table("matches").select("*").eq("season", seasons[0]).order("id"))
+            local_mirror.upsert_rows("matches", rows)
+        elif table == "match_player_stats":
+            current = local_mirror.read_frame("matches", filters={"season": seasons[0]}, columns=["id"])
+            match_ids = current["id"].astype(int).tolist() if not current.empty else []
+            for chunk in chunked(match_ids, IN_FILTER_CHUNK_SIZE):
+                rows = fetch_all_rows(lambda: supabase.table("match_player_stats").select("*").in_("match_id", chunk).order("id"))
+                local_mirror.upsert_rows("match_player_stats", rows, season_stats=SEASON_STATS_METRICS)
+        elif table == "match_mvp_scores":
+            rows = fetch_all_rows(lambda: supabase.table("match_mvp_scores").select("*").eq("season", seasons[0]).order("id"))
+            local_mirror.upsert_rows("match_mvp_scores", rows)
+        report("mirror_synced", table=table, rows=synced, watermark=local_mirror.watermark(table))
+    local_mirror.ensure_season_stats(SEASON_STATS_METRICS)
+    local_mirror.mark_synced()
+    # Cached reads were served from the mirror as it was before the sync
+    query_cache.clear()
+
+def _sync_local_mirror_in_background():
+    try:
+        _sync_local_mirror(local_mirror.MIRROR_TABLES, log_progress)
+    except Exception as e:
+        # Retried after the next interval instead of on every read
+        logging.warning(f"Local mirror sync failed, serving the last synced data: {e}")
+        local_mirror.mark_synced()
+    finally:
+        _mirror_sync_lock.release()
+
+# Whether reads are served from the local mirror. A due sync runs in a background
+# thread (one at a time) and reads keep being served from the last synced data;
+# only a mirror that was never synced is filled before the first read.
+def use_local_mirror():
+    if not local_mirror.MIRROR_ENABLED:
+        return False
+    if local_mirror.last_synced_at() is None:
+        try:
+            sync_local_mirror()
+        except Exception as e:
+            logging.warning(f"Local mirror sync failed, serving the last synced data: {e}")
+            local_mirror.mark_synced()
+    elif local_mirror.needs_sync() and _mirror_sync_lock.acquire(blocking=False):
+        threading.Thread(target=_sync_local_mirror_in_background, name="mirror-sync", daemon=True).start()
+    return True
 
 # -------------------------
 # UTILITY FUNCTIONS
 # -------------------------
 
+# Split a list into consecutive chunks of at most size elements
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# Runs a select page by page, as PostgREST caps the rows of a single response.
+# build_query must return a fresh, ordered query builder on every call.
+def fetch_all_rows(build_query, page_size=PAGE_SIZE):
+    rows = []
+    start = 0
+    while True:
+        response = build_query().range(start, start + page_size - 1).execute()
+        data = response.data or []
+        rows.extend(data)
+        if len(data) < page_size:
+            return rows
+        start += page_size
+
 # Replace NaN values with None or empty  
 def clean_data_for_db(data):
     if isinstance(data, list): 
@@ -588,92 +1442,3 @@ def normalize_str(s):
     normalized = unicodedata.normalize('NFKD', s)
     ascii_bytes = normalized.encode('ASCII', 'ignore')
     return ascii_bytes.decode('utf-8').lower()
-
-
-# Additional function to calculate display key team metrics
-def calculate_and_display_key_team_metrics(df, selected_season, selected_team):
-        total_wins = df[df['result'] == 'W'].shape[0]
-        total_draws = df[df['result'] == 'D'].shape[0]
-        total_losses = df[df['result'] == 'L'].shape[0]
-        matches_played = total_wins + total_draws + total_losses
-
-        df_played = df.dropna(subset=['result']).sort_values(by='date').reset_index(drop=True)
-
-        current_streak = 0
-        for result in reversed(df_played['result']):
-            if result in ['W', 'D']:
-                current_streak += 1
-            else:
-                break
-
-        longest_streak = 0
-        temp_streak = 0
-        for result in df_played['result']:
-            if result in ['W', 'D']:
-                temp_streak += 1
-                longest_streak = max(longest_streak, temp_streak)
-            else:
-                temp_streak = 0
-
-        gf_values = df_played['gf'].apply(
-            lambda x: float(x.split('(')[0]) if isinstance(x, str) else float(x) if pd.notna(x) else 0.0
-        )
-        ga_values = df_played['ga'].apply(
-            lambda x: float(x.split('(')[0]) if isinstance(x, str) else float(x) if pd.notna(x) else 0.0
-        )
-
-        average_goals_for = gf_values.mean()
-        average_goals_against = ga_values.mean()
-        total_goals_for = gf_values.sum()
-        total_goals_against = ga_values.sum()
-        average_possession = df_played['possession'].mean()
-
-        df['xg_filled'] = df.apply(
-        lambda row: float(row['gf'].split('(')[0]) if pd.isna(row['xg']) and isinstance(row['gf'], str)
-        else float(row['gf']) if pd.isna(row['xg']) and pd.notna(row['gf'])
-        else float(row['xg'].split('(')[0]) if isinstance(row['xg'], str)
-        else row['xg'], axis=1
-        )
-        df['xga_filled'] = df.apply(
-            lambda row: float(row['ga'].split('(')[0]) if pd.isna(row['xga']) and isinstance(row['ga'], str)
-            else float(row['ga']) if pd.isna(row['xga']) and pd.notna(row['ga'])
-            else float(row['xga'].split('(')[0]) if isinstance(row['xga'], str)
-            else row['xga'], axis=1
-        )
-
-        df['xg_filled'] = pd.to_numeric(df['xg_filled'], errors='coerce')
-        df['xga_filled'] = pd.to_numeric(df['xga_filled'], errors='coerce')
-
-        average_xG = df['xg_filled'].mean(skipna=True)
-        total_xG = df['xg_filled'].sum(skipna=True)
-        average_xGA = df['xga_filled'].mean(skipna=True)
-        total_xGA = df['xga_filled'].sum(skipna=True)
-
-
-        home_matches = df[df['venue'] == 'Home']
-        average_home_attendance = home_matches['attendance'].mean()
-
-
-        st.subheader(f"Key {selected_team} metrics for season {selected_season}")
-
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric(label="📅 Matches played", value=f"{matches_played}")
-            st.metric(label="🎯⚽ Goals For", value=f"{total_goals_for:.0f}")
-            st.metric(label="🎯 Total xG", value=f"{total_xG:.1f}" if total_xG is not None else "No data")
-            st.metric(label="⏳ Average Possession", value=f"{average_possession:.1f}%")
-        with col2:
-            st.metric(label="🏆 Wins", value=f"{total_wins}")
-            st.metric(label="❌⚽ Goals Against", value=f"{total_goals_against:.0f}")
-            st.metric(label="❌ Total xGA", value=f"{total_xGA:.1f}" if total_xGA is not None else "No data")
-            st.metric(label="👥 Average Home Attendance", value=f"{average_home_attendance:.0f}") 
-        with col3:
-            st.metric(label="🤝 Draws", value=f"{total_draws}")
-            st.metric(label="⚽📈 Average Goals For", value=f"{average_goals_for:.1f}")
-            st.metric(label="🎯📊 Average xG", value=f"{average_xG:.1f}" if average_xG is not None else "No data")
-            st.metric(label="🔥 Current Unbeaten Streak", value=f"{current_streak}")
-        with col4:
-            st.metric(label="❌ Losses", value=f"{total_losses}")
-            st.metric(label="⚽📉 Average Goals Against", value=f"{average_goals_against:.1f}")
-            st.metric(label="❌📊 Average xGA", value=f"{average_xGA:.1f}" if average_xGA is not None else "No data")
-            st.metric(label="🔥 Longest Unbeaten Streak", value=f"{longest_streak}")
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+import threading
+
+# Supabase client shared by the data layer. Inside a running Streamlit app the
+# st.connection("supabase") resource is used, so the app keeps reading its
+# credentials from st.secrets. Anywhere else (CLI, cron, worker containers) a
+# plain supabase client is created from SUPABASE_URL / SUPABASE_KEY, falling
+# back to the [connections.supabase] section of .streamlit/secrets.toml.
+SECRETS_PATH = os.environ.get("SUPABASE_SECRETS_FILE", os.path.join(".streamlit", "secrets.toml"))
+
+_client = None
+_client_lock = threading.Lock()
+
+def _streamlit_running():
+    try:
+        from streamlit import runtime
+    except ImportError:
+        return False
+    return runtime.exists()
+
+def _load_credentials():
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_KEY")
+    if url and key:
+        return url, key
+
+    try:
+        import tomllib
+        with open(SECRETS_PATH, "rb") as f:
+            secrets = tomllib.load(f)
+    except FileNotFoundError:
+        secrets = {}
+    section = secrets.get("connections", {}).get("supabase", {})
+    url = url or section.get("SUPABASE_URL")
+    key = key or section.get("SUPABASE_KEY")
+    if not url or not key:
+        raise RuntimeError(
+            f"Supabase credentials not found. Set SUPABASE_URL and SUPABASE_KEY or add them to {SECRETS_PATH}."
+        )
+    return url, key
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if _streamlit_running():
+                    import streamlit as st
+                    from st_supabase_connection import SupabaseConnection
+                    _client = st.connection("supabase", type=SupabaseConnection)
+                else:
+                    from supabase import create_client
+                    _client = create_client(*_load_credentials())
+    return _client
+
+# Stand-in for the client that connects on first use, so importing the data
+# layer never needs credentials or a Streamlit runtime
+class LazyClient:
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+supabase = LazyClient()
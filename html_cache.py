@@ -0,0 +1,58 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+# Local cache of raw fbref pages, stored gzip-compressed under the SHA-256 of the URL
+HTML_CACHE_DIR = os.environ.get("FBREF_HTML_CACHE_DIR", os.path.join(".cache", "fbref_html"))
+HTML_CACHE_ENABLED = os.environ.get("FBREF_HTML_CACHE", "1") != "0"
+
+# Pages of the current season change after every round, everything else is final
+CURRENT_SEASON_TTL = 6 * 60 * 60
+
+def _cache_path(url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(HTML_CACHE_DIR, key[:2], f"{key}.html.gz")
+
+# Return the cached page or None; max_age=None means the entry never expires
+def get_cached_page(url, max_age=None):
+    if not HTML_CACHE_ENABLED:
+        return None
+
+    path = _cache_path(url)
+    try:
+        if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError) as e:
+        logging.warning(f"Discarding unreadable cache entry for {url}: {e}")
+        invalidate_cached_page(url)
+        return None
+
+def store_page(url, html):
+    if not HTML_CACHE_ENABLED:
+        return
+
+    path = _cache_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so concurrent readers never see a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            f.write(html.encode("utf-8"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Unable to cache {url}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def invalidate_cached_page(url):
+    try:
+        os.remove(_cache_path(url))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,87 @@
+import argparse
+import datetime
+import json
+import logging
+import sys
+
+from database import SCRAPE_WORKERS, seasons, leagues_teams, update_matchlogs, update_match_stats, update_stats_for_matches, update_mvp_scores, sync_local_mirror, export_season_snapshot
+
+# Command-line entry point for the fbref refreshes, e.g. from cron or a worker container:
+#   python -m ingest matchlogs --league "Serie A" --season 2023-2024 --workers 4
+#   python -m ingest stats --team Arsenal --all-seasons --run-key arsenal-backfill
+#   python -m ingest all --incremental
+#   STATFIELD_LOCAL_MIRROR=1 python -m ingest mirror
+#   python -m ingest snapshot --league "Serie A"
+#   python -m ingest mvp --all-seasons
+# Progress is written to stderr as one JSON object per line.
+
+# One JSON object per log record; progress events carry their fields at the top level
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None) or record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def configure_logging(level):
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ingest", description="Refresh fbref data in the database.")
+    parser.add_argument("target", choices=("matchlogs", "stats", "all", "mirror", "snapshot", "mvp"),
+                        help="matchlogs, match player stats, matchlogs followed by stats, a sync of the local mirror, "
+                             "Parquet snapshots of finished seasons, or MVP scores of the stored stats (after a weight change)")
+    parser.add_argument("--league", choices=list(leagues_teams), help="only teams of this league")
+    parser.add_argument("--team", help="only this team")
+    season_group = parser.add_mutually_exclusive_group()
+    season_group.add_argument("--season", choices=seasons, help=f"season to refresh (default {seasons[0]})")
+    season_group.add_argument("--all-seasons", action="store_true", help="refresh every season")
+    parser.add_argument("--workers", type=int, default=SCRAPE_WORKERS, help="concurrent page downloads")
+    parser.add_argument("--incremental", action="store_true",
+                        help="write only new or changed fixtures; with 'all' only matches that just gained a result get their stats scraped")
+    parser.add_argument("--run-key", help="checkpoint the run under this key; running again with it resumes the run")
+    parser.add_argument("--log-level", default="INFO", help="logging level (default INFO)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(args.log_level.upper())
+
+    options = dict(season=args.season, league=args.league, team_name=args.team,
+                   all_seasons=args.all_seasons, workers=args.workers, run_key=args.run_key)
+    try:
+        if args.target == "mirror":
+            sync_local_mirror()
+            return 0
+        if args.target == "snapshot":
+            # Without --season every finished season is exported
+            for league in [args.league] if args.league else list(leagues_teams):
+                for season in [args.season] if args.season else seasons[1:]:
+                    export_season_snapshot(league, season)
+            return 0
+        if args.target == "mvp":
+            update_mvp_scores(season=args.season, league=args.league, team_name=args.team, all_seasons=args.all_seasons)
+            return 0
+        if args.target in ("matchlogs", "all"):
+            newly_played = update_matchlogs(**options, incremental=args.incremental)
+        if args.target == "all" and args.incremental:
+            # update_matchlogs returns None when it stops early (e.g. no teams)
+            if newly_played:
+                update_stats_for_matches(newly_played, workers=args.workers, run_key=args.run_key)
+        elif args.target in ("stats", "all"):
+            update_match_stats(**options)
+    except Exception:
+        logging.getLogger("ingest").exception("ingest_failed")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
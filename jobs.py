@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import log_progress, update_matchlogs, update_match_stats
+from local_db import LOCAL_DB_DIR, connect
+
+# Background jobs for the long fbref refreshes. Jobs are recorded in a local
+# SQLite table and run by a worker pool owned by the process, so they keep
+# running across Streamlit reruns and closed browser tabs.
+JOBS_DB_PATH = os.environ.get("STATFIELD_JOBS_DB", os.path.join(LOCAL_DB_DIR, "jobs.sqlite3"))
+# Jobs share the fbref rate limiter, so running more than one at a time does not speed anything up
+JOB_WORKERS = int(os.environ.get("STATFIELD_JOB_WORKERS", 1))
+
+JOB_KINDS = {
+    "matchlogs": update_matchlogs,
+    "stats": update_match_stats,
+}
+
+# Progress events that complete one unit of work (a team season or a match row),
+# successfully or not, so failed units count towards the total too
+UNIT_EVENTS = {"matchlogs_updated", "matchlogs_missing", "matchlogs_failed", "stats_updated", "stats_missing", "stats_failed"}
+
+SCHEMA = """
+create table if not exists jobs (
+    id integer primary key autoincrement,
+    kind text not null,
+    params text not null,
+    status text not null default 'queued',
+    total integer,
+    done integer not null default 0,
+    progress text not null default '{}',
+    message text,
+    error text,
+    created_at real not null,
+    started_at real,
+    finished_at real
+)
+"""
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _connect():
+    return connect(JOBS_DB_PATH, SCHEMA)
+
+def _update_job(job_id, **fields):
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    with _connect() as conn:
+        conn.execute(f"update jobs set {columns} where id = ?", [*fields.values(), job_id])
+
+# The pool is created once per process. Jobs left running or queued by a previous
+# process are submitted again; their checkpoints let them resume where they stopped.
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+            with _connect() as conn:
+                conn.execute("update jobs set status = 'queued', done = 0, progress = '{}' where status = 'running'")
+                queued = [row["id"] for row in conn.execute("select id from jobs where status = 'queued' order by id")]
+            for job_id in queued:
+                _executor.submit(_run_job, job_id)
+        return _executor
+
+# Add a job and return its id immediately; params are passed to the update function
+def enqueue_job(kind, **params):
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    executor = _get_executor()
+    with _connect() as conn:
+        job_id = conn.execute(
+            "insert into jobs (kind, params, created_at) values (?, ?, ?)",
+            (kind, json.dumps(params), time.time())
+        ).lastrowid
+    executor.submit(_run_job, job_id)
+    return job_id
+
+# Progress reporter of a running job: counts finished units per team and
+# stores them together with the latest event in the job table
+class JobReporter:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.done = 0
+        self.progress = {}
+
+    def __call__(self, event, **fields):
+        log_progress(event, job_id=self.job_id, **fields)
+        updates = {"message": " ".join([event] + [str(value) for value in fields.values()])}
+        if event == "matchlogs_started":
+            updates["total"] = fields["units"]
+        elif event == "stats_reports":
+            updates["total"] = fields["matches"]
+        elif event in UNIT_EVENTS:
+            self.done += 1
+            self.progress[fields["team"]] = self.progress.get(fields["team"], 0) + 1
+            updates["done"] = self.done
+            updates["progress"] = json.dumps(self.progress)
+        _update_job(self.job_id, **updates)
+
+def _run_job(job_id):
+    with _connect() as conn:
+        job = conn.execute("select kind, params from jobs where id = ?", (job_id,)).fetchone()
+    _update_job(job_id, status="running", started_at=time.time())
+    try:
+        JOB_KINDS[job["kind"]](**json.loads(job["params"]), report=JobReporter(job_id), run_key=f"job-{job_id}")
+    except Exception as e:
+        logging.exception(f"Job {job_id} failed")
+        _update_job(job_id, status="failed", error=str(e), finished_at=time.time())
+    else:
+        _update_job(job_id, status="finished", finished_at=time.time())
+
+# Latest jobs, newest first, with throughput (units per minute) and ETA in seconds
+def list_jobs(limit=20):
+    with _connect() as conn:
+        rows = [dict(row) for row in conn.execute("select * from jobs order by id desc limit ?", (limit,))]
+
+    now = time.time()
+    for job in rows:
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        job["throughput"] = None
+        job["eta"] = None
+        if job["started_at"] and job["done"]:
+            elapsed = (job["finished_at"] or now) - job["started_at"]
+            rate = job["done"] / elapsed if elapsed > 0 else None
+            if rate:
+                job["throughput"] = rate * 60
+                if job["status"] == "running" and job["total"]:
+                    job["eta"] = max(job["total"] - job["done"], 0) / rate
+    return rows
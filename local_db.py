@@ -0,0 +1,21 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# Local SQLite files used for bookkeeping next to the app (jobs, checkpoints)
+LOCAL_DB_DIR = os.environ.get("STATFIELD_LOCAL_DB_DIR", ".cache")
+
+# Short-lived connection per operation (sqlite3 connections must stay in the
+# thread that created them); creates the schema, commits on success and is always closed
+@contextmanager
+def connect(path, schema):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("pragma journal_mode=wal")
+        conn.executescript(schema)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,234 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+from local_db import LOCAL_DB_DIR, connect
+
+# Optional local copy of the teams, matches, match_player_stats and
+# match_mvp_scores tables in SQLite. When enabled, the read functions of
+# database.py are served from it, so page latency does not depend on the round
+# trip to Supabase and the app can run offline against a synced (or hand-filled)
+# file. Tables take their columns from the synced rows, so no schema has to be
+# kept in step with the database.
+MIRROR_ENABLED = os.environ.get("STATFIELD_LOCAL_MIRROR", "0") == "1"
+MIRROR_DB_PATH = os.environ.get("STATFIELD_MIRROR_DB", os.path.join(LOCAL_DB_DIR, "mirror.sqlite3"))
+# Seconds after which reads trigger an incremental sync; 0 never syncs on read (offline use)
+MIRROR_SYNC_INTERVAL = int(os.environ.get("STATFIELD_MIRROR_SYNC_INTERVAL", 600))
+
+MIRROR_TABLES = ("teams", "matches", "match_player_stats", "match_mvp_scores")
+IN_FILTER_CHUNK_SIZE = 500
+
+SCHEMA = """
+create table if not exists mirror_meta (
+    key text primary key,
+    value text
+);
+create table if not exists player_season_stats (
+    id integer primary key,
+    team text not null,
+    season text not null,
+    player_name text not null,
+    position text,
+    appearances integer not null default 0,
+    minutes_played real not null default 0,
+    unique (team, season, player_name)
+);
+"""
+
+def _connect():
+    return connect(MIRROR_DB_PATH, SCHEMA)
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _columns(conn, table):
+    return [row["name"] for row in conn.execute(f"pragma table_info({_quote(table)})")]
+
+# Create the table or add the columns it is missing
+def _ensure_columns(conn, table, columns):
+    existing = _columns(conn, table)
+    if not existing:
+        conn.execute(f"create table {_quote(table)} (id integer primary key)")
+        existing = ["id"]
+    for column in columns:
+        if column not in existing:
+            conn.execute(f"alter table {_quote(table)} add column {_quote(column)}")
+            existing.append(column)
+
+def _value(value):
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+# Insert or replace rows by id. With season_stats ({metric: "sum" | "weighted"})
+# the rows are player stats, and the running sums of player_season_stats are
+# moved from the replaced rows to the new ones.
+def upsert_rows(table, rows, replace_all=False, season_stats=None):
+    if not MIRROR_ENABLED or (not rows and not replace_all):
+        return
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    with _connect() as conn:
+        if replace_all and _columns(conn, table):
+            conn.execute(f"delete from {_quote(table)}")
+        if not rows:
+            return
+        _ensure_columns(conn, table, columns)
+        if season_stats:
+            replaced = _rows_by_id(conn, table, [row["id"] for row in rows])
+            _apply_season_stats(conn, replaced, -1, season_stats)
+        conn.executemany(
+            f"insert or replace into {_quote(table)} ({', '.join(map(_quote, columns))}) "
+            f"values ({', '.join('?' for _ in columns)})",
+            [[_value(row.get(column)) for column in columns] for row in rows]
+        )
+        if season_stats:
+            _apply_season_stats(conn, rows, 1, season_stats)
+
+def _rows_by_id(conn, table, ids):
+    rows = []
+    for start in range(0, len(ids), IN_FILTER_CHUNK_SIZE):
+        chunk = ids[start:start + IN_FILTER_CHUNK_SIZE]
+        rows.extend(dict(row) for row in conn.execute(
+            f"select * from {_quote(table)} where id in ({', '.join('?' for _ in chunk)})", chunk
+        ))
+    return rows
+
+def season_stats_column(metric, kind):
+    return f"{metric}_weighted" if kind == "weighted" else metric
+
+def _number(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+# Add (sign=1) or remove (sign=-1) player stats rows from the per-player season
+# sums. "weighted" metrics (percentages) are summed as value x minutes. The season
+# comes from the mirrored matches, which are written before their stats. A
+# fixture's stats are stored under the match row of each tracked team, so only
+# rows of the team owning the match row are counted.
+def _apply_season_stats(conn, rows, sign, season_stats):
+    if not rows or not _columns(conn, "matches") or not _columns(conn, "teams"):
+        return
+    match_ids = list({row["match_id"] for row in rows})
+    owners = {}
+    for start in range(0, len(match_ids), IN_FILTER_CHUNK_SIZE):
+        chunk = match_ids[start:start + IN_FILTER_CHUNK_SIZE]
+        owners.update((row["id"], (row["season"], row["name"])) for row in conn.execute(
+            f"select m.id, m.season, t.name from matches m join teams t on t.id = m.team_id "
+            f"where m.id in ({', '.join('?' for _ in chunk)})", chunk
+        ))
+
+    columns = [season_stats_column(metric, kind) for metric, kind in season_stats.items()]
+    _ensure_columns(conn, "player_season_stats", columns)
+    insert_columns = ["team", "season", "player_name", "position", "appearances", "minutes_played"] + columns
+    updates = ["position = coalesce(position, excluded.position)"] + [
+        f"{_quote(column)} = coalesce({_quote(column)}, 0) + excluded.{_quote(column)}"
+        for column in insert_columns[4:]
+    ]
+    params = []
+    for row in rows:
+        season, owner = owners.get(row["match_id"], (None, None))
+        if season is None or row["team"] != owner:
+            continue
+        minutes = _number(row.get("minutes_played"))
+        values = [
+            _number(row.get(metric)) * (minutes if kind == "weighted" else 1)
+            for metric, kind in season_stats.items()
+        ]
+        position = row.get("position") if sign > 0 else None
+        params.append([row["team"], season, row["player_name"], position, sign, sign * minutes]
+                      + [sign * value for value in values])
+    conn.executemany(
+        f"insert into player_season_stats ({', '.join(map(_quote, insert_columns))}) "
+        f"values ({', '.join('?' for _ in insert_columns)}) "
+        f"on conflict (team, season, player_name) do update set {', '.join(updates)}",
+        params
+    )
+    conn.execute("delete from player_season_stats where appearances <= 0")
+
+# Rebuild player_season_stats from the mirrored player stats when it was built by
+# an older SEASON_STATS_VERSION (or before the table existed)
+SEASON_STATS_VERSION = 2
+
+def ensure_season_stats(season_stats):
+    if not MIRROR_ENABLED:
+        return
+    with _connect() as conn:
+        version = conn.execute("select value from mirror_meta where key = 'season_stats_version'").fetchone()
+        if not _columns(conn, "match_player_stats") or (version and int(version["value"]) == SEASON_STATS_VERSION):
+            return
+        conn.execute("delete from player_season_stats")
+        rows = [dict(row) for row in conn.execute("select * from match_player_stats")]
+        _apply_season_stats(conn, rows, 1, season_stats)
+        conn.execute(
+            "insert or replace into mirror_meta (key, value) values ('season_stats_version', ?)", (str(SEASON_STATS_VERSION),)
+        )
+
+def delete_rows(table, ids):
+    if not MIRROR_ENABLED:
+        return
+    with _connect() as conn:
+        if _columns(conn, table):
+            conn.executemany(f"delete from {_quote(table)} where id = ?", [(int(row_id),) for row_id in ids])
+
+# Highest id already mirrored; rows above it are fetched by the next sync
+def watermark(table):
+    with _connect() as conn:
+        if not _columns(conn, table):
+            return 0
+        return conn.execute(f"select coalesce(max(id), 0) from {_quote(table)}").fetchone()[0]
+
+def last_synced_at():
+    with _connect() as conn:
+        row = conn.execute("select value from mirror_meta where key = 'synced_at'").fetchone()
+    return float(row["value"]) if row else None
+
+def mark_synced():
+    with _connect() as conn:
+        conn.execute("insert or replace into mirror_meta (key, value) values ('synced_at', ?)", (str(time.time()),))
+
+def needs_sync():
+    if MIRROR_SYNC_INTERVAL <= 0:
+        return False
+    synced_at = last_synced_at()
+    return synced_at is None or time.time() - synced_at > MIRROR_SYNC_INTERVAL
+
+# Rows of a mirrored table as a DataFrame: equality filters, an optional
+# (column, values) membership filter and an optional subset of columns
+def read_frame(table, filters=None, in_filter=None, columns=None):
+    with _connect() as conn:
+        existing = _columns(conn, table)
+        if not existing:
+            return pd.DataFrame()
+        selected = [column for column in columns if column in existing] if columns else existing
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            clauses.append(f"{_quote(column)} = ?")
+            params.append(value)
+        query = f"select {', '.join(map(_quote, selected))} from {_quote(table)}"
+        if in_filter is None:
+            where = f" where {' and '.join(clauses)}" if clauses else ""
+            return pd.read_sql_query(f"{query}{where} order by id", conn, params=params)
+
+        # Membership filters are split to stay below SQLite's bound parameter limit
+        column, values = in_filter
+        values = list(values)
+        frames = []
+        for start in range(0, len(values), IN_FILTER_CHUNK_SIZE):
+            chunk = values[start:start + IN_FILTER_CHUNK_SIZE]
+            chunk_clauses = clauses + [f"{_quote(column)} in ({', '.join('?' for _ in chunk)})"]
+            frames.append(pd.read_sql_query(
+                f"{query} where {' and '.join(chunk_clauses)} order by id", conn, params=params + chunk
+            ))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+# Result of a read-only query over mirrored tables as a DataFrame; None while
+# one of the given tables has not been mirrored yet
+def read_query(query, params=(), tables=()):
+    with _connect() as conn:
+        if not all(_columns(conn, table) for table in tables):
+            return None
+        return pd.read_sql_query(query, conn, params=list(params))
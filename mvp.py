@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+# MVP scoring of match player stats. The rules are applied to whole columns, so
+# one call scores a single match or every match of a season. MVP_VERSION
+# identifies the rule set and must change with any weight or rule below: the
+# scores stored in match_mvp_scores are keyed by it, and `python -m ingest mvp`
+# rescores the stored matches.
+MVP_VERSION = 1
+
+FIELD_PLAYER_WEIGHTS = {
+    'performance_gls': 1.5,
+    'performance_ast': 0.5,
+    'performance_sh': 0.1,
+    'performance_sot': 0.2,
+    'performance_touches': 0.01,
+    'performance_tkl': 0.2,
+    'performance_int': 0.2,
+    'performance_blocks': 0.2,
+    'expected_xag': 0.5,
+    'sca_sca': 0.2,
+    'sca_gca': 0.5,
+    'passes_cmp': 0.01,
+    'passes_cmp_percent': 0.01,
+    'passes_prgp': 0.05,
+    'carries_carries': 0.01,
+    'carries_prgc': 0.05,
+    'take_ons_att': 0.02,
+    'take_ons_succ': 0.05,
+    'performance_crdy': -1,
+    'performance_crdr': -2
+}
+
+KEEPER_WEIGHTS = {
+    'shot_stopping_ga': -0.5,
+    'shot_stopping_saves': 0.15,
+    'shot_stopping_save_percent': 0.01
+}
+
+WINNING_TEAM_MULTIPLIER = 1.1  # Small boost for winning team
+LOSING_TEAM_MULTIPLIER = 0.9  # Small penalty for losing team
+MISSED_PENALTY_WEIGHT = 2
+MIN_TAKE_ONS = 5
+TAKE_ON_SUCCESS_THRESHOLD = 0.4
+TAKE_ON_WEIGHT = 2
+PSXG_SAVED_WEIGHT = 1.5
+PSXG_CONCEDED_WEIGHT = 1
+SOTA_SAVED_WEIGHT = 0.5
+
+INSUFFICIENT_DATA = "Insufficient data to calculate MVP for this match."
+
+PLAYER_KEY = ['match_id', 'player_name']
+
+def _column(df, name):
+    if name not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[name], errors="coerce").astype("float64")
+
+# a - b where both are known, 0 elsewhere; None when a column is missing
+def _known_difference(df, a, b):
+    if a not in df.columns or b not in df.columns:
+        return None
+    return (_column(df, a) - _column(df, b)).fillna(0.0).to_numpy()
+
+# Weighted sum of the stats, missing values counting as 0
+def _weighted_sum(df, weights):
+    matrix = np.column_stack([_column(df, stat).fillna(0.0).to_numpy() for stat in weights])
+    return matrix @ np.array(list(weights.values()), dtype="float64")
+
+# One row per match and player: the values of its last row at the position of its first
+def _last_per_player(scores):
+    first = scores.loc[~scores.duplicated(PLAYER_KEY, keep='first'), PLAYER_KEY]
+    last = scores.drop_duplicates(PLAYER_KEY, keep='last').set_index(PLAYER_KEY)
+    return last.reindex(pd.MultiIndex.from_frame(first)).reset_index()
+
+# Score every player of the given matches. field and keepers are match_player_stats
+# rows (with match_id, team and player_name); results maps each match_id to the
+# (team, result) pair the result is reported for: with 'W' that team's field
+# players get the winning multiplier and the opponents the losing one, and the
+# reverse with 'L'. Keepers are scored on top of their field score (if any) and
+# only the reporting team's keeper gets a multiplier.
+# Matches without any touches data are left out. Returns match_id, team,
+# player_name, mvp_score and mvp_rank (1 = MVP), best first within each match.
+def score_matches(field, keepers, results):
+    field = field.reset_index(drop=True)
+    keepers = keepers.reset_index(drop=True)
+    has_touches = _column(field, 'performance_touches').notna().groupby(field['match_id']).any()
+    scored = set(has_touches[has_touches].index)
+    field = field[field['match_id'].isin(scored)]
+    keepers = keepers[keepers['match_id'].isin(scored)] if not keepers.empty else keepers
+
+    field_scores = _score_field_players(field, results)
+    keeper_scores = _score_keepers(keepers, results, field_scores)
+    # Like a dict keyed by player: a later row replaces the score of an earlier
+    # one but keeps its position, so ties rank in the order players were listed
+    if not keeper_scores.empty:
+        field_scores = pd.concat([field_scores, keeper_scores], ignore_index=True)
+    scores = _last_per_player(field_scores)
+    scores = scores.sort_values(['match_id', 'mvp_score'], ascending=[True, False], kind='stable', na_position='last')
+    scores['mvp_rank'] = scores.groupby('match_id').cumcount() + 1
+    return scores[['match_id', 'team', 'player_name', 'mvp_score', 'mvp_rank']].reset_index(drop=True)
+
+def _result_columns(df, results):
+    match_ids = df['match_id']
+    reported_team = match_ids.map({match_id: team for match_id, (team, _) in results.items()})
+    own = (df['team'].astype(object) == reported_team.astype(object)).to_numpy()
+    result = match_ids.map({match_id: result for match_id, (_, result) in results.items()}).to_numpy(dtype=object)
+    return own, result
+
+def _score_field_players(field, results):
+    if field.empty:
+        return pd.DataFrame(columns=['match_id', 'team', 'player_name', 'mvp_score'])
+    own, result = _result_columns(field, results)
+    multiplier = np.select(
+        [result == 'W', result == 'L'],
+        [np.where(own, WINNING_TEAM_MULTIPLIER, LOSING_TEAM_MULTIPLIER),
+         np.where(own, LOSING_TEAM_MULTIPLIER, WINNING_TEAM_MULTIPLIER)],
+        1.0
+    )
+
+    score = _weighted_sum(field, FIELD_PLAYER_WEIGHTS)
+    # Missed penalties
+    missed = _known_difference(field, 'performance_pkatt', 'performance_pk')
+    if missed is not None:
+        score -= np.where(missed > 0, missed * MISSED_PENALTY_WEIGHT, 0.0)
+    # Goals above (or below) expected goals
+    finishing = _known_difference(field, 'performance_gls', 'expected_xg')
+    if finishing is not None:
+        score += finishing
+    # Take-on success rate, for players with enough attempts
+    attempts = _column(field, 'take_ons_att').to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = _column(field, 'take_ons_succ').to_numpy() / attempts
+    take_ons = np.where(rate > TAKE_ON_SUCCESS_THRESHOLD, rate * TAKE_ON_WEIGHT, -rate * TAKE_ON_WEIGHT)
+    score += np.where(attempts >= MIN_TAKE_ONS, take_ons, 0.0)
+
+    return pd.DataFrame({
+        'match_id': field['match_id'].to_numpy(),
+        'team': field['team'].to_numpy(),
+        'player_name': field['player_name'].to_numpy(),
+        'mvp_score': score * multiplier,
+    })
+
+def _score_keepers(keepers, results, field_scores):
+    if keepers.empty:
+        return pd.DataFrame(columns=['match_id', 'team', 'player_name', 'mvp_score'])
+    own, result = _result_columns(keepers, results)
+    multiplier = np.where(own & (result == 'W'), WINNING_TEAM_MULTIPLIER,
+                          np.where(own & (result == 'L'), LOSING_TEAM_MULTIPLIER, 1.0))
+
+    previous = field_scores.drop_duplicates(PLAYER_KEY, keep='last').set_index(PLAYER_KEY)['mvp_score']
+    keys = pd.MultiIndex.from_arrays([keepers['match_id'].to_numpy(), keepers['player_name'].to_numpy()])
+    score = previous.reindex(keys, fill_value=0.0).to_numpy() + _weighted_sum(keepers, KEEPER_WEIGHTS)
+    # Post-shot xG against minus goals conceded, rewarded more than it is punished
+    prevented = _known_difference(keepers, 'shot_stopping_psxg', 'shot_stopping_ga')
+    if prevented is not None:
+        score += np.where(prevented > 0, prevented * PSXG_SAVED_WEIGHT, prevented * PSXG_CONCEDED_WEIGHT)
+    # Shots on target stopped
+    stopped = _known_difference(keepers, 'shot_stopping_sota', 'shot_stopping_ga')
+    if stopped is not None:
+        score += stopped * SOTA_SAVED_WEIGHT
+
+    return pd.DataFrame({
+        'match_id': keepers['match_id'].to_numpy(),
+        'team': keepers['team'].to_numpy(),
+        'player_name': keepers['player_name'].to_numpy(),
+        'mvp_score': score * multiplier,
+    })
+
+# MVP ranking of one match as [(player, score), ...], best first, or a message
+# when the match has no touches data
+def calculate_mvp_score(field_players_stats_df, keepers_stats_df, selected_team, match_result):
+    if 'performance_touches' not in field_players_stats_df.columns or field_players_stats_df['performance_touches'].notna().sum() == 0:
+        return INSUFFICIENT_DATA
+    scores = score_matches(
+        field_players_stats_df.assign(match_id=0),
+        keepers_stats_df.assign(match_id=0),
+        {0: (selected_team, match_result)}
+    )
+    return list(zip(scores['player_name'], scores['mvp_score']))
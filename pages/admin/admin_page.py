@@ -2,10 +2,14 @@ import streamlit as st
 import pandas as pd
 from email_validator import validate_email, EmailNotValidError
 import bcrypt
-from database import seasons, leagues_teams, get_all_users, update_user_data, add_user, delete_user, get_pending_coach_requests, get_all_teams, add_team, update_team_data, delete_team, check_team_exists, update_matchlogs, update_match_stats
+from database import seasons, leagues_teams, get_all_users, update_user_data, add_user, delete_user, get_pending_coach_requests, get_all_teams, add_team, update_team_data, delete_team, check_team_exists, get_query_cache_stats
+from jobs import enqueue_job, list_jobs
 
 st.title("Admin Dashboard :material/admin_panel_settings:")
 
+# Seconds between refreshes of the update jobs list
+JOBS_REFRESH_SECONDS = 2
+
 tabs = st.tabs(["Manage Users", "Coach Requests", "Manage Teams", "Database Updates"])
 all_teams_df = pd.DataFrame(get_all_teams())
 
@@ -396,9 +400,51 @@ with tabs[3]:
         available_teams = list(leagues_teams[selected_league].keys())
         selected_team = st.selectbox("Select Team:", available_teams)
 
+    # Updates run as background jobs, so they survive reruns and closed tabs
+    job_params = dict(season=selected_season, league=selected_league, team_name=selected_team, all_seasons=update_all_seasons)
     if selected_update_type == "Matchlogs":
         if st.button("Update Matchlogs"):
-            update_matchlogs(season=selected_season, league=selected_league, team_name=selected_team, all_seasons=update_all_seasons)
+            job_id = enqueue_job("matchlogs", **job_params)
+            st.success(f"✅ Matchlogs update queued as job #{job_id}")
     elif selected_update_type == "Match Stats":
         if st.button("Update Match Stats"):
-            update_match_stats(season=selected_season, league=selected_league, team_name=selected_team, all_seasons=update_all_seasons)
\ No newline at end of file
+            job_id = enqueue_job("stats", **job_params)
+            st.success(f"✅ Match stats update queued as job #{job_id}")
+
+    @st.fragment(run_every=JOBS_REFRESH_SECONDS)
+    def show_update_jobs():
+        st.write("### Update jobs")
+        jobs = list_jobs()
+        if not jobs:
+            st.info("No update jobs yet.")
+            return
+
+        for job in jobs:
+            if job["status"] != "running":
+                continue
+            with st.container(border=True):
+                total = job["total"] or 0
+                st.progress(min(job["done"] / total, 1.0) if total else 0.0,
+                            text=f"Job #{job['id']} ({job['kind']}): {job['done']}/{total or '?'} - {job['message'] or 'starting'}")
+                col1, col2 = st.columns(2)
+                col1.metric("Throughput", f"{job['throughput']:.1f} / min" if job["throughput"] else "-")
+                col2.metric("ETA", f"{job['eta'] / 60:.0f} min" if job["eta"] is not None else "-")
+                if job["progress"]:
+                    st.dataframe(pd.DataFrame(job["progress"].items(), columns=["Team", "Done"]), hide_index=True)
+
+        jobs_df = pd.DataFrame([{
+            "Job": job["id"],
+            "Type": job["kind"],
+            "Status": job["status"],
+            "Target": job["params"].get("team_name") or job["params"].get("league") or "All leagues",
+            "Season": "All" if job["params"].get("all_seasons") else job["params"].get("season") or seasons[0],
+            "Done": f"{job['done']}/{job['total'] or '?'}",
+            "Created": pd.to_datetime(job["created_at"], unit="s"),
+            "Error": job["error"],
+        } for job in jobs])
+        st.dataframe(jobs_df, use_container_width=True, hide_index=True)
+
+    show_update_jobs()
+
+    with st.expander("Query cache statistics"):
+        st.json(get_query_cache_stats())
@@ -3,7 +3,8 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from database import seasons, get_team_by_name, update_match_stats, stats_exist, get_players_stats, check_and_update_data, get_team_matches_by_season, calculate_and_display_key_team_metrics
+from database import seasons, get_team_by_name, update_match_stats, get_match_ids_with_stats, get_players_stats, get_players_stats_bulk, get_player_season_totals, get_player_season_stats, season_per90, get_team_matches_by_season, get_data_version
+from streamlit_helpers import streamlit_progress, check_and_update_data, calculate_and_display_key_team_metrics, key_team_metrics, memoised
 
 metrics_per_position = {
     "GK": ["shot_stopping_sota", "shot_stopping_ga", "shot_stopping_saves", "shot_stopping_save_percent", "shot_stopping_psxg"],
@@ -54,31 +55,13 @@ alternate_positions = {
     "ST": ["ST", "FW", "CF", "SS"],
     "SS": ["SS", "FW", "CF", "ST"]
 }
-def compute_player_per90_stats(players_stats_df, selected_players, cols):
-    data = {}
+def compute_player_per90_stats(season_per90_df, selected_players, cols):
+    # Wartości per 90 są liczone z sum sezonowych (player_season_stats), więc tylko
+    # wybieramy wiersze zawodników, którzy zagrali choć minutę
     numeric_cols = [col for col in cols if col != "position"]
-    
-    for player in selected_players:
-        player_df = players_stats_df[players_stats_df['player_name'] == player].copy()
-        if player_df.empty:
-            continue
-        for col in numeric_cols:
-            player_df[col] = pd.to_numeric(player_df[col], errors='coerce')
-        total_minutes = player_df["minutes_played"].sum()
-        if total_minutes == 0:
-            continue
-        stats = {}
-        for col in numeric_cols:
-            if col == "minutes_played":
-                stats[col] = total_minutes
-            elif "percent" in col:
-                weighted_avg = (player_df[col] * player_df["minutes_played"]).sum() / total_minutes
-                stats[col] = weighted_avg
-            else:
-                stats[col] = (player_df[col].sum() / total_minutes) * 90
-        stats["position"] = player_df["position"].iloc[0]
-        data[player] = stats
-    return pd.DataFrame(data).T
+    players = [player for player in selected_players
+               if player in season_per90_df.index and season_per90_df.at[player, "minutes_played"] > 0]
+    return season_per90_df.reindex(index=players, columns=numeric_cols + ["position"])
 
 def qualifies(player_pos, required_pos):
     """
@@ -102,9 +85,6 @@ def get_recent_matches(team_id, n=3, season=None):
         # Jeśli nie, przyjmujemy domyślny sezon (np. pierwszy z listy seasons)
         df = get_team_matches_by_season(team_id, seasons[0])
     
-    # Konwersja kolumny 'date' na datetime (przy ewentualnych błędach – NaT)
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    
     # Filtrujemy tylko mecze z wynikiem (czyli rozegrane)
     completed = df[df['result'].notna()]
     if completed.empty:
@@ -114,36 +94,26 @@ def get_recent_matches(team_id, n=3, season=None):
     recent = completed.sort_values('date', ascending=False).head(n)
     return recent
 
-def compute_recent_player_stats(team_id, recent_matches):
+def compute_recent_player_stats(team_id, recent_matches, season):
     """
-    Dla podanych ostatnich meczów (recent_matches) pobiera statystyki zawodników,
+    Dla podanych ostatnich meczów (recent_matches, pobranych dla sezonu season) pobiera statystyki zawodników,
     filtruje tylko statystyki dla naszej drużyny (przyjmując globalną zmienną team_name),
     agreguje je – sumując kolumny numeryczne – oraz zachowuje kolumnę 'position'
     (wybierając pierwszy występujący rekord), a następnie oblicza statystyki per 90 minut.
     
     Zwraca DataFrame, którego indeks to nazwy zawodników, a kolumny to statystyki "per 90".
     """
-    dfs = []
-    for mid in recent_matches['id']:
-        df_stats = get_players_stats(mid)
-        if not df_stats.empty:
-            dfs.append(df_stats)
-    if not dfs:
-        return pd.DataFrame()
-    
-    # Łączymy wszystkie statystyki
-    all_stats = pd.concat(dfs, ignore_index=True)
-    # Filtrujemy tylko dane dotyczące naszej drużyny (globalna zmienna team_name)
-    team_stats = all_stats[all_stats['team'] == team_name].copy()
+    # Pobieramy statystyki naszej drużyny (globalna zmienna team_name) jednym zapytaniem
+    team_stats = get_players_stats_bulk(recent_matches['id'].tolist(), team=team_name, season=season, league=team_league)
     if team_stats.empty:
         return pd.DataFrame()
     
     # Wybieramy kolumny numeryczne
     numeric_cols = team_stats.select_dtypes(include=[np.number]).columns.tolist()
     # Grupujemy statystyki według zawodnika – dla kolumn numerycznych sumujemy wartości
-    aggregated_numeric = team_stats.groupby("player_name")[numeric_cols].sum()
+    aggregated_numeric = team_stats.groupby("player_name", observed=True)[numeric_cols].sum()
     # Dla kolumny 'position' wybieramy pierwszy napotkany wpis (możesz też użyć np. mode)
-    aggregated_positions = team_stats.groupby("player_name")["position"].apply(
+    aggregated_positions = team_stats.groupby("player_name", observed=True)["position"].apply(
         lambda x: ", ".join(sorted(x.dropna().unique())))
     
     # Łączymy wyniki w jeden DataFrame
@@ -244,61 +214,17 @@ with st.sidebar:
 check_and_update_data(team_id=team_id, team_name=team_name, season=selected_season, league=team_league, update_stats=True)
 df = get_team_matches_by_season(team_id=team_id, season=selected_season)
 
-if not df.empty:
-    df['date'] = pd.to_datetime(df['date'])
-    df.loc[:, 'gf_clean'] = df['gf'].apply(
-        lambda x: float(x.split('(')[0]) if isinstance(x, str) and '(' in x else float(x) if pd.notna(x) else 0.0
-    )
-    df.loc[:, 'ga_clean'] = df['ga'].apply(
-        lambda x: float(x.split('(')[0]) if isinstance(x, str) and '(' in x else float(x) if pd.notna(x) else 0.0
-    )
-    df['xg_filled'] = df.apply(
-        lambda row: float(row['gf'].split('(')[0]) if pd.isna(row['xg']) and isinstance(row['gf'], str)
-        else float(row['gf']) if pd.isna(row['xg']) and pd.notna(row['gf'])
-        else float(row['xg'].split('(')[0]) if isinstance(row['xg'], str)
-        else row['xg'], axis=1
-    )
-    df['xga_filled'] = df.apply(
-        lambda row: float(row['ga'].split('(')[0]) if pd.isna(row['xga']) and isinstance(row['ga'], str)
-        else float(row['ga']) if pd.isna(row['xga']) and pd.notna(row['ga'])
-        else float(row['xga'].split('(')[0]) if isinstance(row['xga'], str)
-        else row['xga'], axis=1
-    )
-    df['xg_filled'] = pd.to_numeric(df['xg_filled'], errors='coerce')
-    df['xga_filled'] = pd.to_numeric(df['xga_filled'], errors='coerce')
-
-def safe_stats_exist(match_id):
-    try:
-        return stats_exist(match_id)
-    except Exception as e:
-        return True
-
 played_matches = df[df['result'].notna()].copy()
-missing_stats = any(not safe_stats_exist(row['id']) for idx, row in played_matches.iterrows())
+try:
+    matches_with_stats = get_match_ids_with_stats(played_matches['id'].tolist()) if not played_matches.empty else set()
+    missing_stats = not set(played_matches['id']).issubset(matches_with_stats)
+except Exception:
+    missing_stats = False
 if missing_stats:
     st.info("Some match stats are missing. Updating match stats for the selected team and season...")
-    update_match_stats(season=selected_season, league=team_league, team_name=team_name, all_seasons=False)
+    update_match_stats(season=selected_season, league=team_league, team_name=team_name, all_seasons=False, report=streamlit_progress)
     st.rerun()
 
-#############################################
-# AGREGOWANE STATYSTYKI Z ZAWODNIKÓW
-#############################################
-if not played_matches.empty:
-    match_ids = played_matches['id'].tolist()
-    dfs = []
-    for mid in match_ids:
-        df_mid = get_players_stats(mid)
-        if not df_mid.empty:
-            df_mid = df_mid.dropna(axis=1, how='all')
-            dfs.append(df_mid)
-    if dfs:
-        team_player_stats = pd.concat(dfs, ignore_index=True)
-        team_player_stats = team_player_stats[team_player_stats['team'] == team_name]
-    else:
-        team_player_stats = pd.DataFrame()
-else:
-    team_player_stats = pd.DataFrame()
-
 def get_player_groups(stats_df):
     groups = {}
     for player in stats_df['player_name'].unique():
@@ -350,37 +276,76 @@ def get_player_groups(stats_df):
             groups[player] = list(assigned)
     return groups
 
-precomputed_groups = get_player_groups(team_player_stats)
+#############################################
+# AGREGOWANE STATYSTYKI Z ZAWODNIKÓW
+#############################################
+# Dane zakładki Team Analysis są zapamiętywane dla drużyny, sezonu i wersji danych,
+# więc zmiana widżetów w innych zakładkach nie przelicza ich ponownie
+@memoised
+def team_analysis_data(team_id, team_name, season, league, data_version):
+    matches = get_team_matches_by_season(team_id, season)
+    match_ids = matches.loc[matches['result'].notna(), 'id'].tolist()
+    if not match_ids:
+        return pd.DataFrame(), {}, {}
+    # Sumy i średnie sezonowe na zawodnika liczone po stronie bazy (jeden wiersz na zawodnika)
+    season_totals = get_player_season_totals(match_ids, team_name, season=season, league=league)
+    if season_totals.empty:
+        return season_totals, {}, {}
+    # Kolumna 'positions' zawiera pozycje ze wszystkich występów, więc udziały pozycji się zgadzają
+    groups = get_player_groups(season_totals.rename(columns={"positions": "position"}))
+
+    def main_group(player):
+        return groups.get(player, [None])[0] if groups.get(player) else "Unknown"
+
+    frames = {}
+    goals_df = season_totals[['player_name', 'performance_gls', 'performance_sot', 'minutes_played']]
+    goals_df = goals_df[goals_df['performance_gls'] >= 1]
+    frames["goals"] = goals_df.sort_values('performance_gls', ascending=False).head(10)
+
+    passes_df = season_totals[['player_name', 'passes_cmp_percent_avg', 'minutes_played', 'passes_att']].rename(
+        columns={'passes_cmp_percent_avg': 'passes_cmp_percent'}
+    )
+    passes_df = passes_df[passes_df['minutes_played'] > 500]
+    frames["passes"] = passes_df.sort_values('passes_cmp_percent')
 
-# Tabs initiation
-tab1, tab2, tab3 = st.tabs([
-    "Team Analysis",
-    "Player Analysis",
-    "Match Analysis"
-])
+    dribbles_df = season_totals[['player_name', 'take_ons_att', 'take_ons_succ', 'minutes_played']]
+    dribbles_df = dribbles_df[dribbles_df['take_ons_att'] >= 20].copy()
+    dribbles_df['dribble_success'] = (dribbles_df['take_ons_succ'] / dribbles_df['take_ons_att']) * 100
+    frames["dribbles"] = dribbles_df.sort_values('dribble_success', ascending=True)
 
-##############################################
-# TAB 1: Team Analysis
-##############################################
-with tab1:
-    st.header("📊 Team Analysis")
-
-    calculate_and_display_key_team_metrics(df, selected_season, team_name)
-    total_wins = df[df['result'] == 'W'].shape[0]
-    total_draws = df[df['result'] == 'D'].shape[0]
-    total_losses = df[df['result'] == 'L'].shape[0]
-    matches_played = total_wins + total_draws + total_losses
-    
-    gf_values = df['gf'].apply(
-        lambda x: float(x.split('(')[0]) if isinstance(x, str) else float(x) if pd.notna(x) else 0.0
+    shots_bubble_df = season_totals[['player_name', 'expected_xg_avg', 'performance_gls', 'performance_sh']].rename(
+        columns={'expected_xg_avg': 'expected_xg'}
     )
-    ga_values = df['ga'].apply(
-        lambda x: float(x.split('(')[0]) if isinstance(x, str) else float(x) if pd.notna(x) else 0.0
+    shots_bubble_df['group'] = shots_bubble_df['player_name'].apply(main_group)
+    frames["shots_bubble"] = shots_bubble_df
+
+    passes_bubble_df = season_totals[['player_name', 'expected_xag_avg', 'performance_ast', 'passes_att']].rename(
+        columns={'expected_xag_avg': 'expected_xag'}
     )
-    total_goals_for = gf_values.sum()
-    total_goals_against = ga_values.sum()
-    total_xG = df['xg_filled'].sum(skipna=True)
-    total_xGA = df['xga_filled'].sum(skipna=True)
+    passes_bubble_df['group'] = passes_bubble_df['player_name'].apply(main_group)
+    frames["passes_bubble"] = passes_bubble_df
+
+    progressive_df = season_totals[['player_name', 'passes_prgp_avg', 'carries_prgc_avg', 'matches']]
+    min_matches = 5
+    progressive_df = progressive_df[progressive_df['matches'] >= min_matches]
+    frames["progressive"] = progressive_df.rename(columns={
+        'passes_prgp_avg': 'Avg Progressive Passes',
+        'carries_prgc_avg': 'Avg Progressive Carries'
+    })
+    return season_totals, groups, frames
+
+# Wykresy zakładki Team Analysis – budowane tylko gdy zakładka jest aktywna
+# i zapamiętywane dla drużyny i sezonu (wraz z wersją danych)
+@memoised
+def team_analysis_figures(team_id, team_name, season, league, data_version):
+    team_figures = []
+    player_figures = []
+    team_metrics = key_team_metrics(team_id, season, get_data_version(team_id, season))
+    matches_played = team_metrics['matches_played']
+    total_goals_for = team_metrics['total_goals_for']
+    total_goals_against = team_metrics['total_goals_against']
+    total_xG = team_metrics['total_xG']
+    total_xGA = team_metrics['total_xGA']
     
     df_overview = pd.DataFrame({
         "Metric": ["Goals For", "Expected Goals", "Goals Against", "Expected Goals Against"],
@@ -402,9 +367,10 @@ with tab1:
         text='Value'
     )
     fig_overview2.update_traces(textposition='outside', texttemplate='%{text:.2f}')
-    st.plotly_chart(fig_overview2, use_container_width=True)
+    team_figures.append(fig_overview2)
     
-    played_matches_sorted = played_matches.sort_values('date')
+    matches = get_team_matches_by_season(team_id, season)
+    played_matches_sorted = matches[matches['result'].notna()].sort_values('date')
     fig_line = px.line(
         played_matches_sorted,
         x='date',
@@ -418,22 +384,12 @@ with tab1:
     fig_line.data[1].name = 'Goals Conceded'
     fig_line.data[1].line.color = 'indianred'
 
-    st.plotly_chart(fig_line, use_container_width=True)
+    team_figures.append(fig_line)
     
-    st.subheader("Aggregate Player Statistics")
-    if not team_player_stats.empty:
+    season_totals, _, team_frames = team_analysis_data(team_id, team_name, season, league, data_version)
+    if not season_totals.empty:
         # Top scorers plot
-        goals_df = (
-            team_player_stats.groupby('player_name').agg({
-                'performance_gls': 'sum',
-                'expected_xg': 'mean',
-                'performance_sot': 'sum',
-                'minutes_played': 'sum'
-            }).reset_index()
-        )
-        goals_df['performance_sot'] = pd.to_numeric(goals_df['performance_sot'], errors='coerce')
-        goals_df = goals_df[goals_df['performance_gls'] >= 1]
-        goals_df = goals_df.sort_values('performance_gls', ascending=False).head(10)
+        goals_df = team_frames["goals"]
 
         fig_top_scorers = px.bar(
             goals_df,
@@ -457,19 +413,10 @@ with tab1:
             yaxis={'categoryorder': 'total ascending'},
             height=400
         )
-        st.plotly_chart(fig_top_scorers, use_container_width=True)
+        player_figures.append(fig_top_scorers)
 
         # Pass accuracy plot
-        passes_df = (
-            team_player_stats.groupby('player_name').agg({
-                'passes_cmp_percent': 'mean',
-                'minutes_played': 'sum',
-                'passes_att': 'sum'
-            }).reset_index()
-        )
-        passes_df['passes_att'] = pd.to_numeric(passes_df['passes_att'], errors='coerce')
-        passes_df = passes_df[passes_df['minutes_played'] > 500]
-        passes_df = passes_df.sort_values('passes_cmp_percent')
+        passes_df = team_frames["passes"]
 
         fig_pass_agg = px.bar(
             passes_df,
@@ -494,18 +441,10 @@ with tab1:
             height=600
         )
 
-        st.plotly_chart(fig_pass_agg, use_container_width=True)
+        player_figures.append(fig_pass_agg)
 
         # Dribble Success Rate plot
-        dribbles_df = team_player_stats.groupby('player_name').agg({
-            'take_ons_att': 'sum',
-            'take_ons_succ': 'sum',
-            'minutes_played': 'sum'
-        }).reset_index()
-        dribbles_df['take_ons_att'] = pd.to_numeric(dribbles_df['take_ons_att'], errors='coerce')
-        dribbles_df = dribbles_df[dribbles_df['take_ons_att'] >= 20]
-        dribbles_df['dribble_success'] = (dribbles_df['take_ons_succ'] / dribbles_df['take_ons_att']) * 100
-        dribbles_df = dribbles_df.sort_values('dribble_success', ascending=True)
+        dribbles_df = team_frames["dribbles"]
 
         fig_dribble = px.bar(
             dribbles_df,
@@ -530,18 +469,10 @@ with tab1:
             height=600
         )
     
-        st.plotly_chart(fig_dribble, use_container_width=True)
+        player_figures.append(fig_dribble)
 
         # Bubble chart: shots, xG per match, goals
-        shots_bubble_df = team_player_stats.groupby('player_name').agg({
-            'expected_xg': 'mean',
-            'performance_gls': 'sum',
-            'performance_sh': 'sum'
-        }).reset_index()
-
-        shots_bubble_df['group'] = shots_bubble_df['player_name'].apply(
-            lambda p: precomputed_groups.get(p, [None])[0] if precomputed_groups.get(p) else "Unknown"
-        )
+        shots_bubble_df = team_frames["shots_bubble"]
 
         fig_bubble_gls = px.scatter(
             shots_bubble_df,
@@ -561,18 +492,10 @@ with tab1:
             text='player_name'
         )
         fig_bubble_gls.update_traces(textposition='top center')
-        st.plotly_chart(fig_bubble_gls, use_container_width=True)
+        player_figures.append(fig_bubble_gls)
         
         # Bubble chart: passes, xAG per match, assists
-        passes_bubble_df = team_player_stats.groupby('player_name').agg({
-            'expected_xag': 'mean',
-            'performance_ast': 'sum',
-            'passes_att': 'sum'
-        }).reset_index()
-        passes_bubble_df['passes_att'] = pd.to_numeric(passes_bubble_df['passes_att'], errors='coerce')
-        passes_bubble_df['group'] = passes_bubble_df['player_name'].apply(
-            lambda p: precomputed_groups.get(p, [None])[0] if precomputed_groups.get(p) else "Unknown"
-        )
+        passes_bubble_df = team_frames["passes_bubble"]
 
         fig_bubble_ast = px.scatter(
             passes_bubble_df,
@@ -593,24 +516,10 @@ with tab1:
         )
         fig_bubble_ast.update_traces(textposition='top center')
 
-        st.plotly_chart(fig_bubble_ast, use_container_width=True)
+        player_figures.append(fig_bubble_ast)
 
         # Average progressive passes and carries per match
-        match_counts = team_player_stats.groupby('player_name').size().reset_index(name='match_count')
-
-        progressive_df = team_player_stats.groupby('player_name').agg({
-            'passes_prgp': 'mean',
-            'carries_prgc': 'mean'
-        }).reset_index()
-        progressive_df['passes_prgp'] = pd.to_numeric(progressive_df['passes_prgp'], errors='coerce')
-        progressive_df['carries_prgc'] = pd.to_numeric(progressive_df['carries_prgc'], errors='coerce')
-        progressive_df = progressive_df.merge(match_counts, on='player_name')
-        min_matches = 5
-        progressive_df = progressive_df[progressive_df['match_count'] >= min_matches]
-        progressive_df = progressive_df.rename(columns={
-            'passes_prgp': 'Avg Progressive Passes',
-            'carries_prgc': 'Avg Progressive Carries'
-        })
+        progressive_df = team_frames["progressive"]
 
         fig_progressive_stats_grouped = px.bar(
             progressive_df,
@@ -635,22 +544,47 @@ with tab1:
             height=500
         )
 
-        st.plotly_chart(fig_progressive_stats_grouped, use_container_width=True)
+        player_figures.append(fig_progressive_stats_grouped)
+    return team_figures, player_figures
+
+data_version = get_data_version(team_id, selected_season, team_name)
+
+# Zakładki – renderujemy tylko aktywną, więc pozostałe nie pobierają danych ani nie budują wykresów
+COACH_TABS = ["Team Analysis", "Player Analysis", "Match Analysis"]
+active_tab = st.segmented_control(
+    "Section", COACH_TABS, default=COACH_TABS[0], key="coach_active_tab", label_visibility="collapsed"
+) or COACH_TABS[0]
+
+##############################################
+# TAB 1: Team Analysis
+##############################################
+if active_tab == "Team Analysis":
+    st.header("📊 Team Analysis")
+
+    calculate_and_display_key_team_metrics(team_id, selected_season, team_name)
+    team_figures, player_figures = team_analysis_figures(team_id, team_name, selected_season, team_league, data_version)
+    for fig in team_figures:
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Aggregate Player Statistics")
+    if player_figures:
+        for fig in player_figures:
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.warning("No aggregate player statistics available.")
 
 ##############################################
 # TAB 2: Player Analysis
 ##############################################
-with tab2:
+elif active_tab == "Player Analysis":
     st.header("🔍 Player Analysis")
-    if not team_player_stats.empty:
-        precomputed_groups_local = get_player_groups(team_player_stats)
+    season_totals, precomputed_groups_local, _ = team_analysis_data(team_id, team_name, selected_season, team_league, data_version)
+    if not season_totals.empty:
 
         group_options = ["Goalkeepers", "Centrebacks", "Fullbacks", "Midfielders", "Wingers", "Forwards"]
         selected_group = st.selectbox("Select Position Group:", group_options, index=0)
 
-        team_group_players = sorted([player for player in team_player_stats['player_name'].unique() 
+        team_group_players = sorted([player for player in season_totals['player_name'].unique() 
                                     if selected_group in precomputed_groups_local.get(player, [])])
 
         with st.form(key="compare_form", clear_on_submit=False, border=False):
@@ -674,7 +608,8 @@ with tab2:
                                     "take_ons_att", "take_ons_succ"]
                 cols = GK_columns if selected_group == "Goalkeepers" else field_columns
 
-                comp_df = compute_player_per90_stats(team_player_stats, selected_players, cols)
+                season_per90_df = season_per90(get_player_season_stats(team_name, selected_season))
+                comp_df = compute_player_per90_stats(season_per90_df, selected_players, cols)
                 comp_df = comp_df.round(2)
                 comp_df.index.name = "Player"
                 st.subheader("Comparison of Selected Players (Per 90 Minutes)")
@@ -746,10 +681,9 @@ with tab2:
 ##############################################
 # TAB 3: Match Analysis
 ##############################################
-with tab3:
+elif active_tab == "Match Analysis":
     st.header("📋 Match Analysis")
     if not df.empty:
-        df['date'] = pd.to_datetime(df['date'])
         played_matches = df[df['result'].notna()]
         future_matches = df[df['result'].isna()].sort_values(by='date')
         next_match = future_matches.iloc[:1] if not future_matches.empty else pd.DataFrame()
@@ -774,12 +708,13 @@ with tab3:
             if pd.isna(match_row['result']):
                 st.subheader("Proposed Starting Eleven for Upcoming Match")
                 # Pobieramy ostatnie rozegrane mecze (np. ostatnie 3 mecze) – funkcje te muszą być zaimplementowane
-                recent_matches = get_recent_matches(team_id, n=3)
+                # Mecze i ich statystyki pobieramy dla tego samego (wybranego) sezonu
+                recent_matches = get_recent_matches(team_id, n=3, season=selected_season)
                 # Obliczamy statystyki per 90 minut na podstawie ostatnich meczów
                 if recent_matches.empty:
                     st.warning("Not enough recent matches to compute player stats.")
                 else:
-                    team_stats_recent = compute_recent_player_stats(team_id, recent_matches)
+                    team_stats_recent = compute_recent_player_stats(team_id, recent_matches, season=selected_season)
                     # Wybierz formację – przykładowo "433"
                     formation = formations["433"]
                     starting_eleven = propose_starting_eleven(team_stats_recent, formation, metrics_per_position)
@@ -794,7 +729,7 @@ with tab3:
                     else:
                         st.info("No eligible players for the proposed lineup.")
             else:
-                match_stats = get_players_stats(match_id)
+                match_stats = get_players_stats(match_id, season=selected_season, league=team_league)
                 our_stats = match_stats[match_stats['team'] == team_name]
                 opp_stats = match_stats[match_stats['team'] != team_name]
                 
@@ -1007,7 +942,7 @@ with tab3:
                     )
                     st.plotly_chart(fig_match1, use_container_width=True)
                     
-                    goals_assists = our_stats.groupby('player_name').agg({
+                    goals_assists = our_stats.groupby('player_name', observed=True).agg({
                         'performance_gls': 'sum',
                         'performance_ast': 'sum'
                     }).reset_index()
@@ -1022,7 +957,7 @@ with tab3:
                     )
                     st.plotly_chart(fig_match2, use_container_width=True)
                     
-                    passes_data = our_stats.groupby('player_name').agg({'passes_cmp': 'sum'}).reset_index()
+                    passes_data = our_stats.groupby('player_name', observed=True).agg({'passes_cmp': 'sum'}).reset_index()
                     fig_match3 = px.pie(
                         passes_data,
                         names='player_name',
@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 import time
-from database import seasons, leagues_teams, add_team, update_favourites, get_team_by_name, get_team_matches_by_season, get_match_id_by_report_link, prepare_match_player_stats_records, upsert_players_stats, get_match_player_stats_by_team, check_and_update_data, calculate_and_display_key_team_metrics
-from scrapers import scrap_match_stats
+from database import seasons, leagues_teams, add_team, update_favourites, get_team_by_name, get_team_matches_by_season, get_match_id_by_report_link, prepare_match_player_stats_records, upsert_players_stats, get_match_player_stats_by_team, get_match_mvp_scores, get_season_mvp_leaderboard, store_ingested_mvp_scores
+from streamlit_helpers import check_and_update_data, calculate_and_display_key_team_metrics
+from mvp import calculate_mvp_score
+from scrapers import SCORE_COLUMNS, scrap_match_stats
 
 st.logo("assets/app_logo/statfield-high-resolution-logo-transparent.png", size="large") 
 
@@ -13,156 +15,6 @@ if "username" in st.session_state:
 if "favourites" in st.session_state:
     favourites = st.session_state.favourites
 
-# Determine match MVP's
-def calculate_mvp_score(field_players_stats_df, keepers_stats_df, selected_team, match_result):
-    # Define weights for field player stats
-    field_player_weights = {
-        'performance_gls': 1.5,
-        'performance_ast': 0.5,
-        'performance_sh': 0.1,
-        'performance_sot': 0.2,
-        'performance_touches': 0.01,
-        'performance_tkl': 0.2,
-        'performance_int': 0.2,
-        'performance_blocks': 0.2,
-        'expected_xag': 0.5,
-        'sca_sca': 0.2,
-        'sca_gca': 0.5,
-        'passes_cmp': 0.01,
-        'passes_cmp_percent': 0.01,
-        'passes_prgp': 0.05,
-        'carries_carries': 0.01,
-        'carries_prgc': 0.05,
-        'take_ons_att': 0.02,
-        'take_ons_succ': 0.05,
-        'performance_crdy': -1,
-        'performance_crdr': -2
-    }
-
-    keeper_weights = {
-        'shot_stopping_ga': -0.5,
-        'shot_stopping_saves': 0.15,
-        'shot_stopping_save_percent': 0.01
-    }
-
-    mvp_scores = {}
-
-    # Determine multipliers based on the match result
-    winning_team_multiplier = 1.1  # Small boost for winning team
-    loosing_team_multiplier = 0.9  # Small penalty for losing team
-
-    # Ensure 'performance_touches' column has valid data
-    if field_players_stats_df['performance_touches'].notna().sum() == 0:
-        return "Insufficient data to calculate MVP for this match."
-    else: 
-        # Ensure required columns exist in DataFrame for field players
-        for col in field_player_weights.keys():
-            if col not in field_players_stats_df.columns:
-                field_players_stats_df[col] = 0.0
-
-        # Ensure required columns exist in DataFrame for keepers
-        for col in keeper_weights.keys():
-            if col not in keepers_stats_df.columns:
-                keepers_stats_df[col] = 0.0
-
-        # Process field players' stats
-        for _, row in field_players_stats_df.iterrows():
-            player = row['player_name']
-            score = 0
-
-            # Determine team-specific multiplier
-            player_team = row['team']
-            if match_result == 'W':
-                if player_team == selected_team:
-                    team_multiplier = winning_team_multiplier
-                else:
-                    team_multiplier = loosing_team_multiplier
-            elif match_result == 'L':
-                if player_team == selected_team:
-                    team_multiplier = loosing_team_multiplier
-                else:
-                    team_multiplier = winning_team_multiplier
-            else:
-                team_multiplier = 1  # No changes for draw
-
-            # Calculate base score from standard stats
-            for stat, weight in field_player_weights.items():
-                stat_value = row.get(stat, 0)
-                if not pd.isnull(stat_value):
-                    score += stat_value * weight
-
-            # Calculate penalty for missed penalties
-            if 'performance_pkatt' in row and 'performance_pk' in row:
-                if not pd.isnull(row['performance_pkatt']) and not pd.isnull(row['performance_pk']):
-                    missed_penalties = row['performance_pkatt'] - row['performance_pk']
-                    if missed_penalties > 0:
-                        score -= missed_penalties * 2  # Penalize each missed penalty by a factor of 2
-
-            # Calculate the difference between actual goals and xG
-            if 'performance_gls' in row and 'expected_xg' in row:
-                if not pd.isnull(row['performance_gls']) and not pd.isnull(row['expected_xg']):
-                    goal_diff = row['performance_gls'] - row['expected_xg']
-                    score += goal_diff * 1
-
-            # Calculate success rate of take-ons (dribbles)
-            if 'take_ons_att' in row and 'take_ons_succ' in row:
-                if not pd.isnull(row['take_ons_att']) and row['take_ons_att'] >= 5:
-                    take_on_success_rate = row['take_ons_succ'] / row['take_ons_att']
-                    if take_on_success_rate > 0.4:
-                        score += take_on_success_rate * 2
-                    else:
-                        score -= take_on_success_rate * 2
-
-            # Apply team result multiplier
-            score *= team_multiplier
-
-            mvp_scores[player] = score
-
-        # Process goalkeepers similarly
-        for _, row in keepers_stats_df.iterrows():
-            player = row['player_name']
-            score = mvp_scores.get(player, 0)
-
-            # Determine team-specific multiplier
-            player_team = row['team']
-            if player_team == selected_team and match_result == 'W':
-                team_multiplier = winning_team_multiplier
-            elif player_team == selected_team and match_result == 'L':
-                team_multiplier = loosing_team_multiplier
-            else:
-                team_multiplier = 1  # No changes for draw
-
-            # Calculate score for goalkeepers
-            for stat, weight in keeper_weights.items():
-                stat_value = row.get(stat, 0)
-                if not pd.isnull(stat_value):
-                    score += stat_value * weight
-
-            # Add points for the difference between Post-Shot xG and Goals Against (GA)
-            if 'shot_stopping_psxg' in row and 'shot_stopping_ga' in row:
-                if not pd.isnull(row['shot_stopping_psxg']) and not pd.isnull(row['shot_stopping_ga']):
-                    psxg_diff = row['shot_stopping_psxg'] - row['shot_stopping_ga']
-                    if psxg_diff > 0:
-                        score += psxg_diff * 1.5  # Positive effect for preventing goals
-                    else:
-                        score += psxg_diff * 1  # Smaller penalty for underperformance
-
-            # Add points for the difference between Shots on Target Against (SoTA) and Goals Against (GA)
-            if 'shot_stopping_sota' in row and 'shot_stopping_ga' in row:
-                if not pd.isnull(row['shot_stopping_sota']) and not pd.isnull(row['shot_stopping_ga']):
-                    sota_diff = row['shot_stopping_sota'] - row['shot_stopping_ga']
-                    score += sota_diff * 0.5  # Award for stopping shots on target
-
-            # Apply team result multiplier
-            score *= team_multiplier
-
-            mvp_scores[player] = score
-
-        # Sort MVP scores in descending order
-        sorted_mvp_scores = sorted(mvp_scores.items(), key=lambda x: x[1], reverse=True)
-
-        return sorted_mvp_scores
-
 # Prepare stats and display
 def prepare_and_display_match_stats(
     team_1_field_players, team_1_keepers,
@@ -252,6 +104,131 @@ def prepare_and_display_match_stats(
         st.error("Insufficient data to determine MVPs for this match.")
         st.divider()
 
+# MVP ranking of a match: the scores stored at ingestion for the team's own match
+# row, or computed from the stats when there are none for the current weight set
+def match_mvp_scores(team_match_id, team_1_field_players, team_1_keepers, team_2_field_players, team_2_keepers, selected_team, match_result):
+    try:
+        stored_scores = get_match_mvp_scores(team_match_id)
+    except Exception:
+        stored_scores = None
+    if stored_scores is not None:
+        return stored_scores
+    return calculate_mvp_score(
+        pd.concat([team_1_field_players, team_2_field_players]),
+        pd.concat([team_1_keepers, team_2_keepers]),
+        selected_team,
+        match_result
+    )
+
+# Player stats and MVPs of one match, scraped first if they are not stored yet.
+# team_match_id is the id of the selected team's own row of the match.
+def show_match_stats(match_id, team_match_id, match_report_link, selected_team, selected_season, selected_league, opponent, venue, match_date, match_result):
+    (team_1_field_players, team_1_keepers), (team_2_field_players, team_2_keepers) = get_match_player_stats_by_team(
+        match_id, selected_team, opponent, season=selected_season, league=selected_league
+    )
+
+    if not team_1_field_players.empty or not team_2_field_players.empty:
+        sorted_mvp_scores = match_mvp_scores(
+            team_match_id, team_1_field_players, team_1_keepers, team_2_field_players, team_2_keepers,
+            selected_team, match_result
+        )
+
+        prepare_and_display_match_stats(
+            team_1_field_players, team_1_keepers,
+            team_2_field_players, team_2_keepers,
+            selected_team, opponent, match_date, venue, sorted_mvp_scores
+        )
+        return
+
+    field_players_stats_df, keepers_stats_df = scrap_match_stats(match_report_link, selected_team, opponent, venue)
+
+    if field_players_stats_df.empty or keepers_stats_df.empty:
+        st.error("No stats data available.")
+        return
+    records = prepare_match_player_stats_records(field_players_stats_df, keepers_stats_df, match_id)
+    if not records:
+        return
+    try:
+        response = upsert_players_stats(records)
+        store_ingested_mvp_scores(response.data)
+
+        with st.spinner("Fetching newly added match stats..."):
+            for _ in range(5):
+                (team_1_field_players, team_1_keepers), (team_2_field_players, team_2_keepers) = get_match_player_stats_by_team(
+                    match_id, selected_team, opponent
+                )
+                if not team_1_field_players.empty or not team_2_field_players.empty:
+                    break
+                time.sleep(1)
+
+        if not team_1_field_players.empty or not team_2_field_players.empty:
+            sorted_mvp_scores = match_mvp_scores(
+                team_match_id, team_1_field_players, team_1_keepers, team_2_field_players, team_2_keepers,
+                selected_team, match_result
+            )
+            prepare_and_display_match_stats(
+                team_1_field_players, team_1_keepers,
+                team_2_field_players, team_2_keepers,
+                selected_team, opponent, match_date, venue, sorted_mvp_scores
+            )
+        else:
+            st.error("Unable to retrieve match stats from the database after several attempts.")
+    except Exception as e:
+        st.error(f"Error while upserting player stats: {e}")
+
+# One button per completed match; the selected match is kept in session state and
+# its details are shown under its button. As a fragment, clicking a button reruns
+# only this part of the page, so it costs the match's stats fetch and nothing else.
+@st.fragment
+def show_match_details(df, selected_team, selected_season, selected_league):
+    # Identify matches with results
+    completed_matches_indices = df[~df['result'].isnull()].index.tolist()
+    selection = st.session_state.get("dashboard_selected_match")
+
+    # Create buttons only for the relevant matches
+    st.subheader("Player stats & MVP's")
+    for idx in completed_matches_indices:
+        match_date = df.at[idx, 'date'].date()
+        venue = df.at[idx, 'venue']
+        opponent = df.at[idx, 'opponent']
+        match_result = df.at[idx, 'result']
+        match_report_link = df.at[idx, 'match_report_link']
+        team_match_id = df.at[idx, 'id']
+
+        if match_report_link:
+            match_key = (selected_team, selected_season, match_report_link)
+            if st.button(f"{match_date} {venue} match vs {opponent}", key=idx):
+                selection = match_key
+                st.session_state.dashboard_selected_match = selection
+            if selection == match_key:
+                st.write(f"#### Players stats for {match_date} {venue} match vs {opponent}")
+                match_id = get_match_id_by_report_link(match_report_link)
+
+                if match_id:
+                    show_match_stats(match_id, team_match_id, match_report_link, selected_team, selected_season, selected_league,
+                                     opponent, venue, match_date, match_result)
+                else:
+                    st.error("Match ID could not be found.")
+
+# Season MVP leaderboard of the team's players, from the scores stored at ingestion
+def show_mvp_leaderboard(team_id, selected_team, selected_season):
+    st.subheader(f"Season MVP leaderboard of {selected_team}")
+    try:
+        leaderboard = get_season_mvp_leaderboard(team_id, selected_team, selected_season)
+    except Exception as e:
+        st.warning(f"MVP leaderboard is not available: {e}")
+        return
+    if leaderboard.empty:
+        st.info("No MVP scores stored for this season yet.")
+        return
+    st.dataframe(leaderboard, use_container_width=True, hide_index=True, column_config={
+        "player_name": "Player",
+        "mvp_awards": "MVP awards",
+        "top_3": "Top 3 finishes",
+        "matches": "Matches",
+        "avg_mvp_score": st.column_config.NumberColumn("Avg MVP score", format="%.2f"),
+    })
+
 # Sidebar
 with st.sidebar:
     st.header('Sidebar')
@@ -329,85 +306,15 @@ if selected_league and selected_team and selected_season and selected_team != "S
                 st.metric(label="Formation (most commonly used)", value=f"{common_formation}")
 
         with team_col2:
-            calculate_and_display_key_team_metrics(df, selected_season, selected_team)
+            calculate_and_display_key_team_metrics(team_id, selected_season, selected_team)
         
         st.subheader(f"Scores and fixtures of {selected_team}")
         df = df.sort_values(by='date', ascending=True)
-        st.dataframe(df.drop(columns=['id', 'team_id', 'match_report_link', 'season', 'xg_filled', 'xga_filled']), use_container_width=True, hide_index=True)
-    
-        # Identify matches with results
-        completed_matches_indices = df[~df['result'].isnull()].index.tolist()
-        
-        # Create buttons only for the relevant matches
-        st.subheader("Player stats & MVP's")
-        for idx in completed_matches_indices:
-            match_date = df.at[idx, 'date']
-            venue = df.at[idx, 'venue']
-            opponent = df.at[idx, 'opponent']
-            match_result = df.at[idx, 'result']
-            match_report_link = df.at[idx, 'match_report_link']
-
-            if match_report_link:
-                if st.button(f"{match_date} {venue} match vs {opponent}", key=idx):
-                    st.write(f"#### Players stats for {match_date} {venue} match vs {opponent}")
-                    match_id = get_match_id_by_report_link(match_report_link)
-
-                    if match_id:
-                        (team_1_field_players, team_1_keepers), (team_2_field_players, team_2_keepers) = get_match_player_stats_by_team(
-                            match_id, selected_team, opponent
-                        )
-
-                        if not team_1_field_players.empty or not team_2_field_players.empty:
-                            sorted_mvp_scores = calculate_mvp_score(
-                                pd.concat([team_1_field_players, team_2_field_players]),
-                                pd.concat([team_1_keepers, team_2_keepers]),
-                                selected_team,
-                                match_result
-                            )
-
-                            prepare_and_display_match_stats(
-                                team_1_field_players, team_1_keepers,
-                                team_2_field_players, team_2_keepers,
-                                selected_team, opponent, match_date, venue, sorted_mvp_scores
-                            )
-                        else:
-                            field_players_stats_df, keepers_stats_df = scrap_match_stats(match_report_link, selected_team, opponent, venue)
-
-                            if field_players_stats_df.empty or keepers_stats_df.empty:
-                                st.error("No stats data available.")
-                            else:
-                                records = prepare_match_player_stats_records(field_players_stats_df, keepers_stats_df, match_id)
-                                if records:
-                                    try:
-                                        upsert_players_stats(records)
-
-                                        with st.spinner("Fetching newly added match stats..."):
-                                            for _ in range(5):
-                                                (team_1_field_players, team_1_keepers), (team_2_field_players, team_2_keepers) = get_match_player_stats_by_team(
-                                                    match_id, selected_team, opponent
-                                                )
-                                                if not team_1_field_players.empty or not team_2_field_players.empty:
-                                                    break
-                                                time.sleep(1)
-
-                                        if not team_1_field_players.empty or not team_2_field_players.empty:
-                                            sorted_mvp_scores = calculate_mvp_score(
-                                                pd.concat([team_1_field_players, team_2_field_players]),
-                                                pd.concat([team_1_keepers, team_2_keepers]),
-                                                selected_team,
-                                                match_result
-                                            )
-                                            prepare_and_display_match_stats(
-                                                team_1_field_players, team_1_keepers,
-                                                team_2_field_players, team_2_keepers,
-                                                selected_team, opponent, match_date, venue, sorted_mvp_scores
-                                            )
-                                        else:
-                                            st.error("Unable to retrieve match stats from the database after several attempts.")
-                                    except Exception as e:
-                                        st.error(f"Error while upserting player stats: {e}")
-                    else:
-                        st.error("Match ID could not be found.")
+        st.dataframe(df.drop(columns=['id', 'team_id', 'match_report_link', 'season', 'row_hash'] + SCORE_COLUMNS, errors='ignore'), use_container_width=True, hide_index=True,
+                     column_config={"date": st.column_config.DateColumn("date")})
+
+        show_mvp_leaderboard(team_id, selected_team, selected_season)
+        show_match_details(df, selected_team, selected_season, selected_league)
 
 else:
     st.title("👈 Select a team from the sidebar!")
@@ -0,0 +1,123 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Entries kept per process; least recently used ones are dropped beyond it, as
+# bulk reads hold whole DataFrames keyed by their match ids
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get("STATFIELD_QUERY_CACHE_MAX_ENTRIES", 256))
+
+# In-process read-through cache for database queries. Every entry carries a set
+# of tags such as ("matches", team_id, season); writes invalidate the tags they
+# touch instead of clearing the whole cache (which is all st.cache_data offers).
+class QueryCache:
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or QUERY_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._keys_by_tag = {}
+        self._versions = {}
+        self._invalidated_at = {}
+        self._clock = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    # Return the cached value for key or call loader() and cache its result.
+    # ttl=None keeps the entry until it is invalidated; ttl and tags may be callables
+    # that receive the loaded value. Values rejected by should_cache are not stored.
+    def get_or_load(self, key, loader, ttl=None, tags=(), should_cache=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry[0])
+            self.misses += 1
+            started_at, generation = self._clock, self._generation
+
+        value = loader()
+        if should_cache is not None and not should_cache(value):
+            return _copy(value)
+        entry_tags = set(tags(value) if callable(tags) else tags)
+        if callable(ttl):
+            ttl = ttl(value)
+        expires_at = None if ttl is None else time.monotonic() + ttl
+
+        with self._lock:
+            # A write that invalidated one of the tags (or cleared the cache) while
+            # the loader ran may not be reflected in the value, so it is not stored
+            if self._generation != generation or any(self._invalidated_at.get(tag, 0) > started_at for tag in entry_tags):
+                return _copy(value)
+            self._discard(key)
+            self._entries[key] = (value, expires_at, entry_tags)
+            for tag in entry_tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            self._evict()
+        return _copy(value)
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._clock += 1
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                self._invalidated_at[tag] = self._clock
+                for key in self._keys_by_tag.pop(tag, set()):
+                    if key in self._entries:
+                        self._discard(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self._generation += 1
+
+    # Stamp that changes whenever one of the tags is invalidated (or the cache
+    # cleared); results derived from cached data elsewhere (st.cache_data) put it
+    # in their key so that writes make them recompute
+    def version(self, *tags):
+        with self._lock:
+            return (self._generation, sum(self._versions.get(tag, 0) for tag in tags))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+    # Drop expired entries, then the least recently used ones beyond max_entries
+    def _evict(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry[1] is not None and entry[1] <= now]:
+            self._discard(key)
+            self.evictions += 1
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+# Callers get their own copy, so mutating a returned DataFrame never alters the cache
+def _copy(value):
+    if hasattr(value, "copy") and not isinstance(value, (dict, list, set)):
+        return value.copy()
+    return copy.deepcopy(value)
@@ -1,148 +1,304 @@
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
-from io import StringIO
+from requests.adapters import HTTPAdapter
+import lxml.html
+import os
 import re
 import time
 import random
 import logging
+import threading
+from urllib.parse import urlparse
+from html_cache import CURRENT_SEASON_TTL, get_cached_page, store_page, invalidate_cached_page
 
 BASE_FBREF_URL = "https://fbref.com"
-    
-def scrap_team_matchlogs(team_url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
-    }
 
-    max_retries = 3 
-    retry_delay = 30
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    # Brotli is only decoded when the optional "brotli" package is installed
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive"
+}
+
+# Size of the keep-alive connection pool shared by all scraper threads
+HTTP_POOL_SIZE = int(os.environ.get("FBREF_HTTP_POOL_SIZE", 8))
+HTTP_TIMEOUT = 30
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# Shared HTTP session with a keep-alive connection pool (urllib3 pools are thread-safe)
+def get_http_session(pool_size=None):
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                size = pool_size or HTTP_POOL_SIZE
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(HEADERS)
+                _http_session = session
+    return _http_session
+
+# Replace the shared session, e.g. to change the pool size
+def configure_http_client(pool_size):
+    global _http_session
+    with _http_session_lock:
+        old_session = _http_session
+        _http_session = None
+    if old_session is not None:
+        old_session.close()
+    return get_http_session(pool_size)
+
+# Token bucket shared by every thread talking to one host. Each request costs
+# one token plus a random jitter, so consecutive requests are spaced by
+# 1/rate + uniform(0, jitter) seconds no matter how many workers are waiting.
+class RateLimiter:
+    def __init__(self, rate, capacity=1, jitter=0.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.jitter = jitter
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            cost = 1 + random.uniform(0, self.jitter) * self.rate
+            self._tokens -= cost
+            # A negative balance is the time this caller has to wait for its slot
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+# Politeness policy for fbref.com: one request every 6-8 seconds
+FBREF_MIN_INTERVAL = float(os.environ.get("FBREF_MIN_INTERVAL", 6))
+FBREF_INTERVAL_JITTER = float(os.environ.get("FBREF_INTERVAL_JITTER", 2))
+
+_rate_limiters = {
+    "fbref.com": RateLimiter(rate=1 / FBREF_MIN_INTERVAL, capacity=1, jitter=FBREF_INTERVAL_JITTER)
+}
+_rate_limiters_lock = threading.Lock()
+
+# Rate limiter for a host; unknown hosts get the fbref policy as well
+def get_rate_limiter(url):
+    host = urlparse(url).hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    with _rate_limiters_lock:
+        if host not in _rate_limiters:
+            _rate_limiters[host] = RateLimiter(rate=1 / FBREF_MIN_INTERVAL, capacity=1, jitter=FBREF_INTERVAL_JITTER)
+        return _rate_limiters[host]
+
+# Download a page with retries on HTTP 429; returns the HTML or None.
+# Pages found in the local HTML cache (and younger than max_age) skip the network.
+def fetch_page(url, max_retries=3, retry_delay=30, max_age=None):
+    html = get_cached_page(url, max_age=max_age)
+    if html is not None:
+        return html
+
+    session = get_http_session()
+    limiter = get_rate_limiter(url)
 
     for attempt in range(max_retries):
+        limiter.acquire()
+        response = session.get(url, timeout=HTTP_TIMEOUT)
+
+        if response.status_code == 429:
+            logging.warning(f"❌ HTTP 429 Too Many Requests. Retrying in {retry_delay} seconds...")
+            time.sleep(retry_delay)
+            retry_delay *= 2
+            continue
+
+        if response.status_code != 200:
+            logging.error(f"Unable to retrieve {url}. HTTP Status Code: {response.status_code}")
+            return None
+
+        store_page(url, response.text)
+        return response.text
+
+    logging.error(f"Giving up on {url} after {max_retries} attempts.")
+    return None
+
+MATCHLOGS_TABLE_RE = re.compile(r'^matchlogs_for$')
+FIELD_PLAYERS_TABLE_RE = re.compile(r'^stats_.*_summary$')
+KEEPERS_TABLE_RE = re.compile(r'^keeper_stats_.*')
+
+# Find the tables whose id matches any of the patterns in a single lxml pass
+def find_tables(html, *id_patterns):
+    root = lxml.html.fromstring(html)
+    found = {pattern: [] for pattern in id_patterns}
+    for table in root.iter('table'):
+        table_id = table.get('id')
+        if not table_id:
+            continue
+        for pattern in id_patterns:
+            if pattern.match(table_id):
+                found[pattern].append(table)
+                break
+    return [found[pattern] for pattern in id_patterns]
+
+def _expand_header_row(row):
+    cells = []
+    for cell in row.iterchildren('th', 'td'):
+        cells.extend([cell.text_content().strip()] * int(cell.get('colspan', 1)))
+    return cells
+
+# Convert text columns to numbers where every value parses, like pd.read_html does
+def _infer_numeric_columns(df):
+    for col in df.columns:
         try:
-            session = requests.Session()
-            response = session.get(team_url, headers=headers)
-
-            if response.status_code == 429:
-                logging.warning(f"❌ HTTP 429 Too Many Requests. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2 
-                continue
-
-            if response.status_code != 200:
-                logging.error(f"Unable to retrieve data. HTTP Status Code: {response.status_code}")
-                return 
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Find the table with matchlogs
-            matchlogs_table = soup.find('table', {'id': 'matchlogs_for'})
-            if matchlogs_table is None:
-                logging.warning("Matchlogs table not found in the HTML.")
-                return []
-
-            df = pd.read_html(StringIO(str(matchlogs_table)))[0]
-
-            # Extract all 'Match Report' links
-            links_elements = matchlogs_table.find_all('td', {'data-stat': 'match_report'})
-            match_report_links = [
-                BASE_FBREF_URL + td.find('a')['href'] if td.find('a') else None
-                for td in links_elements
-            ]
-
-            df['match_report_link'] = match_report_links
-
-            # Map columns to database fields
-            df.rename(columns={
-                'Date': 'date',
-                'Time': 'time',
-                'Comp': 'competition',
-                'Round': 'round',
-                'Day': 'day',
-                'Venue': 'venue',
-                'Opponent': 'opponent',
-                'Result': 'result',
-                'GF': 'gf',
-                'GA': 'ga',
-                'xG': 'xg',
-                'xGA': 'xga',
-                'Poss': 'possession',
-                'Attendance': 'attendance',
-                'Captain': 'captain',
-                'Formation': 'formation',
-                'Opp Formation': 'opponent_formation',
-                'Referee': 'referee',
-                'Notes': 'notes'
-            }, inplace=True)
-
-            # Replace NaN with None
-            df = df.where(pd.notnull(df), None).drop(columns=['Match Report'])
-
-            # Convert DataFrame to list of dictionaries
-            match_data = df.to_dict(orient='records')
-
-            delay = random.uniform(6, 8)
-            time.sleep(delay)
-
-            return match_data
-        except Exception as e:
-            logging.error(f"Error fetching match data: {e}")
+            df[col] = pd.to_numeric(df[col].str.replace(',', '', regex=False))
+        except (ValueError, TypeError):
+            pass
+    return df
+
+# Build a DataFrame straight from the cells of an fbref table. Column names are
+# "<over header>_<header>" when the table has a grouping header row, otherwise
+# just "<header>". Footer (team totals) rows and repeated header rows are skipped.
+def table_to_dataframe(table, link_stat=None):
+    header_rows = table.xpath('./thead/tr')
+    if not header_rows:
+        raise ValueError(f"Table {table.get('id')} has no header")
+
+    columns = _expand_header_row(header_rows[-1])
+    if len(header_rows) > 1:
+        groups = _expand_header_row(header_rows[-2])
+        columns = [f"{group}_{name}" if group else name for group, name in zip(groups, columns)] + columns[len(groups):]
+
+    rows, links = [], []
+    for row in table.xpath('./tbody/tr'):
+        if 'thead' in row.get('class', ''):
+            continue
+        cells = list(row.iterchildren('th', 'td'))
+        values = [cell.text_content().strip() or None for cell in cells]
+        values += [None] * (len(columns) - len(values))
+        rows.append(values[:len(columns)])
+
+        if link_stat is not None:
+            link = None
+            for cell in cells:
+                if cell.get('data-stat') == link_stat:
+                    anchors = cell.xpath('.//a/@href')
+                    link = BASE_FBREF_URL + anchors[0] if anchors else None
+                    break
+            links.append(link)
+
+    df = _infer_numeric_columns(pd.DataFrame(rows, columns=columns, dtype=object))
+    if link_stat is not None:
+        return df, links
+    return df
+
+# fbref writes scores as "2", or as "1 (4)" after a penalty shootout
+SCORE_RE = r'^\s*(\d+(?:\.\d+)?)\s*(?:\((\d+)\))?'
+SCORE_COLUMNS = ['gf_clean', 'ga_clean', 'gf_pso', 'ga_pso', 'xg_filled', 'xga_filled']
+
+# Add numeric score columns derived from the raw gf/ga/xg/xga values: goals,
+# shootout goals, and xG/xGA falling back to the goals when fbref has no xG
+# (no xG columns at all before 2017-2018)
+def add_score_columns(df):
+    for goals_col, xg_col in (('gf', 'xg'), ('ga', 'xga')):
+        goals = df[goals_col].astype(str).str.extract(SCORE_RE).astype(float)
+        df[f'{goals_col}_clean'] = goals[0]
+        df[f'{goals_col}_pso'] = goals[1]
+        if xg_col in df.columns:
+            xg = df[xg_col].astype(str).str.extract(SCORE_RE)[0].astype(float)
+            df[f'{xg_col}_filled'] = xg.fillna(goals[0])
+        else:
+            df[f'{xg_col}_filled'] = goals[0]
+    return df
+
+# max_age is the accepted age of a cached page; pass None for finished seasons
+def scrap_team_matchlogs(team_url, max_age=CURRENT_SEASON_TTL):
+    try:
+        html = fetch_page(team_url, max_age=max_age)
+        if html is None:
             return
 
-def scrap_match_stats(match_url, home_team, away_team, venue):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
-    }
-
-    max_retries = 3 
-    retry_delay = 30
-
-    for attempt in range(max_retries):
-        try:
-            session = requests.Session()
-            response = session.get(match_url, headers=headers)
-
-            if response.status_code == 429:
-                logging.warning(f"❌ HTTP 429 Too Many Requests. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2 
-                continue
-
-            if response.status_code != 200:
-                logging.error(f"Unable to retrieve match report. HTTP Status Code: {response.status_code}")
-                return pd.DataFrame(), pd.DataFrame()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            field_players_stats = soup.find_all('table', id=re.compile(r'^stats_.*_summary$'))
-            keepers_stats = soup.find_all('table', id=re.compile(r'^keeper_stats_.*'))
-
-            if not field_players_stats:
-                logging.warning(f"No player stats found for {home_team} vs {away_team}")
-            if not keepers_stats:
-                logging.warning(f"No keeper stats found for {home_team} vs {away_team}")
-
-            labels, keepers_labels = [], []
-            if venue == "Home" or venue == "Neutral":
-                labels = [f"{home_team} player stats table", f"{away_team} player stats table"]
-                keepers_labels = [f"{home_team} keeper stats table", f"{away_team} keeper stats table"]
-            elif venue == "Away":
-                labels = [f"{away_team} player stats table", f"{home_team} player stats table"]
-                keepers_labels = [f"{away_team} keeper stats table", f"{home_team} keeper stats table"]         
-
-            field_players_stats_df, keepers_stats_df = [], []
-
-            # Process field players' stats
-            for table, label in zip(field_players_stats, labels):
-                try:
-                    df = pd.read_html(StringIO(str(table)))[0]
-                    if df.empty:
-                        logging.warning(f"Empty table for {label}")
-                        continue
-
-                    df = df.iloc[:-1, :]  # Drop summary row
-                    df.columns = ['_'.join(col).strip() if isinstance(col, tuple) else col.replace(' ', '_').strip() for col in df.columns]
+        # Find the table with matchlogs
+        [matchlogs_tables] = find_tables(html, MATCHLOGS_TABLE_RE)
+        if not matchlogs_tables:
+            logging.warning("Matchlogs table not found in the HTML.")
+            invalidate_cached_page(team_url)
+            return []
+
+        # Extract the table together with all 'Match Report' links
+        df, match_report_links = table_to_dataframe(matchlogs_tables[0], link_stat='match_report')
+
+        df['match_report_link'] = match_report_links
+
+        # Map columns to database fields
+        df.rename(columns={
+            'Date': 'date',
+            'Time': 'time',
+            'Comp': 'competition',
+            'Round': 'round',
+            'Day': 'day',
+            'Venue': 'venue',
+            'Opponent': 'opponent',
+            'Result': 'result',
+            'GF': 'gf',
+            'GA': 'ga',
+            'xG': 'xg',
+            'xGA': 'xga',
+            'Poss': 'possession',
+            'Attendance': 'attendance',
+            'Captain': 'captain',
+            'Formation': 'formation',
+            'Opp Formation': 'opponent_formation',
+            'Referee': 'referee',
+            'Notes': 'notes'
+        }, inplace=True)
+        df = add_score_columns(df)
+
+        # Replace NaN with None
+        df = df.where(pd.notnull(df), None).drop(columns=['Match Report'])
+
+        # Convert DataFrame to list of dictionaries
+        match_data = df.to_dict(orient='records')
+
+        return match_data
+    except Exception as e:
+        logging.error(f"Error fetching match data: {e}")
+        return
+
+# Download a match report and parse its player and keeper tables. Tables are
+# returned in page order (home side first) and without a team label, so one
+# download can serve the match rows of both teams. Returns None on failure.
+# Reports of played matches never change, so cached copies do not expire by default.
+def scrap_match_report(match_url, max_age=None):
+    try:
+        html = fetch_page(match_url, max_age=max_age)
+        if html is None:
+            return None
+
+        field_players_stats, keepers_stats = find_tables(html, FIELD_PLAYERS_TABLE_RE, KEEPERS_TABLE_RE)
+
+        if not field_players_stats:
+            logging.warning(f"No player stats found in {match_url}")
+        if not keepers_stats:
+            logging.warning(f"No keeper stats found in {match_url}")
+        if not field_players_stats or not keepers_stats:
+            # Do not keep an incomplete report around, it may be published later
+            invalidate_cached_page(match_url)
+
+        field_players_stats_dfs, keepers_stats_dfs = [], []
+
+        # Process field players' stats
+        for side, table in enumerate(field_players_stats):
+            try:
+                df = table_to_dataframe(table)  # Summary row lives in tfoot and is skipped
+                if df.empty:
+                    logging.warning(f"Empty player stats table #{side + 1} in {match_url}")
+                    df = None
+                else:
                     df.rename(columns={
                         df.columns[0]: 'Player',
                         df.columns[1]: 'Shirt #',
@@ -151,38 +307,52 @@ def scrap_match_stats(match_url, home_team, away_team, venue):
                         df.columns[4]: 'Age',
                         df.columns[5]: 'Min'
                     }, inplace=True)
-
-                    # Assign team to each player
-                    df['Team'] = home_team if label.startswith(home_team) else away_team
-                    field_players_stats_df.append(df)
-                except ValueError as e:
-                    logging.error(f"Error reading HTML for {label}: {e}")
-
-            # Process keepers' stats
-            for table, label in zip(keepers_stats, keepers_labels):
-                try:
-                    df = pd.read_html(StringIO(str(table)))[0]
-                    df.columns = ['_'.join(col).strip() if isinstance(col, tuple) else col.replace(' ', '_').strip() for col in df.columns]
-                    df.rename(columns={
-                        df.columns[0]: 'Player',
-                        df.columns[1]: 'Nat',
-                        df.columns[2]: 'Age',
-                        df.columns[3]: 'Min'
-                    }, inplace=True)
-
-                    # Assign team to each keeper
-                    df['Team'] = home_team if label.startswith(home_team) else away_team
-                    keepers_stats_df.append(df)
-                except ValueError as e:
-                    logging.error(f"Error reading HTML for {label}: {e}")
-
-            field_players_stats_df = pd.concat(field_players_stats_df) if field_players_stats_df else pd.DataFrame()
-            keepers_stats_df = pd.concat(keepers_stats_df) if keepers_stats_df else pd.DataFrame()
-
-            delay = random.uniform(6, 8)
-            time.sleep(delay)
-
-            return field_players_stats_df, keepers_stats_df
-        except Exception as e:
-            logging.error(f"An error occurred while getting data: {e}")
-            return pd.DataFrame(), pd.DataFrame()
\ No newline at end of file
+            except ValueError as e:
+                logging.error(f"Error reading player stats table #{side + 1} in {match_url}: {e}")
+                df = None
+            field_players_stats_dfs.append(df)
+
+        # Process keepers' stats
+        for side, table in enumerate(keepers_stats):
+            try:
+                df = table_to_dataframe(table)
+                df.rename(columns={
+                    df.columns[0]: 'Player',
+                    df.columns[1]: 'Nat',
+                    df.columns[2]: 'Age',
+                    df.columns[3]: 'Min'
+                }, inplace=True)
+            except ValueError as e:
+                logging.error(f"Error reading keeper stats table #{side + 1} in {match_url}: {e}")
+                df = None
+            keepers_stats_dfs.append(df)
+
+        return field_players_stats_dfs, keepers_stats_dfs
+    except Exception as e:
+        logging.error(f"An error occurred while getting data: {e}")
+        return None
+
+# Label the tables of a parsed report from the point of view of one team
+def assign_match_teams(report, home_team, away_team, venue):
+    field_players_stats, keepers_stats = report
+
+    sides = []
+    if venue == "Home" or venue == "Neutral":
+        sides = [home_team, away_team]
+    elif venue == "Away":
+        sides = [away_team, home_team]
+
+    # Assign team to each player and keeper
+    field_players_stats_df = [df.assign(Team=team) for df, team in zip(field_players_stats, sides) if df is not None]
+    keepers_stats_df = [df.assign(Team=team) for df, team in zip(keepers_stats, sides) if df is not None]
+
+    field_players_stats_df = pd.concat(field_players_stats_df) if field_players_stats_df else pd.DataFrame()
+    keepers_stats_df = pd.concat(keepers_stats_df) if keepers_stats_df else pd.DataFrame()
+
+    return field_players_stats_df, keepers_stats_df
+
+def scrap_match_stats(match_url, home_team, away_team, venue, max_age=None):
+    report = scrap_match_report(match_url, max_age=max_age)
+    if report is None:
+        return pd.DataFrame(), pd.DataFrame()
+    return assign_match_teams(report, home_team, away_team, venue)
@@ -0,0 +1,89 @@
+import logging
+import os
+import re
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Parquet snapshots of match_player_stats for finished seasons: one file per
+# league and season, written as one row group per team, so a team filter reads
+# a single row group. Files are memory-mapped and only the requested columns
+# are read. Without pyarrow installed the loaders report no snapshot and the
+# callers fall back to the database.
+SNAPSHOT_DIR = os.environ.get("STATFIELD_SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+
+ARROW_TYPES = {
+    "int64": "int64",
+    "float32": "float32",
+    "string": "string",
+}
+
+def snapshot_path(league, season):
+    league_slug = re.sub(r"[^a-z0-9]+", "_", league.lower()).strip("_")
+    return os.path.join(SNAPSHOT_DIR, league_slug, f"{season}.parquet")
+
+def has_snapshot(league, season):
+    return pq is not None and os.path.exists(snapshot_path(league, season))
+
+# Arrow schema from {column: dtype}; categorical columns become dictionary-encoded strings
+def _arrow_schema(dtypes):
+    fields = []
+    for column, dtype in dtypes.items():
+        if dtype == "category":
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(column, pa.type_for_alias(ARROW_TYPES[dtype])))
+    return pa.schema(fields)
+
+# Write the stats of one league season; dtypes gives the column types of the file
+def write_snapshot(df, league, season, dtypes):
+    if pq is None:
+        raise RuntimeError("Writing snapshots requires pyarrow.")
+
+    schema = _arrow_schema(dtypes)
+    df = df.reindex(columns=list(dtypes))
+    for column, dtype in dtypes.items():
+        if dtype in ("int64", "float32"):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+        else:
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+    df = df.sort_values(["team", "match_id", "id"])
+    path = snapshot_path(league, season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            for team, team_df in df.groupby("team", sort=False):
+                writer.write_table(pa.Table.from_pandas(team_df, schema=schema, preserve_index=False))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+# Read a league season snapshot, optionally only some columns, one team and some
+# matches. Returns None when there is no snapshot (or pyarrow is missing).
+def load_snapshot(league, season, columns=None, team=None, match_ids=None):
+    if not has_snapshot(league, season):
+        return None
+
+    filters = []
+    if team is not None:
+        filters.append(("team", "=", team))
+    if match_ids is not None:
+        filters.append(("match_id", "in", [int(mid) for mid in match_ids]))
+    try:
+        table = pq.read_table(
+            snapshot_path(league, season), columns=columns, filters=filters or None, memory_map=True
+        )
+    except (OSError, pa.ArrowException) as e:
+        logging.warning(f"Unreadable snapshot for {league} {season}: {e}")
+        return None
+    return table.to_pandas()
@@ -0,0 +1,159 @@
+import streamlit as st
+import datetime
+import os
+from database import TABLE_TTLS, get_team_matches_by_season, get_data_version, update_matchlogs, update_stats_for_matches
+
+# Streamlit side of the data layer: progress messages of the update functions
+# and the page helpers built on top of them
+
+# Page message for every progress event of update_matchlogs / update_match_stats
+PROGRESS_MESSAGES = {
+    "no_teams": (st.warning, "❌ No teams found in the database!"),
+    "matchlogs_started": (st.info, "🔄 Updating matchlogs for {teams} team(s) across {seasons} season(s)..."),
+    "matchlogs_updated": (st.success, "✅ Updated matchlogs for {team} ({season})"),
+    "matchlogs_missing": (st.warning, "⚠️ No data found for {team} ({season})"),
+    "matchlogs_failed": (st.warning, "⚠️ Updating matchlogs for {team} ({season}) failed: {error}"),
+    "checkpoint_skipped": (st.info, "⏭️ Skipping {units} unit(s) already done or waiting for a retry"),
+    "matchlogs_finished": (st.success, "🎉 All team matchlogs have been updated!"),
+    "stats_started": (st.info, "🔄 Updating match stats for {teams} team(s) across {seasons} season(s)..."),
+    "no_matches": (st.warning, "⚠️ No matches found for {team} in {season}"),
+    "no_report_link": (st.warning, "⚠️ No match report link for {team} vs {opponent} ({season})"),
+    "stats_reports": (st.write, "📊 Updating stats for {reports} match report(s)..."),
+    "stats_missing": (st.warning, "⚠️ No player stats available for {team} vs {opponent} ({season})"),
+    "stats_updated": (st.success, "✅ Stats updated for {team} vs {opponent} ({season})"),
+    "stats_failed": (st.warning, "⚠️ Updating stats for {team} vs {opponent} ({season}) failed: {error}"),
+    "mvp_scored": (st.write, "🏅 Stored MVP scores for {matches} match(es)"),
+    "stats_finished": (st.success, "🎉 All match stats have been updated!"),
+    "bulk_flushed": (st.write, "💾 Wrote {rows} row(s) to {table} ({rows_per_sec:.0f} rows/s)"),
+}
+
+# Progress reporter that writes the events to the current page
+def streamlit_progress(event, **fields):
+    show, message = PROGRESS_MESSAGES[event]
+    show(message.format(**fields))
+
+def check_and_update_data(team_id, team_name, season, league, update_stats=False):
+    if "update_attempted" not in st.session_state:
+        st.session_state.update_attempted = False
+
+    df = get_team_matches_by_season(team_id, season)
+    if df.empty:
+        st.info("Updating matchlogs...")
+        if not st.session_state.update_attempted:
+            try:
+                update_matchlogs(season=season, league=league, team_name=team_name, all_seasons=False, report=streamlit_progress)
+            except Exception as e:
+                st.error("Update matchlogs failed: " + str(e))
+            st.session_state.update_attempted = True
+            st.rerun()
+        else:
+            st.error("Matchlogs update did not succeed. Continuing without updated data.")
+
+    past_missing = df[(df['date'].dt.date < datetime.date.today()) & (df['result'].isna())]
+    if not past_missing.empty:
+        if not st.session_state.update_attempted:
+            try:
+                # Only fixtures that changed are written, and only matches that
+                # just gained a result get their stats scraped. The cached page
+                # is what lacks the results, so a fresh one is fetched.
+                newly_played = update_matchlogs(season=season, league=league, team_name=team_name, all_seasons=False, report=streamlit_progress, incremental=True, max_age=0)
+                if update_stats and newly_played:
+                    st.info(f"Also updating match stats for {team_name} in {season}")
+                    update_stats_for_matches(newly_played, report=streamlit_progress)
+            except Exception as e:
+                st.error("Error updating past matches: " + str(e))
+            st.session_state.update_attempted = True
+            st.rerun()
+        else:
+            st.info("Some past matches still have missing results. Please try again later – updates usually occur the day after the round of a competition is completed.")
+
+# Memoised page computations are keyed by team, season and the data version stamp
+# of database.get_data_version, so they are recomputed after writes and otherwise
+# survive reruns caused by unrelated widgets. Least recently used entries are
+# dropped beyond MEMO_MAX_ENTRIES; the TTL catches writes made by other processes.
+MEMO_MAX_ENTRIES = int(os.environ.get("STATFIELD_MEMO_MAX_ENTRIES", 64))
+MEMO_TTL = TABLE_TTLS["matches"]
+
+def memoised(func):
+    return st.cache_data(max_entries=MEMO_MAX_ENTRIES, ttl=MEMO_TTL, show_spinner=False)(func)
+
+# Additional function to calculate display key team metrics
+def calculate_and_display_key_team_metrics(team_id, selected_season, selected_team):
+        metrics = key_team_metrics(team_id, selected_season, get_data_version(team_id, selected_season))
+        st.subheader(f"Key {selected_team} metrics for season {selected_season}")
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(label="📅 Matches played", value=f"{metrics['matches_played']}")
+            st.metric(label="🎯⚽ Goals For", value=f"{metrics['total_goals_for']:.0f}")
+            st.metric(label="🎯 Total xG", value=f"{metrics['total_xG']:.1f}" if metrics['total_xG'] is not None else "No data")
+            st.metric(label="⏳ Average Possession", value=f"{metrics['average_possession']:.1f}%")
+        with col2:
+            st.metric(label="🏆 Wins", value=f"{metrics['total_wins']}")
+            st.metric(label="❌⚽ Goals Against", value=f"{metrics['total_goals_against']:.0f}")
+            st.metric(label="❌ Total xGA", value=f"{metrics['total_xGA']:.1f}" if metrics['total_xGA'] is not None else "No data")
+            st.metric(label="👥 Average Home Attendance", value=f"{metrics['average_home_attendance']:.0f}")
+        with col3:
+            st.metric(label="🤝 Draws", value=f"{metrics['total_draws']}")
+            st.metric(label="⚽📈 Average Goals For", value=f"{metrics['average_goals_for']:.1f}")
+            st.metric(label="🎯📊 Average xG", value=f"{metrics['average_xG']:.1f}" if metrics['average_xG'] is not None else "No data")
+            st.metric(label="🔥 Current Unbeaten Streak", value=f"{metrics['current_streak']}")
+        with col4:
+            st.metric(label="❌ Losses", value=f"{metrics['total_losses']}")
+            st.metric(label="⚽📉 Average Goals Against", value=f"{metrics['average_goals_against']:.1f}")
+            st.metric(label="❌📊 Average xGA", value=f"{metrics['average_xGA']:.1f}" if metrics['average_xGA'] is not None else "No data")
+            st.metric(label="🔥 Longest Unbeaten Streak", value=f"{metrics['longest_streak']}")
+
+@memoised
+def key_team_metrics(team_id, selected_season, data_version):
+        df = get_team_matches_by_season(team_id, selected_season)
+        total_wins = df[df['result'] == 'W'].shape[0]
+        total_draws = df[df['result'] == 'D'].shape[0]
+        total_losses = df[df['result'] == 'L'].shape[0]
+        matches_played = total_wins + total_draws + total_losses
+
+        df_played = df.dropna(subset=['result']).sort_values(by='date').reset_index(drop=True)
+
+        current_streak = 0
+        for result in reversed(df_played['result']):
+            if result in ['W', 'D']:
+                current_streak += 1
+            else:
+                break
+
+        longest_streak = 0
+        temp_streak = 0
+        for result in df_played['result']:
+            if result in ['W', 'D']:
+                temp_streak += 1
+                longest_streak = max(longest_streak, temp_streak)
+            else:
+                temp_streak = 0
+
+        gf_values = df_played['gf_clean'].fillna(0.0)
+        ga_values = df_played['ga_clean'].fillna(0.0)
+
+        average_goals_for = gf_values.mean()
+        average_goals_against = ga_values.mean()
+        total_goals_for = gf_values.sum()
+        total_goals_against = ga_values.sum()
+        average_possession = df_played['possession'].mean()
+
+        average_xG = df['xg_filled'].mean(skipna=True)
+        total_xG = df['xg_filled'].sum(skipna=True)
+        average_xGA = df['xga_filled'].mean(skipna=True)
+        total_xGA = df['xga_filled'].sum(skipna=True)
+
+
+        home_matches = df[df['venue'] == 'Home']
+        average_home_attendance = home_matches['attendance'].mean()
+
+
+        return {
+            "matches_played": matches_played, "total_wins": total_wins, "total_draws": total_draws,
+            "total_losses": total_losses, "current_streak": current_streak, "longest_streak": longest_streak,
+            "average_goals_for": average_goals_for, "average_goals_against": average_goals_against,
+            "total_goals_for": total_goals_for, "total_goals_against": total_goals_against,
+            "average_possession": average_possession, "average_xG": average_xG, "total_xG": total_xG,
+            "average_xGA": average_xGA, "total_xGA": total_xGA, "average_home_attendance": average_home_attendance,
+        }
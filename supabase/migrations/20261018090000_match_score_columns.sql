@@ -0,0 +1,26 @@
+-- Numeric score columns written at ingestion next to the raw fbref strings.
+-- gf/ga hold values such as '2' or '1 (4)' (shootout goals in brackets);
+-- xg_filled/xga_filled fall back to the goals when fbref has no xG for a match.
+alter table matches
+    add column if not exists gf_clean numeric,
+    add column if not exists ga_clean numeric,
+    add column if not exists gf_pso numeric,
+    add column if not exists ga_pso numeric,
+    add column if not exists xg_filled numeric,
+    add column if not exists xga_filled numeric;
+
+-- Backfill rows ingested before the columns existed
+update matches set
+    gf_clean = (substring(gf::text from '^\s*(\d+(?:\.\d+)?)'))::numeric,
+    ga_clean = (substring(ga::text from '^\s*(\d+(?:\.\d+)?)'))::numeric,
+    gf_pso = (substring(gf::text from '\((\d+)\)'))::numeric,
+    ga_pso = (substring(ga::text from '\((\d+)\)'))::numeric,
+    xg_filled = coalesce(
+        (substring(xg::text from '^\s*(\d+(?:\.\d+)?)'))::numeric,
+        (substring(gf::text from '^\s*(\d+(?:\.\d+)?)'))::numeric
+    ),
+    xga_filled = coalesce(
+        (substring(xga::text from '^\s*(\d+(?:\.\d+)?)'))::numeric,
+        (substring(ga::text from '^\s*(\d+(?:\.\d+)?)'))::numeric
+    )
+where gf_clean is null and ga_clean is null;
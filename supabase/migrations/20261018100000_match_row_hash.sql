@@ -0,0 +1,3 @@
+-- Content hash of the scraped matches row, used by incremental refreshes to
+-- write only new or changed fixtures. Rows without a hash count as changed.
+alter table matches add column if not exists row_hash text;
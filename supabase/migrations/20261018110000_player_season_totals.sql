@@ -0,0 +1,66 @@
+-- Per-player season aggregates of one team's matches, called by
+-- database.get_player_season_totals() as supabase.rpc("player_season_totals", ...).
+-- Returns one JSON object per player: appearances, the positions of every
+-- appearance, sums, per-match averages (_avg) and per-90 rates (_per90).
+-- The column lists follow SEASON_SUM_COLUMNS / SEASON_AVG_COLUMNS in database.py.
+create or replace function player_season_totals(p_match_ids bigint[], p_team text)
+returns jsonb
+language sql
+stable
+as $$
+    select coalesce(jsonb_agg(totals order by totals.player_name), '[]'::jsonb)
+    from (
+        select
+            player_name,
+            string_agg(position, ',') as positions,
+            count(*) as matches,
+            coalesce(sum(minutes_played::numeric), 0) as minutes_played,
+            coalesce(sum(performance_gls::numeric), 0) as performance_gls,
+            coalesce(sum(performance_ast::numeric), 0) as performance_ast,
+            coalesce(sum(performance_sh::numeric), 0) as performance_sh,
+            coalesce(sum(performance_sot::numeric), 0) as performance_sot,
+            coalesce(sum(expected_xg::numeric), 0) as expected_xg,
+            coalesce(sum(expected_xag::numeric), 0) as expected_xag,
+            coalesce(sum(sca_sca::numeric), 0) as sca_sca,
+            coalesce(sum(sca_gca::numeric), 0) as sca_gca,
+            coalesce(sum(passes_cmp::numeric), 0) as passes_cmp,
+            coalesce(sum(passes_att::numeric), 0) as passes_att,
+            coalesce(sum(passes_prgp::numeric), 0) as passes_prgp,
+            coalesce(sum(carries_carries::numeric), 0) as carries_carries,
+            coalesce(sum(carries_prgc::numeric), 0) as carries_prgc,
+            coalesce(sum(take_ons_att::numeric), 0) as take_ons_att,
+            coalesce(sum(take_ons_succ::numeric), 0) as take_ons_succ,
+            coalesce(sum(performance_tkl::numeric), 0) as performance_tkl,
+            coalesce(sum(performance_int::numeric), 0) as performance_int,
+            coalesce(sum(performance_blocks::numeric), 0) as performance_blocks,
+            avg(expected_xg::numeric) as expected_xg_avg,
+            avg(expected_xag::numeric) as expected_xag_avg,
+            avg(passes_cmp_percent::numeric) as passes_cmp_percent_avg,
+            avg(passes_prgp::numeric) as passes_prgp_avg,
+            avg(carries_prgc::numeric) as carries_prgc_avg,
+            coalesce(sum(performance_gls::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as performance_gls_per90,
+            coalesce(sum(performance_ast::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as performance_ast_per90,
+            coalesce(sum(performance_sh::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as performance_sh_per90,
+            coalesce(sum(performance_sot::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as performance_sot_per90,
+            coalesce(sum(expected_xg::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as expected_xg_per90,
+            coalesce(sum(expected_xag::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as expected_xag_per90,
+            coalesce(sum(sca_sca::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as sca_sca_per90,
+            coalesce(sum(sca_gca::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as sca_gca_per90,
+            coalesce(sum(passes_cmp::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as passes_cmp_per90,
+            coalesce(sum(passes_att::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as passes_att_per90,
+            coalesce(sum(passes_prgp::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as passes_prgp_per90,
+            coalesce(sum(carries_carries::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as carries_carries_per90,
+            coalesce(sum(carries_prgc::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as carries_prgc_per90,
+            coalesce(sum(take_ons_att::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as take_ons_att_per90,
+            coalesce(sum(take_ons_succ::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as take_ons_succ_per90,
+            coalesce(sum(performance_tkl::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as performance_tkl_per90,
+            coalesce(sum(performance_int::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as performance_int_per90,
+            coalesce(sum(performance_blocks::numeric), 0) * 90.0 / nullif(sum(minutes_played::numeric), 0) as performance_blocks_per90
+        from match_player_stats
+        where match_id = any(p_match_ids) and team = p_team
+        group by player_name
+    ) totals
+$$;
+
+grant execute on function player_season_totals(bigint[], text) to anon, authenticated;
+
@@ -0,0 +1,297 @@
+-- Per-player season sums of match_player_stats, kept up to date by a trigger,
+-- so per-90 rates are a lookup of one row per player (database.get_player_season_stats).
+-- Percentages are stored as minute-weighted numerators (<column>_weighted);
+-- dividing by minutes_played gives the minute-weighted average.
+-- The metric columns follow SEASON_STATS_METRICS in database.py.
+create table if not exists player_season_stats (
+    id bigint generated by default as identity primary key,
+    team text not null,
+    season text not null,
+    player_name text not null,
+    position text,
+    appearances integer not null default 0,
+    minutes_played numeric not null default 0,
+    performance_gls numeric not null default 0,
+    performance_ast numeric not null default 0,
+    performance_pk numeric not null default 0,
+    performance_pkatt numeric not null default 0,
+    performance_sh numeric not null default 0,
+    performance_sot numeric not null default 0,
+    performance_crdy numeric not null default 0,
+    performance_crdr numeric not null default 0,
+    performance_fls numeric not null default 0,
+    performance_fld numeric not null default 0,
+    performance_off numeric not null default 0,
+    performance_crs numeric not null default 0,
+    performance_tklw numeric not null default 0,
+    performance_int numeric not null default 0,
+    performance_og numeric not null default 0,
+    performance_pkwon numeric not null default 0,
+    performance_pkcon numeric not null default 0,
+    performance_touches numeric not null default 0,
+    performance_tkl numeric not null default 0,
+    performance_blocks numeric not null default 0,
+    expected_xg numeric not null default 0,
+    expected_npxg numeric not null default 0,
+    expected_xag numeric not null default 0,
+    sca_sca numeric not null default 0,
+    sca_gca numeric not null default 0,
+    passes_cmp numeric not null default 0,
+    passes_att numeric not null default 0,
+    passes_cmp_percent_weighted numeric not null default 0,
+    passes_prgp numeric not null default 0,
+    carries_carries numeric not null default 0,
+    carries_prgc numeric not null default 0,
+    take_ons_att numeric not null default 0,
+    take_ons_succ numeric not null default 0,
+    shot_stopping_sota numeric not null default 0,
+    shot_stopping_ga numeric not null default 0,
+    shot_stopping_saves numeric not null default 0,
+    shot_stopping_save_percent_weighted numeric not null default 0,
+    shot_stopping_psxg numeric not null default 0,
+    launched_cmp numeric not null default 0,
+    launched_att numeric not null default 0,
+    launched_cmp_percent_weighted numeric not null default 0,
+    passes_att_gk numeric not null default 0,
+    passes_thr numeric not null default 0,
+    passes_launch_percent_weighted numeric not null default 0,
+    passes_avglen numeric not null default 0,
+    goal_kicks_att numeric not null default 0,
+    goal_kicks_launch_percent_weighted numeric not null default 0,
+    goal_kicks_avglen numeric not null default 0,
+    crosses_opp numeric not null default 0,
+    crosses_stp numeric not null default 0,
+    crosses_stp_percent_weighted numeric not null default 0,
+    sweeper_opa numeric not null default 0,
+    sweeper_avgdist numeric not null default 0,
+    unique (team, season, player_name)
+);
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one player stats row from the season sums.
+-- A fixture's stats are stored under the match row of each tracked team, so only
+-- rows of the team that owns the match row are counted (once per appearance).
+create or replace function apply_player_season_stats(r match_player_stats, p_sign integer)
+returns void
+language plpgsql
+as $$
+declare
+    v_season text;
+begin
+    select m.season into v_season
+    from matches m
+    join teams t on t.id = m.team_id
+    where m.id = r.match_id and t.name = r.team;
+    if v_season is null then
+        return;
+    end if;
+
+    insert into player_season_stats (team, season, player_name, position, appearances, minutes_played, performance_gls, performance_ast, performance_pk, performance_pkatt, performance_sh, performance_sot, performance_crdy, performance_crdr, performance_fls, performance_fld, performance_off, performance_crs, performance_tklw, performance_int, performance_og, performance_pkwon, performance_pkcon, performance_touches, performance_tkl, performance_blocks, expected_xg, expected_npxg, expected_xag, sca_sca, sca_gca, passes_cmp, passes_att, passes_cmp_percent_weighted, passes_prgp, carries_carries, carries_prgc, take_ons_att, take_ons_succ, shot_stopping_sota, shot_stopping_ga, shot_stopping_saves, shot_stopping_save_percent_weighted, shot_stopping_psxg, launched_cmp, launched_att, launched_cmp_percent_weighted, passes_att_gk, passes_thr, passes_launch_percent_weighted, passes_avglen, goal_kicks_att, goal_kicks_launch_percent_weighted, goal_kicks_avglen, crosses_opp, crosses_stp, crosses_stp_percent_weighted, sweeper_opa, sweeper_avgdist)
+    values (
+        r.team, v_season, r.player_name, case when p_sign > 0 then r.position end, p_sign,
+        p_sign * coalesce(r.minutes_played::numeric, 0),
+        p_sign * coalesce(r.performance_gls::numeric, 0),
+        p_sign * coalesce(r.performance_ast::numeric, 0),
+        p_sign * coalesce(r.performance_pk::numeric, 0),
+        p_sign * coalesce(r.performance_pkatt::numeric, 0),
+        p_sign * coalesce(r.performance_sh::numeric, 0),
+        p_sign * coalesce(r.performance_sot::numeric, 0),
+        p_sign * coalesce(r.performance_crdy::numeric, 0),
+        p_sign * coalesce(r.performance_crdr::numeric, 0),
+        p_sign * coalesce(r.performance_fls::numeric, 0),
+        p_sign * coalesce(r.performance_fld::numeric, 0),
+        p_sign * coalesce(r.performance_off::numeric, 0),
+        p_sign * coalesce(r.performance_crs::numeric, 0),
+        p_sign * coalesce(r.performance_tklw::numeric, 0),
+        p_sign * coalesce(r.performance_int::numeric, 0),
+        p_sign * coalesce(r.performance_og::numeric, 0),
+        p_sign * coalesce(r.performance_pkwon::numeric, 0),
+        p_sign * coalesce(r.performance_pkcon::numeric, 0),
+        p_sign * coalesce(r.performance_touches::numeric, 0),
+        p_sign * coalesce(r.performance_tkl::numeric, 0),
+        p_sign * coalesce(r.performance_blocks::numeric, 0),
+        p_sign * coalesce(r.expected_xg::numeric, 0),
+        p_sign * coalesce(r.expected_npxg::numeric, 0),
+        p_sign * coalesce(r.expected_xag::numeric, 0),
+        p_sign * coalesce(r.sca_sca::numeric, 0),
+        p_sign * coalesce(r.sca_gca::numeric, 0),
+        p_sign * coalesce(r.passes_cmp::numeric, 0),
+        p_sign * coalesce(r.passes_att::numeric, 0),
+        p_sign * coalesce(r.passes_cmp_percent::numeric * r.minutes_played::numeric, 0),
+        p_sign * coalesce(r.passes_prgp::numeric, 0),
+        p_sign * coalesce(r.carries_carries::numeric, 0),
+        p_sign * coalesce(r.carries_prgc::numeric, 0),
+        p_sign * coalesce(r.take_ons_att::numeric, 0),
+        p_sign * coalesce(r.take_ons_succ::numeric, 0),
+        p_sign * coalesce(r.shot_stopping_sota::numeric, 0),
+        p_sign * coalesce(r.shot_stopping_ga::numeric, 0),
+        p_sign * coalesce(r.shot_stopping_saves::numeric, 0),
+        p_sign * coalesce(r.shot_stopping_save_percent::numeric * r.minutes_played::numeric, 0),
+        p_sign * coalesce(r.shot_stopping_psxg::numeric, 0),
+        p_sign * coalesce(r.launched_cmp::numeric, 0),
+        p_sign * coalesce(r.launched_att::numeric, 0),
+        p_sign * coalesce(r.launched_cmp_percent::numeric * r.minutes_played::numeric, 0),
+        p_sign * coalesce(r.passes_att_gk::numeric, 0),
+        p_sign * coalesce(r.passes_thr::numeric, 0),
+        p_sign * coalesce(r.passes_launch_percent::numeric * r.minutes_played::numeric, 0),
+        p_sign * coalesce(r.passes_avglen::numeric, 0),
+        p_sign * coalesce(r.goal_kicks_att::numeric, 0),
+        p_sign * coalesce(r.goal_kicks_launch_percent::numeric * r.minutes_played::numeric, 0),
+        p_sign * coalesce(r.goal_kicks_avglen::numeric, 0),
+        p_sign * coalesce(r.crosses_opp::numeric, 0),
+        p_sign * coalesce(r.crosses_stp::numeric, 0),
+        p_sign * coalesce(r.crosses_stp_percent::numeric * r.minutes_played::numeric, 0),
+        p_sign * coalesce(r.sweeper_opa::numeric, 0),
+        p_sign * coalesce(r.sweeper_avgdist::numeric, 0)
+    )
+    on conflict (team, season, player_name) do update set
+        position = coalesce(player_season_stats.position, excluded.position),
+        appearances = player_season_stats.appearances + excluded.appearances,
+        minutes_played = player_season_stats.minutes_played + excluded.minutes_played,
+        performance_gls = player_season_stats.performance_gls + excluded.performance_gls,
+        performance_ast = player_season_stats.performance_ast + excluded.performance_ast,
+        performance_pk = player_season_stats.performance_pk + excluded.performance_pk,
+        performance_pkatt = player_season_stats.performance_pkatt + excluded.performance_pkatt,
+        performance_sh = player_season_stats.performance_sh + excluded.performance_sh,
+        performance_sot = player_season_stats.performance_sot + excluded.performance_sot,
+        performance_crdy = player_season_stats.performance_crdy + excluded.performance_crdy,
+        performance_crdr = player_season_stats.performance_crdr + excluded.performance_crdr,
+        performance_fls = player_season_stats.performance_fls + excluded.performance_fls,
+        performance_fld = player_season_stats.performance_fld + excluded.performance_fld,
+        performance_off = player_season_stats.performance_off + excluded.performance_off,
+        performance_crs = player_season_stats.performance_crs + excluded.performance_crs,
+        performance_tklw = player_season_stats.performance_tklw + excluded.performance_tklw,
+        performance_int = player_season_stats.performance_int + excluded.performance_int,
+        performance_og = player_season_stats.performance_og + excluded.performance_og,
+        performance_pkwon = player_season_stats.performance_pkwon + excluded.performance_pkwon,
+        performance_pkcon = player_season_stats.performance_pkcon + excluded.performance_pkcon,
+        performance_touches = player_season_stats.performance_touches + excluded.performance_touches,
+        performance_tkl = player_season_stats.performance_tkl + excluded.performance_tkl,
+        performance_blocks = player_season_stats.performance_blocks + excluded.performance_blocks,
+        expected_xg = player_season_stats.expected_xg + excluded.expected_xg,
+        expected_npxg = player_season_stats.expected_npxg + excluded.expected_npxg,
+        expected_xag = player_season_stats.expected_xag + excluded.expected_xag,
+        sca_sca = player_season_stats.sca_sca + excluded.sca_sca,
+        sca_gca = player_season_stats.sca_gca + excluded.sca_gca,
+        passes_cmp = player_season_stats.passes_cmp + excluded.passes_cmp,
+        passes_att = player_season_stats.passes_att + excluded.passes_att,
+        passes_cmp_percent_weighted = player_season_stats.passes_cmp_percent_weighted + excluded.passes_cmp_percent_weighted,
+        passes_prgp = player_season_stats.passes_prgp + excluded.passes_prgp,
+        carries_carries = player_season_stats.carries_carries + excluded.carries_carries,
+        carries_prgc = player_season_stats.carries_prgc + excluded.carries_prgc,
+        take_ons_att = player_season_stats.take_ons_att + excluded.take_ons_att,
+        take_ons_succ = player_season_stats.take_ons_succ + excluded.take_ons_succ,
+        shot_stopping_sota = player_season_stats.shot_stopping_sota + excluded.shot_stopping_sota,
+        shot_stopping_ga = player_season_stats.shot_stopping_ga + excluded.shot_stopping_ga,
+        shot_stopping_saves = player_season_stats.shot_stopping_saves + excluded.shot_stopping_saves,
+        shot_stopping_save_percent_weighted = player_season_stats.shot_stopping_save_percent_weighted + excluded.shot_stopping_save_percent_weighted,
+        shot_stopping_psxg = player_season_stats.shot_stopping_psxg + excluded.shot_stopping_psxg,
+        launched_cmp = player_season_stats.launched_cmp + excluded.launched_cmp,
+        launched_att = player_season_stats.launched_att + excluded.launched_att,
+        launched_cmp_percent_weighted = player_season_stats.launched_cmp_percent_weighted + excluded.launched_cmp_percent_weighted,
+        passes_att_gk = player_season_stats.passes_att_gk + excluded.passes_att_gk,
+        passes_thr = player_season_stats.passes_thr + excluded.passes_thr,
+        passes_launch_percent_weighted = player_season_stats.passes_launch_percent_weighted + excluded.passes_launch_percent_weighted,
+        passes_avglen = player_season_stats.passes_avglen + excluded.passes_avglen,
+        goal_kicks_att = player_season_stats.goal_kicks_att + excluded.goal_kicks_att,
+        goal_kicks_launch_percent_weighted = player_season_stats.goal_kicks_launch_percent_weighted + excluded.goal_kicks_launch_percent_weighted,
+        goal_kicks_avglen = player_season_stats.goal_kicks_avglen + excluded.goal_kicks_avglen,
+        crosses_opp = player_season_stats.crosses_opp + excluded.crosses_opp,
+        crosses_stp = player_season_stats.crosses_stp + excluded.crosses_stp,
+        crosses_stp_percent_weighted = player_season_stats.crosses_stp_percent_weighted + excluded.crosses_stp_percent_weighted,
+        sweeper_opa = player_season_stats.sweeper_opa + excluded.sweeper_opa,
+        sweeper_avgdist = player_season_stats.sweeper_avgdist + excluded.sweeper_avgdist;
+
+    delete from player_season_stats
+    where team = r.team and season = v_season and player_name = r.player_name and appearances <= 0;
+end
+$$;
+
+create or replace function player_season_stats_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform apply_player_season_stats(old, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform apply_player_season_stats(new, 1);
+    end if;
+    return null;
+end
+$$;
+
+drop trigger if exists match_player_stats_season_stats on match_player_stats;
+create trigger match_player_stats_season_stats
+after insert or update or delete on match_player_stats
+for each row execute function player_season_stats_trigger();
+
+-- Backfill from the rows ingested before the table existed
+truncate player_season_stats;
+insert into player_season_stats (team, season, player_name, position, appearances, minutes_played, performance_gls, performance_ast, performance_pk, performance_pkatt, performance_sh, performance_sot, performance_crdy, performance_crdr, performance_fls, performance_fld, performance_off, performance_crs, performance_tklw, performance_int, performance_og, performance_pkwon, performance_pkcon, performance_touches, performance_tkl, performance_blocks, expected_xg, expected_npxg, expected_xag, sca_sca, sca_gca, passes_cmp, passes_att, passes_cmp_percent_weighted, passes_prgp, carries_carries, carries_prgc, take_ons_att, take_ons_succ, shot_stopping_sota, shot_stopping_ga, shot_stopping_saves, shot_stopping_save_percent_weighted, shot_stopping_psxg, launched_cmp, launched_att, launched_cmp_percent_weighted, passes_att_gk, passes_thr, passes_launch_percent_weighted, passes_avglen, goal_kicks_att, goal_kicks_launch_percent_weighted, goal_kicks_avglen, crosses_opp, crosses_stp, crosses_stp_percent_weighted, sweeper_opa, sweeper_avgdist)
+select
+    s.team,
+    m.season,
+    s.player_name,
+    (array_agg(s.position order by s.id) filter (where s.position is not null))[1],
+    count(*),
+    coalesce(sum(s.minutes_played::numeric), 0),
+    coalesce(sum(s.performance_gls::numeric), 0),
+    coalesce(sum(s.performance_ast::numeric), 0),
+    coalesce(sum(s.performance_pk::numeric), 0),
+    coalesce(sum(s.performance_pkatt::numeric), 0),
+    coalesce(sum(s.performance_sh::numeric), 0),
+    coalesce(sum(s.performance_sot::numeric), 0),
+    coalesce(sum(s.performance_crdy::numeric), 0),
+    coalesce(sum(s.performance_crdr::numeric), 0),
+    coalesce(sum(s.performance_fls::numeric), 0),
+    coalesce(sum(s.performance_fld::numeric), 0),
+    coalesce(sum(s.performance_off::numeric), 0),
+    coalesce(sum(s.performance_crs::numeric), 0),
+    coalesce(sum(s.performance_tklw::numeric), 0),
+    coalesce(sum(s.performance_int::numeric), 0),
+    coalesce(sum(s.performance_og::numeric), 0),
+    coalesce(sum(s.performance_pkwon::numeric), 0),
+    coalesce(sum(s.performance_pkcon::numeric), 0),
+    coalesce(sum(s.performance_touches::numeric), 0),
+    coalesce(sum(s.performance_tkl::numeric), 0),
+    coalesce(sum(s.performance_blocks::numeric), 0),
+    coalesce(sum(s.expected_xg::numeric), 0),
+    coalesce(sum(s.expected_npxg::numeric), 0),
+    coalesce(sum(s.expected_xag::numeric), 0),
+    coalesce(sum(s.sca_sca::numeric), 0),
+    coalesce(sum(s.sca_gca::numeric), 0),
+    coalesce(sum(s.passes_cmp::numeric), 0),
+    coalesce(sum(s.passes_att::numeric), 0),
+    coalesce(sum(s.passes_cmp_percent::numeric * s.minutes_played::numeric), 0),
+    coalesce(sum(s.passes_prgp::numeric), 0),
+    coalesce(sum(s.carries_carries::numeric), 0),
+    coalesce(sum(s.carries_prgc::numeric), 0),
+    coalesce(sum(s.take_ons_att::numeric), 0),
+    coalesce(sum(s.take_ons_succ::numeric), 0),
+    coalesce(sum(s.shot_stopping_sota::numeric), 0),
+    coalesce(sum(s.shot_stopping_ga::numeric), 0),
+    coalesce(sum(s.shot_stopping_saves::numeric), 0),
+    coalesce(sum(s.shot_stopping_save_percent::numeric * s.minutes_played::numeric), 0),
+    coalesce(sum(s.shot_stopping_psxg::numeric), 0),
+    coalesce(sum(s.launched_cmp::numeric), 0),
+    coalesce(sum(s.launched_att::numeric), 0),
+    coalesce(sum(s.launched_cmp_percent::numeric * s.minutes_played::numeric), 0),
+    coalesce(sum(s.passes_att_gk::numeric), 0),
+    coalesce(sum(s.passes_thr::numeric), 0),
+    coalesce(sum(s.passes_launch_percent::numeric * s.minutes_played::numeric), 0),
+    coalesce(sum(s.passes_avglen::numeric), 0),
+    coalesce(sum(s.goal_kicks_att::numeric), 0),
+    coalesce(sum(s.goal_kicks_launch_percent::numeric * s.minutes_played::numeric), 0),
+    coalesce(sum(s.goal_kicks_avglen::numeric), 0),
+    coalesce(sum(s.crosses_opp::numeric), 0),
+    coalesce(sum(s.crosses_stp::numeric), 0),
+    coalesce(sum(s.crosses_stp_percent::numeric * s.minutes_played::numeric), 0),
+    coalesce(sum(s.sweeper_opa::numeric), 0),
+    coalesce(sum(s.sweeper_avgdist::numeric), 0)
+from match_player_stats s
+join matches m on m.id = s.match_id
+join teams t on t.id = m.team_id and t.name = s.team
+group by s.team, m.season, s.player_name;
+
+grant select on player_season_stats to anon, authenticated;
@@ -0,0 +1,22 @@
+-- MVP scores of every player of a match, computed when its player stats are
+-- ingested (database.store_mvp_scores) so pages read them instead of rescoring.
+-- A match is scored from the point of view of the team of its matches row
+-- (team_id), whose result sets the multipliers. mvp_version is the weight set
+-- (mvp.MVP_VERSION); rows of older versions are left in place and ignored.
+create table if not exists match_mvp_scores (
+    id bigint generated by default as identity primary key,
+    match_id bigint not null references matches (id) on delete cascade,
+    team_id bigint not null,
+    season text not null,
+    team text not null,
+    player_name text not null,
+    mvp_score numeric not null,
+    mvp_rank integer not null,
+    mvp_version integer not null,
+    unique (match_id, team, player_name, mvp_version)
+);
+
+create index if not exists match_mvp_scores_season_idx
+    on match_mvp_scores (team_id, season, mvp_version);
+
+grant select on match_mvp_scores to anon, authenticated;
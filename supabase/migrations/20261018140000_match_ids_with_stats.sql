@@ -0,0 +1,14 @@
+-- Ids among p_match_ids that have player stats, called by
+-- database.get_match_ids_with_stats() as supabase.rpc("match_ids_with_stats", ...),
+-- so the check returns one row per match instead of one per player.
+create or replace function match_ids_with_stats(p_match_ids bigint[])
+returns table (match_id bigint)
+language sql
+stable
+as $$
+    select distinct s.match_id
+    from match_player_stats s
+    where s.match_id = any(p_match_ids)
+$$;
+
+grant execute on function match_ids_with_stats(bigint[]) to anon, authenticated;